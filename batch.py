@@ -0,0 +1,79 @@
+import json
+import sys
+
+import click
+
+from luatopy import backends
+from luatopy.batch import run_batch
+from luatopy.cache import default_directory
+
+
+@click.command()
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option(
+    '--backend',
+    type=click.Choice(list(backends.backends)),
+    default='tree',
+    help='Execution backend',
+)
+@click.option(
+    '--workers',
+    type=int,
+    default=None,
+    help='Number of worker processes (default one per core)',
+)
+@click.option(
+    '--timeout', type=float, default=None, help='Seconds allowed per script'
+)
+@click.option(
+    '--max-steps', type=int, default=None, help='Steps allowed per script'
+)
+@click.option(
+    '--max-memory',
+    type=int,
+    default=None,
+    help='Bytes a script may allocate',
+)
+@click.option(
+    '--cache/--no-cache', default=True, help='Cache parsed scripts on disk'
+)
+@click.option(
+    '--output',
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help='Write the JSON report to this file instead of stdout',
+)
+def run(
+    paths, backend, workers, timeout, max_steps, max_memory, cache, output
+):
+    report = run_batch(
+        list(paths),
+        workers=workers,
+        backend=backend,
+        timeout=timeout,
+        max_steps=max_steps,
+        max_memory=max_memory,
+        cache_dir=default_directory() if cache else None,
+    )
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        summary = report['summary']
+        print(
+            "{0} scripts, {1} ok, {2} failed in {3:.2f}s".format(
+                summary['total'],
+                summary['ok'],
+                summary['failed'],
+                report['elapsed'],
+            )
+        )
+    else:
+        print(json.dumps(report, indent=2))
+
+    sys.exit(1 if report['summary']['failed'] else 0)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,118 @@
+"""
+Microbenchmark for node dispatch in the evaluator.
+
+Compares the per node cost of the registry lookup that evaluator.evaluate
+uses with the chain of `klass == ast.X` checks it used before, for one
+sample node of every type. Only dispatch is measured, handlers are not
+called.
+
+    python -m benchmarks.dispatch
+"""
+
+import timeit
+from typing import Callable, Dict, List
+
+from luatopy import ast
+from luatopy import evaluator
+
+
+# The node order of the previous if chain in evaluator.evaluate
+LEGACY_ORDER: List[type] = [
+    ast.Program,
+    ast.ExpressionStatement,
+    ast.IntegerLiteral,
+    ast.StringLiteral,
+    ast.Boolean,
+    ast.PrefixExpression,
+    ast.InfixExpression,
+    ast.BlockStatement,
+    ast.IfExpression,
+    ast.ReturnStatement,
+    ast.AssignStatement,
+    ast.Identifier,
+    ast.FunctionLiteral,
+    ast.CallExpression,
+    ast.TableLiteral,
+    ast.IndexExpression,
+]
+
+
+def build_legacy_dispatch() -> Callable:
+    lines = ["def dispatch(node):", "    klass = type(node)"]
+    for index, node_type in enumerate(LEGACY_ORDER):
+        lines.append("    if klass == ast.{0}:".format(node_type.__name__))
+        lines.append("        return {0}".format(index))
+    lines.append("    return None")
+
+    namespace: Dict = {"ast": ast}
+    exec("\n".join(lines), namespace)
+    return namespace["dispatch"]
+
+
+def registry_dispatch(node):
+    handler = evaluator.node_handlers.get(type(node))
+    if handler is None:
+        return None
+    return handler
+
+
+def sample_nodes() -> Dict[type, object]:
+    identifier = ast.Identifier(token=None, value="a")
+    integer = ast.IntegerLiteral(token=None, value=1)
+    block = ast.BlockStatement(token=None, statements=[])
+
+    return {
+        ast.Program: ast.Program([]),
+        ast.ExpressionStatement: ast.ExpressionStatement(
+            token=None, expression=integer
+        ),
+        ast.IntegerLiteral: integer,
+        ast.StringLiteral: ast.StringLiteral(token=None, value="a"),
+        ast.Boolean: ast.Boolean(token=None, value=True),
+        ast.PrefixExpression: ast.PrefixExpression(
+            token=None, right=integer, operator="-"
+        ),
+        ast.InfixExpression: ast.InfixExpression(
+            token=None, left=integer, operator="+", right=integer
+        ),
+        ast.BlockStatement: block,
+        ast.IfExpression: ast.IfExpression(
+            token=None, condition=integer, consequence=block, alternative=None
+        ),
+        ast.ReturnStatement: ast.ReturnStatement(token=None, value=integer),
+        ast.AssignStatement: ast.AssignStatement(
+            token=None, name=identifier, value=integer
+        ),
+        ast.Identifier: identifier,
+        ast.FunctionLiteral: ast.FunctionLiteral(token=None, body=block),
+        ast.CallExpression: ast.CallExpression(
+            token=None, function=identifier, arguments=[]
+        ),
+        ast.TableLiteral: ast.TableLiteral(token=None, elements=[]),
+        ast.IndexExpression: ast.IndexExpression(
+            token=None, left=identifier, index=integer
+        ),
+    }
+
+
+def measure(fn: Callable, node: object, number: int) -> float:
+    best = min(timeit.repeat(lambda: fn(node), number=number, repeat=5))
+    return best / number * 1e9
+
+
+def run(number: int = 200000) -> None:
+    legacy_dispatch = build_legacy_dispatch()
+
+    print("{0:<22} {1:>12} {2:>12}".format("node", "before (ns)", "after (ns)"))
+    for node_type, node in sample_nodes().items():
+        before = measure(legacy_dispatch, node, number)
+        after = measure(registry_dispatch, node, number)
+        print(
+            "{0:<22} {1:>12.1f} {2:>12.1f}".format(
+                node_type.__name__, before, after
+            )
+        )
+
+
+if __name__ == "__main__":
+    run()
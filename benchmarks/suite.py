@@ -0,0 +1,273 @@
+"""
+Benchmark suite for the lexer, parser and evaluator.
+
+Every workload is lexed, parsed and evaluated separately. Like timeit,
+a phase is run in a loop long enough to be measured reliably, the loop is
+repeated and the best time per run is kept. Parsing is timed on tokens
+that were lexed up front, so it does not include the lexer.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --backend vm --output results.json
+    python -m benchmarks.suite --compare baseline.json --threshold 0.1
+
+With --compare the run is checked against an earlier --output file and
+exits with status 1 when any phase got slower than the threshold allows.
+"""
+
+import argparse
+from io import StringIO
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, Optional
+
+from luatopy import __version__
+from luatopy import backends
+from luatopy import obj
+from luatopy.lexer import Lexer
+from luatopy.parser import Parser
+from luatopy.token import Token, TokenType
+
+
+WORKLOAD_DIRECTORY: str = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "workloads"
+)
+
+PHASES: List[str] = ["lex", "parse", "evaluate"]
+
+DEFAULT_REPEAT: int = 5
+
+DEFAULT_THRESHOLD: float = 0.1
+
+
+def table_literals(size: int = 5000) -> str:
+    """
+    A script that is mostly one large table literal, with an array part
+    and a hash part
+    """
+
+    array = ", ".join(str(x) for x in range(size))
+    pairs = ", ".join("key{0} = {0}".format(x) for x in range(size // 2))
+    return "items = {{{0}}}\nnames = {{{1}}}\n#items".format(array, pairs)
+
+
+def read_workload(name: str) -> Callable[[], str]:
+    def read() -> str:
+        path = os.path.join(WORKLOAD_DIRECTORY, "{0}.lua".format(name))
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    return read
+
+
+# Recursive calls, tables built and read back, string concatenation,
+# closure creation and a large table literal
+WORKLOADS: Dict[str, Callable[[], str]] = {
+    "fib": read_workload("fib"),
+    "tables": read_workload("tables"),
+    "strings": read_workload("strings"),
+    "closures": read_workload("closures"),
+    "table_literals": table_literals,
+}
+
+
+class TokenReplay:
+    """
+    Hands out tokens that were lexed before, so the parser can be timed
+    on its own
+    """
+
+    def __init__(self, tokens: List[Token]) -> None:
+        self.tokens: List[Token] = tokens
+        self.pos: int = 0
+
+    def next_token(self) -> Token:
+        token = self.tokens[self.pos]
+        if token.token_type != TokenType.EOF:
+            self.pos = self.pos + 1
+        return token
+
+
+def lex(source: str) -> List[Token]:
+    return list(Lexer(StringIO(source)).tokens())
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    timings = [x / number for x in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "best": min(timings),
+        "median": statistics.median(timings),
+        "number": number,
+    }
+
+
+def run_workload(source: str, backend: str, repeat: int) -> Dict[str, Any]:
+    tokens = lex(source)
+
+    def parse():
+        parser = Parser(TokenReplay(tokens))  # type: ignore
+        program = parser.parse_program()
+        if parser.errors:
+            raise ValueError(parser.errors[0])
+        return program
+
+    program = parse()
+
+    def evaluate():
+        result = backends.evaluate(program, obj.Environment(), backend)
+        if result.__class__ is obj.Error:
+            raise ValueError(result.message)
+
+    return {
+        "lex": measure(lambda: lex(source), repeat),
+        "parse": measure(parse, repeat),
+        "evaluate": measure(evaluate, repeat),
+    }
+
+
+def run(
+    names: Optional[List[str]] = None,
+    backend: str = "tree",
+    repeat: int = DEFAULT_REPEAT,
+) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name in names or list(WORKLOADS):
+        results[name] = run_workload(WORKLOADS[name](), backend, repeat)
+
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "backend": backend,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """
+    Returns one row per workload and phase present in both runs, a row
+    is a regression when the best time grew by more than threshold
+    """
+
+    rows = []
+    for name, phases in current["results"].items():
+        baseline_phases = baseline["results"].get(name)
+        if baseline_phases is None:
+            continue
+
+        for phase in PHASES:
+            if phase not in phases or phase not in baseline_phases:
+                continue
+
+            before = baseline_phases[phase]["best"]
+            after = phases[phase]["best"]
+            ratio = after / before if before else 1.0
+            rows.append(
+                {
+                    "workload": name,
+                    "phase": phase,
+                    "before": before,
+                    "after": after,
+                    "ratio": ratio,
+                    "regression": ratio > 1 + threshold,
+                }
+            )
+    return rows
+
+
+def format_results(run_results: Dict[str, Any]) -> str:
+    lines = [
+        "{0:<16} {1:>12} {2:>12} {3:>12}".format(
+            "workload", "lex (ms)", "parse (ms)", "eval (ms)"
+        )
+    ]
+    for name, phases in run_results["results"].items():
+        lines.append(
+            "{0:<16} {1:>12.2f} {2:>12.2f} {3:>12.2f}".format(
+                name,
+                phases["lex"]["best"] * 1000,
+                phases["parse"]["best"] * 1000,
+                phases["evaluate"]["best"] * 1000,
+            )
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = [
+        "{0:<16} {1:<10} {2:>12} {3:>12} {4:>8}".format(
+            "workload", "phase", "before (ms)", "after (ms)", "ratio"
+        )
+    ]
+    for row in rows:
+        lines.append(
+            "{0:<16} {1:<10} {2:>12.2f} {3:>12.2f} {4:>8.2f}{5}".format(
+                row["workload"],
+                row["phase"],
+                row["before"] * 1000,
+                row["after"] * 1000,
+                row["ratio"],
+                "  REGRESSION" if row["regression"] else "",
+            )
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "workloads",
+        nargs="*",
+        help="Workloads to run, one of {0} (default all)".format(
+            ", ".join(WORKLOADS)
+        ),
+    )
+    parser.add_argument(
+        "--backend", choices=list(backends.backends), default="tree"
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--compare", help="Results JSON to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed slowdown before a phase counts as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    unknown = [x for x in args.workloads if x not in WORKLOADS]
+    if unknown:
+        parser.error("unknown workload {0}".format(unknown[0]))
+
+    run_results = run(args.workloads, args.backend, args.repeat)
+    print(format_results(run_results))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run_results, f, indent=2)
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+
+    rows = compare(baseline, run_results, args.threshold)
+    print()
+    print(format_comparison(rows))
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+function make_adder (n)
+    return function (x) return x + n end
+end
+
+function run (depth, x)
+    if depth == 0 then
+        add = make_adder(x)
+        return add(1)
+    end
+    return run(depth - 1, x) + run(depth - 1, x + 1)
+end
+
+run(13, 0)
@@ -0,0 +1,6 @@
+function words (depth)
+    if depth == 0 then return "ab" end
+    return words(depth - 1) .. "-" .. words(depth - 1)
+end
+
+#words(13)
@@ -0,0 +1,14 @@
+function build (depth, value)
+    if depth == 0 then return {value = value} end
+    left = build(depth - 1, value * 2)
+    right = build(depth - 1, value * 2 + 1)
+    return {value = value, left = left, right = right}
+end
+
+function sum (node, depth)
+    if depth == 0 then return node["value"] end
+    return node["value"] + sum(node["left"], depth - 1) + sum(node["right"], depth - 1)
+end
+
+tree = build(12, 1)
+sum(tree, 12)
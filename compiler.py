@@ -1,9 +1,155 @@
+from contextlib import nullcontext
+
 import click
 
+from luatopy.cache import ParseCache, parse_path
+from luatopy.optimizer import Optimizer
+from luatopy.compiler import Compiler
+from luatopy.code import instructions_to_string
+from luatopy.transpiler import Transpiler
+from luatopy.vm import VM
+from luatopy.obj import Environment
+from luatopy.profiler import Profiler, LineProfiler
+from luatopy import evaluator
+from luatopy import transpiler
+
 
 @click.command()
-def run():
-    print("HI")
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    '--target',
+    type=click.Choice(['vm', 'python']),
+    default='vm',
+    help='Run as bytecode on the VM or as generated Python',
+)
+@click.option('--bytecode', is_flag=True, help='Show compiled bytecode')
+@click.option(
+    '--emit-python', is_flag=True, help='Print generated Python and exit'
+)
+@click.option(
+    '--cache/--no-cache', default=True, help='Cache parsed scripts on disk'
+)
+@click.option(
+    '--cache-dir',
+    type=click.Path(file_okay=False),
+    default=None,
+    help='Parse cache directory (default ~/.cache/luatopy)',
+)
+@click.option(
+    '--optimize/--no-optimize',
+    default=True,
+    help='Fold constants and remove dead branches',
+)
+@click.option(
+    '--show-optimizations', is_flag=True, help='List the optimizations made'
+)
+@click.option(
+    '--profile', is_flag=True, help='Show time spent in each Lua function'
+)
+@click.option(
+    '--profile-sort',
+    type=click.Choice(['self', 'inclusive', 'calls', 'name']),
+    default='self',
+    help='Order of the profile report',
+)
+@click.option(
+    '--profile-json',
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help='Write the profile as JSON to this file',
+)
+@click.option(
+    '--profile-lines',
+    is_flag=True,
+    help='Run on the tree evaluator and show time spent on each line',
+)
+def run(
+    path,
+    target,
+    bytecode,
+    emit_python,
+    cache,
+    cache_dir,
+    optimize,
+    show_optimizations,
+    profile,
+    profile_sort,
+    profile_json,
+    profile_lines,
+):
+    parse_cache = ParseCache(cache_dir) if cache else None
+    program, errors = parse_path(path, parse_cache)
+
+    if errors:
+        for err in errors:
+            print("ERROR: {0}".format(err))
+        return
+
+    if optimize:
+        optimizer = Optimizer()
+        program = optimizer.optimize(program)
+        if show_optimizations:
+            for change in optimizer.changes:
+                print("* {0}".format(change))
+
+    if emit_python:
+        python_transpiler = Transpiler()
+        print(python_transpiler.transpile(program))
+        for err in python_transpiler.errors:
+            print("ERROR: {0}".format(err))
+        return
+
+    if profile_lines:
+        with LineProfiler() as line_profiler:
+            result = evaluator.evaluate(program, Environment())
+        if result:
+            print(result.inspect())
+        with open(path, encoding='utf-8') as f:
+            print(line_profiler.annotate(f.read()))
+        return
+
+    function_profiler = None
+    if profile or profile_json:
+        function_profiler = Profiler()
+        function_profiler.add_program(program)
+
+    if target == 'python':
+        with function_profiler or nullcontext():
+            result = transpiler.evaluate(program, Environment())
+        if result:
+            print(result.inspect())
+        report_profile(function_profiler, profile, profile_sort, profile_json)
+        return
+
+    compiler = Compiler()
+    compiler.compile(program)
+
+    if compiler.errors:
+        for err in compiler.errors:
+            print("ERROR: {0}".format(err))
+        return
+
+    compiled = compiler.bytecode()
+    if bytecode:
+        print(instructions_to_string(compiled.instructions))
+
+    with function_profiler or nullcontext():
+        result = VM(compiled).run()
+    if result:
+        print(result.inspect())
+    report_profile(function_profiler, profile, profile_sort, profile_json)
+
+
+def report_profile(function_profiler, profile, sort, json_path):
+    if function_profiler is None:
+        return
+
+    if profile:
+        print(function_profiler.report(sort))
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            f.write(function_profiler.to_json(sort))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,404 @@
+"""
+The array library, tables backed by a one dimensional NumPy array so
+numeric work runs as bulk calls instead of one Integer at a time.
+
+    a = array.new({3, 1, 2})
+    b = array.add(array.mul(a, 2), a)
+    total = array.sum(b)
+
+Arrays are tables, t[i] and #t read them like any other table. Integer
+arithmetic that does not fit in 64 bits is an error instead of wrapping
+around, and sum falls back to Python integers when it could wrap. The
+library is only registered when NumPy is installed, scripts can check
+whether array is nil. NumPy itself is imported by the first call of an
+array function, scripts that do not use the library do not pay for it.
+"""
+
+import importlib
+import importlib.util
+from typing import cast, Any, Callable, Dict, List, Optional
+
+from . import obj
+from . import state
+from .builtins import builtins, register
+from .obj import NULL
+
+
+NUMPY_AVAILABLE: bool = importlib.util.find_spec("numpy") is not None
+
+# The numpy module once load_numpy has run
+numpy: Any = None
+
+
+class Array(obj.Table):
+    """
+    Table whose values at the keys 1..n live in data, an int64 or
+    float64 NumPy array, it has no other keys and a fixed length.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: Any) -> None:
+        super().__init__()
+        self.data = data
+
+    def get(self, key: obj.Obj) -> obj.Obj:
+        if key.__class__ is obj.Float:
+            key = obj.table_key(cast(obj.Float, key))
+        if key.__class__ is obj.Integer:
+            index = key.value - 1  # type: ignore
+            if 0 <= index < len(self.data):
+                return to_obj(self.data[index])
+        return NULL
+
+    def set(self, key: obj.Obj, value: obj.Obj) -> None:
+        if key.__class__ is obj.Float:
+            key = obj.table_key(cast(obj.Float, key))
+        if key.__class__ is obj.Integer and value.__class__ in NUMBERS:
+            index = key.value - 1  # type: ignore
+            if 0 <= index < len(self.data):
+                self.data[index] = value.value  # type: ignore
+                return
+        raise ValueError("Arrays only hold numbers at the keys 1..n")
+
+    def length(self) -> int:
+        return len(self.data)
+
+    @property
+    def elements(self) -> Dict[obj.Obj, obj.Obj]:
+        return {
+            obj.Integer.create(index + 1): to_obj(value)
+            for index, value in enumerate(self.data.tolist())
+        }
+
+    def __repr__(self) -> str:
+        return "Array(data={0!r})".format(self.data)
+
+
+NUMBERS = (obj.Integer, obj.Float)
+
+# Bytes per value, arrays hold int64 or float64
+ITEM_SIZE: int = 8
+
+INT64_MIN: int = -(2**63)
+INT64_MAX: int = 2**63 - 1
+
+
+def load_numpy() -> Any:
+    global numpy
+
+    if numpy is None:
+        numpy = importlib.import_module("numpy")
+    return numpy
+
+
+def lazy(fn: Callable[..., obj.Obj]) -> Callable[..., obj.Obj]:
+    """
+    Wraps a library function so NumPy is imported before its first call
+    """
+
+    def call(*args: obj.Obj) -> obj.Obj:
+        if numpy is None:
+            load_numpy()
+        return fn(*args)
+
+    return call
+
+
+def to_obj(value: Any) -> obj.Obj:
+    # NumPy scalars and the values of tolist() are turned into Python
+    # numbers first
+    if hasattr(value, "item"):
+        value = value.item()
+    if value.__class__ is int:
+        return obj.Integer.create(value)
+    return obj.Float(value)
+
+
+def allocate(count: int) -> Optional[obj.Error]:
+    """
+    Charges an array of count values to the running State, called before
+    NumPy builds it so a memory limit stops an array that is too large
+    before it exists
+    """
+
+    active_state = state.active
+    if active_state is None:
+        return None
+    return active_state.allocate(state.table_size(0) + count * ITEM_SIZE)
+
+
+def operand(value: obj.Obj) -> Any:
+    """
+    The NumPy array or Python number for value, None when it is neither
+    an array nor a number
+    """
+
+    if isinstance(value, Array):
+        return cast(Array, value).data
+    if value.__class__ in NUMBERS:
+        return value.value  # type: ignore
+    return None
+
+
+def array_new(*args: obj.Obj) -> obj.Obj:
+    if not args or not isinstance(args[0], obj.Table):
+        return obj.Error.create("Bad argument to new, table expected")
+
+    if isinstance(args[0], Array):
+        data = cast(Array, args[0]).data
+        error = allocate(len(data))
+        if error is not None:
+            return error
+        return Array(data.copy())
+
+    values: List[obj.Obj] = cast(obj.Table, args[0]).array
+    error = allocate(len(values))
+    if error is not None:
+        return error
+
+    numbers: List[Any] = []
+    dtype = numpy.int64
+    for index, value in enumerate(values, 1):
+        klass = value.__class__
+        if klass is obj.Float:
+            dtype = numpy.float64
+        elif klass is not obj.Integer:
+            return obj.Error.create(
+                "Invalid value (at index {0}) in table for new", index
+            )
+        numbers.append(value.value)  # type: ignore
+
+    try:
+        data = numpy.array(numbers, dtype=dtype)
+    except OverflowError:
+        return obj.Error.create("Number too large for an array")
+    return Array(data)
+
+
+def array_zeros(*args: obj.Obj) -> obj.Obj:
+    if not args or args[0].__class__ is not obj.Integer:
+        return obj.Error.create("Bad argument to zeros, number expected")
+
+    count = max(cast(obj.Integer, args[0]).value, 0)
+    error = allocate(count)
+    if error is not None:
+        return error
+    return Array(numpy.zeros(count, dtype=numpy.int64))
+
+
+def array_range(*args: obj.Obj) -> obj.Obj:
+    if len(args) < 2 or any(x.__class__ is not obj.Integer for x in args):
+        return obj.Error.create("Bad argument to range, number expected")
+
+    first = cast(obj.Integer, args[0]).value
+    last = cast(obj.Integer, args[1]).value
+    error = allocate(max(last - first + 1, 0))
+    if error is not None:
+        return error
+
+    try:
+        data = numpy.arange(first, last + 1, dtype=numpy.int64)
+    except OverflowError:
+        return obj.Error.create("Number too large for an array")
+    return Array(data)
+
+
+def add_overflows(left: Any, right: Any, result: Any) -> Any:
+    # The sign of the result differs from the sign of both operands
+    return ((left ^ result) & (right ^ result)) < 0
+
+
+def sub_overflows(left: Any, right: Any, result: Any) -> Any:
+    return ((left ^ right) & (left ^ result)) < 0
+
+
+def mul_overflows(left: Any, right: Any, result: Any) -> Any:
+    # A product that fits divides back into the left operand, except
+    # for INT64_MIN * -1 which wraps around to itself
+    nonzero = right != 0
+    quotient = result // numpy.where(nonzero, right, 1)
+    wrapped = (left == INT64_MIN) & (right == -1)
+    wrapped = wrapped | ((right == INT64_MIN) & (left == -1))
+    return (nonzero & (quotient != left)) | wrapped
+
+
+def elementwise(
+    name: str,
+    op: Callable[[Any, Any], Any],
+    float_result: bool,
+    overflows: Optional[Callable[[Any, Any, Any], Any]],
+) -> Callable[..., obj.Obj]:
+    """
+    Builds the library function for op, either side can be an array or
+    a number. Like the operators, division and modulo give floats. For
+    integer results overflows tells where op wrapped around.
+    """
+
+    def fn(*args: obj.Obj) -> obj.Obj:
+        left = operand(args[0]) if len(args) > 0 else None
+        right = operand(args[1]) if len(args) > 1 else None
+        if left is None or right is None:
+            return obj.Error.create(
+                "Bad argument to {0}, array or number expected", name
+            )
+        if not isinstance(args[0], Array) and not isinstance(args[1], Array):
+            return obj.Error.create("Bad argument to {0}, array expected", name)
+
+        array = left if isinstance(args[0], Array) else right
+        error = allocate(len(array))
+        if error is not None:
+            return error
+
+        if float_result:
+            left = numpy.asarray(left, dtype=numpy.float64)
+
+        try:
+            # Like Lua floats, division by zero gives inf or nan
+            with numpy.errstate(all="ignore"):
+                data = numpy.asarray(op(left, right))
+                wrapped = (
+                    overflows is not None
+                    and data.dtype == numpy.int64
+                    and overflows(left, right, data).any()
+                )
+        except ValueError:
+            return obj.Error.create(
+                "Bad argument to {0}, arrays of different length", name
+            )
+        except OverflowError:
+            return obj.Error.create("Number too large for an array")
+
+        if wrapped:
+            return obj.Error.create("Integer overflow in {0}", name)
+        return Array(data)
+
+    return fn
+
+
+def reduction(
+    name: str, op: Callable[[Any], Any], allow_empty: bool
+) -> Callable[..., obj.Obj]:
+    def fn(*args: obj.Obj) -> obj.Obj:
+        if not args or not isinstance(args[0], Array):
+            return obj.Error.create(
+                "Bad argument to {0}, array expected", name
+            )
+
+        data = cast(Array, args[0]).data
+        if not allow_empty and len(data) == 0:
+            return obj.Error.create("Bad argument to {0}, empty array", name)
+        return to_obj(op(data))
+
+    return fn
+
+
+def exact_sum(data: Any) -> Any:
+    """
+    numpy.sum, or the sum of Python integers when the int64 sum could
+    wrap around
+    """
+
+    if data.dtype == numpy.int64 and len(data):
+        largest = max(abs(int(data.min())), abs(int(data.max())))
+        if len(data) * largest > INT64_MAX:
+            return sum(data.tolist())
+    return numpy.sum(data)
+
+
+def array_slice(*args: obj.Obj) -> obj.Obj:
+    """
+    The values from i to j, both included, negative positions count from
+    the end like string.sub
+    """
+
+    if not args or not isinstance(args[0], Array):
+        return obj.Error.create("Bad argument to slice, array expected")
+
+    data = cast(Array, args[0]).data
+    length = len(data)
+    first = args[1] if len(args) > 1 else obj.Integer.create(1)
+    last = args[2] if len(args) > 2 else obj.Integer.create(length)
+    if first.__class__ is not obj.Integer or last.__class__ is not obj.Integer:
+        return obj.Error.create("Bad argument to slice, number expected")
+
+    start = cast(obj.Integer, first).value
+    stop = cast(obj.Integer, last).value
+    if start < 0:
+        start = length + start + 1
+    if stop < 0:
+        stop = length + stop + 1
+    start = max(start, 1)
+    stop = max(min(stop, length), start - 1)
+
+    # A view on the array it was taken from, only the table itself is new
+    error = allocate(0)
+    if error is not None:
+        return error
+    return Array(data[start - 1 : stop])
+
+
+def array_sort(*args: obj.Obj) -> obj.Obj:
+    if not args or not isinstance(args[0], Array):
+        return obj.Error.create("Bad argument to sort, array expected")
+
+    data = cast(Array, args[0]).data
+    error = allocate(len(data))
+    if error is not None:
+        return error
+    return Array(numpy.sort(data))
+
+
+def array_totable(*args: obj.Obj) -> obj.Obj:
+    if not args or not isinstance(args[0], Array):
+        return obj.Error.create("Bad argument to totable, array expected")
+
+    data = cast(Array, args[0]).data
+
+    active_state = state.active
+    if active_state is not None:
+        error = active_state.allocate(state.table_size(len(data)))
+        if error is not None:
+            return error
+
+    table = obj.Table()
+    table.array = [to_obj(x) for x in data.tolist()]
+    return table
+
+
+functions: Dict[str, obj.Obj] = {}
+functions = register(functions, "new", lazy(array_new))
+functions = register(functions, "zeros", lazy(array_zeros))
+functions = register(functions, "range", lazy(array_range))
+functions = register(functions, "slice", lazy(array_slice))
+functions = register(functions, "sort", lazy(array_sort))
+functions = register(functions, "totable", lazy(array_totable))
+
+# The NumPy functions are looked up when they are called, not here
+elementwise_ops: List[Any] = [
+    ("add", lambda x, y: numpy.add(x, y), False, add_overflows),
+    ("sub", lambda x, y: numpy.subtract(x, y), False, sub_overflows),
+    ("mul", lambda x, y: numpy.multiply(x, y), False, mul_overflows),
+    ("div", lambda x, y: numpy.true_divide(x, y), True, None),
+    ("mod", lambda x, y: numpy.mod(x, y), True, None),
+]
+for name, op, float_result, overflows in elementwise_ops:
+    functions = register(
+        functions, name, lazy(elementwise(name, op, float_result, overflows))
+    )
+
+reductions: List[Any] = [
+    ("sum", exact_sum, True),
+    ("min", lambda data: numpy.min(data), False),
+    ("max", lambda data: numpy.max(data), False),
+    ("mean", lambda data: numpy.mean(data), False),
+]
+for name, reduce_op, allow_empty in reductions:
+    functions = register(
+        functions, name, lazy(reduction(name, reduce_op, allow_empty))
+    )
+
+if NUMPY_AVAILABLE:
+    builtins["array"] = obj.Table(
+        elements={obj.String.intern(x): y for x, y in functions.items()}
+    )
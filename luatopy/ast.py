@@ -1,5 +1,5 @@
-from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Tuple
+from dataclasses import dataclass, field, fields
+from typing import Iterator, List, Optional, Dict, Tuple
 
 from .token import Token
 
@@ -7,6 +7,7 @@ from .token import Token
 class Program:
     def __init__(self, statements):
         self.statements = statements
+        self.resolved: bool = False
 
     def to_code(self) -> str:
         out = [x.to_code() for x in self.statements]
@@ -20,11 +21,32 @@ class Node:
     def to_code(self) -> str:
         pass
 
+    @property
+    def line(self) -> int:
+        """
+        Source line of the token the node was parsed from, 0 for nodes
+        created without a token
+        """
+
+        return self.token.line if self.token else 0
+
+    @property
+    def column(self) -> int:
+        return self.token.column if self.token else 0
+
 
 @dataclass
 class Identifier(Node):
     value: str
 
+    # Set by the resolver, slot is used where the name is declared and
+    # address lists the (depth, slot) pairs a read has to check before
+    # falling back to globals
+    slot: Optional[int] = field(default=None, compare=False, repr=False)
+    address: Optional[Tuple[Tuple[int, int], ...]] = field(
+        default=None, compare=False, repr=False
+    )
+
     def to_code(self) -> str:
         return self.value
 
@@ -80,6 +102,14 @@ class IntegerLiteral(Node):
         return str(self.value)
 
 
+@dataclass
+class FloatLiteral(Node):
+    value: float
+
+    def to_code(self) -> str:
+        return repr(self.value)
+
+
 @dataclass
 class StringLiteral(Node):
     value: str
@@ -105,6 +135,10 @@ class InfixExpression(Expression):
     operator: str
     right: Node
 
+    # The OpCode of operator, set by the parser so evaluation does not
+    # have to compare operator strings
+    opcode: Optional[int] = field(default=None, compare=False, repr=False)
+
     def to_code(self) -> str:
         return "({0} {1} {2})".format(
             self.left.to_code(), self.operator, self.right.to_code()
@@ -115,6 +149,11 @@ class InfixExpression(Expression):
 class BlockStatement(Statement):
     statements: List[Node] = field(default_factory=list)
 
+    # Names of the local slots, set by the resolver on function bodies
+    local_names: Optional[Tuple[str, ...]] = field(
+        default=None, compare=False, repr=False
+    )
+
     def to_code(self) -> str:
         out = [x.to_code() for x in self.statements]
         return "\n".join(out)
@@ -161,6 +200,10 @@ class CallExpression(Expression):
     function: Node
     arguments: List[Expression]
 
+    # Set by the resolver on `return f(x)` inside a function body, the
+    # call can then replace the current call instead of nesting in it
+    tail_call: bool = field(default=False, compare=False, repr=False)
+
     def to_code(self) -> str:
         out = "{0}({1})".format(
             self.function.to_code(),
@@ -193,3 +236,39 @@ class IndexExpression(Expression):
 
     def to_code(self) -> str:
         return "({0}[{1}])".format(self.left.to_code(), self.index.to_code())
+
+
+def iter_child_nodes(node) -> Iterator[Node]:
+    """
+    Yield the direct child nodes of node, in source order
+    """
+
+    if isinstance(node, Program):
+        yield from node.statements
+        return
+
+    for node_field in fields(node):
+        if node_field.name == "token":
+            continue
+
+        value = getattr(node, node_field.name)
+        if isinstance(value, Node):
+            yield value
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, tuple):
+                    yield from (x for x in item if isinstance(x, Node))
+                elif isinstance(item, Node):
+                    yield item
+
+
+def iter_scope_nodes(node) -> Iterator[Node]:
+    """
+    Yield every node below node without entering nested function bodies,
+    the function literals themselves are still yielded
+    """
+
+    for child in iter_child_nodes(node):
+        yield child
+        if type(child) != FunctionLiteral:
+            yield from iter_scope_nodes(child)
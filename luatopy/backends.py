@@ -0,0 +1,35 @@
+from typing import Callable, Dict, Optional
+
+from . import ast
+from . import obj
+from . import evaluator
+from . import closure_compiler
+from . import vm
+from . import transpiler
+from . import stack_evaluator
+
+
+Backend = Callable[[ast.Program, obj.Environment], Optional[obj.Obj]]
+
+backends: Dict[str, Backend] = {}
+
+
+def register(store, name, fn):
+    store[name] = fn
+    return store
+
+
+backends = register(backends, "tree", evaluator.evaluate)
+backends = register(backends, "closure", closure_compiler.evaluate)
+backends = register(backends, "vm", vm.evaluate)
+backends = register(backends, "python", transpiler.evaluate)
+backends = register(backends, "stack", stack_evaluator.evaluate)
+
+
+def evaluate(
+    program: ast.Program, env: obj.Environment, backend: str = "tree"
+) -> Optional[obj.Obj]:
+    if backend not in backends:
+        raise ValueError("Unknown backend {0}".format(backend))
+
+    return backends[backend](program, env)
@@ -0,0 +1,253 @@
+"""
+Runs many independent scripts in parallel, each in a process of its
+own with at most workers of them at a time. Every script gets a fresh
+Environment and its own State, so the per job limits and counters of
+luatopy.state apply, and what it printed is captured.
+
+    report = run_batch(["jobs/"], workers=8, timeout=5.0)
+    print(json.dumps(report, indent=2))
+
+The timeout is enforced by the State inside the process, a job past its
+deadline stops at the next limit check and is reported as "timeout". A
+job that does not even report back RESULT_GRACE seconds after that, like
+one stuck parsing, is given up on and its process terminated. Deadlines
+count from the start of each job, not from when the batch started.
+"""
+
+from contextlib import redirect_stdout
+from io import StringIO
+import multiprocessing
+from multiprocessing.connection import wait, Connection
+import os
+import time
+from typing import cast, Any, Dict, List, Optional, Tuple
+
+from . import __version__
+from . import backends
+from . import obj
+from .cache import ParseCache, parse_path
+from .state import State
+
+
+SUFFIX: str = ".lua"
+
+# Seconds on top of the timeout a job may take to parse and report back
+RESULT_GRACE: float = 10.0
+
+
+def collect_scripts(paths: List[str]) -> List[str]:
+    """
+    Expands directories in paths to the Lua scripts below them, in a
+    stable order, files are kept as they are
+    """
+
+    scripts: List[str] = []
+    for path in paths:
+        if not os.path.isdir(path):
+            scripts.append(path)
+            continue
+
+        found: List[str] = []
+        for directory, _, names in os.walk(path):
+            found.extend(
+                os.path.join(directory, x)
+                for x in names
+                if x.endswith(SUFFIX)
+            )
+        scripts.extend(sorted(found))
+    return scripts
+
+
+def run_script(
+    path: str,
+    backend: str = "tree",
+    timeout: Optional[float] = None,
+    max_steps: Optional[int] = None,
+    max_memory: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Runs a single script and returns its entry in the report, the status
+    is "ok", "parse_error", "error" or the kind of limit that stopped it
+    """
+
+    job: Dict[str, Any] = {
+        "path": path,
+        "status": "ok",
+        "result": None,
+        "error": None,
+        "stdout": "",
+        "elapsed": 0.0,
+        "steps": 0,
+        "memory": 0,
+    }
+
+    started = time.monotonic()
+    try:
+        parse_cache = ParseCache(cache_dir) if cache_dir else None
+        program, errors = parse_path(path, parse_cache)
+    except (OSError, ValueError) as e:
+        job["status"] = "error"
+        job["error"] = str(e)
+        job["elapsed"] = time.monotonic() - started
+        return job
+
+    if errors:
+        job["status"] = "parse_error"
+        job["error"] = errors[0]
+        job["elapsed"] = time.monotonic() - started
+        return job
+
+    script_state = State(
+        max_steps=max_steps, timeout=timeout, max_memory=max_memory
+    )
+    stdout = StringIO()
+    try:
+        with redirect_stdout(stdout), script_state:
+            result = backends.evaluate(program, obj.Environment(), backend)
+    except RecursionError:
+        result = obj.Error.create("stack overflow")
+    except Exception as e:
+        # A failure of the interpreter itself, still reported with what
+        # the script printed before it
+        result = obj.Error.create("{0}: {1}", type(e).__name__, e)
+
+    if result.__class__ is obj.Error:
+        error = result
+        job["status"] = error.kind or "error"
+        job["error"] = error.message
+    elif result is not None:
+        job["result"] = result.inspect()
+
+    job["stdout"] = stdout.getvalue()
+    job["elapsed"] = time.monotonic() - started
+    job["steps"] = script_state.steps
+    job["memory"] = script_state.memory
+    return job
+
+
+def run_job(sender: Connection, path: str, *args: Any) -> None:
+    """
+    Entry point of the process of a job, sends the report entry of the
+    script back to run_batch
+    """
+
+    try:
+        sender.send(run_script(path, *args))
+    finally:
+        sender.close()
+
+
+def run_batch(
+    paths: List[str],
+    workers: Optional[int] = None,
+    backend: str = "tree",
+    timeout: Optional[float] = None,
+    max_steps: Optional[int] = None,
+    max_memory: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Runs every script found in paths, workers processes (default one per
+    core) at a time, and returns the report
+    """
+
+    if backend not in backends.backends:
+        raise ValueError("Unknown backend {0}".format(backend))
+
+    scripts = collect_scripts(paths)
+    workers = workers or os.cpu_count() or 1
+
+    allowed = timeout + RESULT_GRACE if timeout is not None else None
+    args = (backend, timeout, max_steps, max_memory, cache_dir)
+
+    started = time.monotonic()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(scripts)
+
+    # The receiving end of each job that runs, with the index of the job,
+    # its process and the time it has to report back by
+    running: Dict[
+        Connection, Tuple[int, multiprocessing.Process, Optional[float]]
+    ] = {}
+    next_job = 0
+    try:
+        while next_job < len(scripts) or running:
+            while next_job < len(scripts) and len(running) < workers:
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(
+                    target=run_job,
+                    args=(sender, scripts[next_job]) + args,
+                    daemon=True,
+                )
+                process.start()
+                sender.close()
+
+                deadline = None
+                if allowed is not None:
+                    deadline = time.monotonic() + allowed
+                running[receiver] = (next_job, process, deadline)
+                next_job = next_job + 1
+
+            deadlines = [x[2] for x in running.values() if x[2] is not None]
+            remaining = None
+            if deadlines:
+                remaining = max(min(deadlines) - time.monotonic(), 0.0)
+
+            for ready in wait(list(running), remaining):
+                receiver = cast(Connection, ready)
+                index, process, _ = running.pop(receiver)
+                try:
+                    results[index] = receiver.recv()
+                except EOFError:
+                    # The process died before it could report back
+                    process.join()
+                    results[index] = {
+                        "path": scripts[index],
+                        "status": "crashed",
+                        "error": "Process exited with code {0}".format(
+                            process.exitcode
+                        ),
+                    }
+                receiver.close()
+                process.join()
+
+            now = time.monotonic()
+            for receiver, (index, process, deadline) in list(running.items()):
+                if deadline is None or now < deadline:
+                    continue
+
+                del running[receiver]
+                process.terminate()
+                process.join()
+                receiver.close()
+                results[index] = {
+                    "path": scripts[index],
+                    "status": "timeout",
+                    "error": "No result after {0} seconds".format(allowed),
+                }
+    finally:
+        # Only left with jobs running when interrupted
+        for receiver, (_, process, _) in running.items():
+            process.terminate()
+            process.join()
+            receiver.close()
+
+    jobs = cast(List[Dict[str, Any]], results)
+
+    statuses: Dict[str, int] = {}
+    for job in jobs:
+        statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+
+    return {
+        "version": __version__,
+        "backend": backend,
+        "workers": workers,
+        "elapsed": time.monotonic() - started,
+        "summary": {
+            "total": len(jobs),
+            "ok": statuses.get("ok", 0),
+            "failed": len(jobs) - statuses.get("ok", 0),
+            "statuses": statuses,
+        },
+        "jobs": jobs,
+    }
@@ -1,6 +1,7 @@
-from typing import Any, Dict, Optional, List
+from typing import cast, Any, Dict, Optional, List
 
 from luatopy import obj
+from luatopy import state
 from luatopy.obj import TRUE, FALSE, NULL
 
 
@@ -20,18 +21,20 @@ def builtin_type(*args: obj.Obj) -> obj.Obj:
     value_type: Optional[str] = None
     if type(value) == obj.String:
         value_type = "string"
-    if type(value) == obj.Integer:
+    if type(value) == obj.Integer or type(value) == obj.Float:
         value_type = "number"
     if type(value) == obj.Boolean:
         value_type = "boolean"
-    if type(value) == obj.Table:
+    if isinstance(value, obj.Table):
         value_type = "table"
-    if type(value) == obj.Function:
+    if type(value) == obj.Function or type(value) == obj.Builtin:
         value_type = "function"
+    if type(value) == obj.Coroutine:
+        value_type = "thread"
 
     if not value_type:
         return NULL
-    return obj.String(value=value_type)
+    return obj.String.intern(value_type)
 
 
 builtins = register(builtins, "type", builtin_type)
@@ -44,3 +47,27 @@ def builtin_print(*args: obj.Obj) -> obj.Obj:
 
 
 builtins = register(builtins, "print", builtin_print)
+
+
+def builtin_collectgarbage(*args: obj.Obj) -> obj.Obj:
+    option = args[0] if args else obj.String(value="collect")
+    if type(option) != obj.String:
+        return obj.Error.create("Bad argument to collectgarbage")
+
+    option_value = cast(obj.String, option).value
+    if option_value == "count":
+        # Kilobytes allocated by the running script, see luatopy.state
+        active_state = state.active
+        memory = active_state.memory if active_state is not None else 0
+        return obj.Float(value=memory / 1024)
+
+    if option_value == "collect":
+        # Python frees memory on its own, there is nothing to run
+        return obj.Integer.create(0)
+
+    return obj.Error.create(
+        "Invalid option {0} to collectgarbage", option_value
+    )
+
+
+builtins = register(builtins, "collectgarbage", builtin_collectgarbage)
@@ -0,0 +1,215 @@
+"""
+On-disk cache of parsed programs, similar to __pycache__. Entries are
+pickled ast.Program instances named after a hash of the source and the
+interpreter version, so a changed script or a new interpreter simply
+misses. Entries written by other versions are removed, and the least
+recently used entries are evicted once the directory grows too large.
+"""
+
+import gc
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+from . import __version__
+from . import ast
+from .lexer import Lexer
+from .parser import Parser
+
+
+DEFAULT_MAX_SIZE: int = 64 * 1024 * 1024
+
+# Modules that decide what a parsed program looks like, a change to any
+# of them invalidates the cache even without a version bump
+AST_MODULES: List[str] = [
+    "token.py",
+    "lexer.py",
+    "ast.py",
+    "code.py",
+    "parser.py",
+    "resolver.py",
+]
+
+
+def ast_fingerprint() -> str:
+    digest = hashlib.sha256()
+    package_directory = os.path.dirname(os.path.abspath(__file__))
+    for name in AST_MODULES:
+        with open(os.path.join(package_directory, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+# Pickled ASTs depend on both the interpreter and the Python version
+VERSION_TAG: str = "luatopy-{0}-{1}-{2}".format(
+    __version__, ast_fingerprint(), sys.implementation.cache_tag
+)
+
+SUFFIX: str = ".ast"
+
+HASH_CHUNK_SIZE: int = 64 * 1024
+
+
+def default_directory() -> str:
+    directory = os.environ.get("LUATOPY_CACHE_DIR")
+    if directory:
+        return directory
+    return os.path.join(os.path.expanduser("~"), ".cache", "luatopy")
+
+
+class ParseCache:
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ) -> None:
+        self.directory: str = directory or default_directory()
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def key(self, path: str) -> str:
+        digest = hashlib.sha256(VERSION_TAG.encode("utf-8"))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(
+            self.directory, "{0}.{1}{2}".format(VERSION_TAG, key, SUFFIX)
+        )
+
+    def load(self, key: str) -> Optional[ast.Program]:
+        entry_path = self.entry_path(key)
+
+        # Unpickling allocates every node at once, which otherwise sets
+        # off the cyclic garbage collector over and over
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(entry_path, "rb") as f:
+                program = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated or otherwise unreadable, parse again
+            self.remove(entry_path)
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        if type(program) is not ast.Program:
+            self.remove(entry_path)
+            return None
+
+        # Eviction goes by modification time, mark the entry as used
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return program
+
+    def store(self, key: str, program: ast.Program) -> bool:
+        try:
+            data = pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+        except (RecursionError, pickle.PicklingError):
+            return False
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            # Write to a temporary file first so concurrent runs never
+            # read a partially written entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        except OSError:
+            return False
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.entry_path(key))
+        except OSError:
+            # Without the suffix eviction would never find the file
+            self.remove(tmp_path)
+            return False
+
+        self.evict()
+        return True
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+
+        entries: List[Tuple[float, int, str]] = []
+        for name in names:
+            if not name.endswith(SUFFIX):
+                continue
+
+            entry_path = os.path.join(self.directory, name)
+            if not name.startswith(VERSION_TAG + "."):
+                self.remove(entry_path)
+                continue
+
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+        return entries
+
+    def evict(self) -> None:
+        """
+        Removes stale entries and then the least recently used ones
+        until the cache fits in max_size.
+        """
+
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, entry_path in entries:
+            if total <= self.max_size:
+                break
+            self.remove(entry_path)
+            total = total - size
+
+    def clear(self) -> None:
+        for _, _, entry_path in self.entries():
+            self.remove(entry_path)
+
+    def remove(self, entry_path: str) -> None:
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+
+    def parse(self, path: str) -> Tuple[ast.Program, List[str]]:
+        key = self.key(path)
+        program = self.load(key)
+        if program is not None:
+            self.hits = self.hits + 1
+            return program, []
+
+        self.misses = self.misses + 1
+        parser = Parser(Lexer(path))
+        program = parser.parse_program()
+
+        # Programs with errors are never cached, they are not run anyway
+        if not parser.errors:
+            self.store(key, program)
+        return program, parser.errors
+
+
+def parse_path(
+    path: str, cache: Optional[ParseCache] = None
+) -> Tuple[ast.Program, List[str]]:
+    if cache is None:
+        parser = Parser(Lexer(path))
+        return parser.parse_program(), parser.errors
+    return cache.parse(path)
@@ -0,0 +1,517 @@
+"""
+Alternative backend that compiles every AST node into a specialized
+Python closure once, instead of dispatching on the node type each time
+the node is evaluated. Values are the same obj instances the evaluator
+uses, so results are interchangeable between the two backends.
+"""
+
+import operator
+from typing import cast, Any, Callable, Dict, List, Optional
+
+from . import ast
+from . import obj
+from . import evaluator
+from . import profiler
+from . import state
+from .builtins import builtins
+from .obj import TRUE, FALSE, NULL, LuaError, TailCall
+
+
+Compiled = Callable[[obj.Environment], Any]
+
+
+def evaluate(node: ast.Node, env: obj.Environment):
+    compiled = compile_node(node)
+    try:
+        return compiled(env)
+    except LuaError as e:
+        return e.error
+
+
+def compile_node(node: ast.Node) -> Compiled:
+    compile_fn = node_compilers.get(type(node), compile_unknown)
+    return compile_fn(node)
+
+
+def compile_unknown(node: Optional[ast.Node]) -> Compiled:
+    def unknown(env):
+        return None
+
+    return unknown
+
+
+def compile_program(node: ast.Node) -> Compiled:
+    program: ast.Program = cast(ast.Program, node)
+    block = compile_statements(program.statements)
+
+    def run_program(env):
+        result = block(env)
+        if result.__class__ is obj.ReturnValue:
+            return result.value
+        return result
+
+    return run_program
+
+
+def compile_block_statement(node: ast.Node) -> Compiled:
+    block_statement: ast.BlockStatement = cast(ast.BlockStatement, node)
+    return compile_statements(block_statement.statements)
+
+
+def compile_statements(statements: List[ast.Node]) -> Compiled:
+    """
+    Only statements that can produce a ReturnValue are checked after
+    they run, everything else is called without any inspection.
+    """
+
+    compiled = [compile_node(x) for x in statements]
+    checked = [may_return(x) for x in statements]
+
+    if not compiled:
+        return compile_unknown(None)
+
+    if len(compiled) == 1:
+        return compiled[0]
+
+    steps = list(zip(compiled, checked))
+
+    def block(env):
+        result = None
+        for step, check in steps:
+            result = step(env)
+            if check and result.__class__ is obj.ReturnValue:
+                return result
+        return result
+
+    return block
+
+
+def may_return(node: ast.Node) -> bool:
+    klass = type(node)
+
+    if klass == ast.ReturnStatement:
+        return True
+
+    if klass == ast.ExpressionStatement:
+        return may_return(cast(ast.ExpressionStatement, node).expression)
+
+    if klass == ast.BlockStatement:
+        block_statement: ast.BlockStatement = cast(ast.BlockStatement, node)
+        return any(may_return(x) for x in block_statement.statements)
+
+    if klass == ast.IfExpression:
+        if_exp: ast.IfExpression = cast(ast.IfExpression, node)
+        return may_return(if_exp.consequence) or may_return(
+            if_exp.alternative
+        )
+
+    return False
+
+
+def compile_expression_statement(node: ast.Node) -> Compiled:
+    exp: ast.ExpressionStatement = cast(ast.ExpressionStatement, node)
+    return compile_node(exp.expression)
+
+
+def compile_integer_literal(node: ast.Node) -> Compiled:
+    integer_literal: ast.IntegerLiteral = cast(ast.IntegerLiteral, node)
+    value = obj.Integer.create(integer_literal.value)
+
+    # Integers are immutable, every evaluation can share one instance
+    def integer(env):
+        return value
+
+    return integer
+
+
+def compile_float_literal(node: ast.Node) -> Compiled:
+    float_literal: ast.FloatLiteral = cast(ast.FloatLiteral, node)
+    value = obj.Float(float_literal.value)
+
+    def number(env):
+        return value
+
+    return number
+
+
+def compile_string_literal(node: ast.Node) -> Compiled:
+    string_literal: ast.StringLiteral = cast(ast.StringLiteral, node)
+    value = obj.String.intern(string_literal.value)
+
+    # Strings are immutable as well
+    def string(env):
+        return value
+
+    return string
+
+
+def compile_boolean(node: ast.Node) -> Compiled:
+    boolean: ast.Boolean = cast(ast.Boolean, node)
+    value = TRUE if boolean.value else FALSE
+
+    def boolean_value(env):
+        return value
+
+    return boolean_value
+
+
+def compile_identifier(node: ast.Node) -> Compiled:
+    identifier: ast.Identifier = cast(ast.Identifier, node)
+    name = identifier.value
+
+    def lookup(env):
+        scope = env
+        while scope is not None:
+            store = scope.store
+            if name in store:
+                return store[name]
+            scope = scope.outer
+        return builtins.get(name, NULL)
+
+    return lookup
+
+
+integer_arithmetic: Dict[str, Callable[[int, int], int]] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+}
+
+integer_comparison: Dict[str, Callable[[int, int], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "~=": operator.ne,
+}
+
+
+def compile_infix_expression(node: ast.Node) -> Compiled:
+    infix_exp: ast.InfixExpression = cast(ast.InfixExpression, node)
+    operator_name = infix_exp.operator
+    opcode = infix_exp.opcode
+    left = compile_node(infix_exp.left)
+    right = compile_node(infix_exp.right)
+    Integer = obj.Integer
+    create_integer = obj.Integer.create
+    evaluate_infix = evaluator.evaluate_infix
+
+    def generic(left_value, right_value):
+        result = evaluate_infix(opcode, left_value, right_value)
+        if result.__class__ is obj.Error:
+            raise LuaError(result)
+        return result
+
+    arithmetic = integer_arithmetic.get(operator_name)
+    if arithmetic:
+        op = arithmetic
+
+        if type(infix_exp.right) == ast.IntegerLiteral:
+            constant = cast(ast.IntegerLiteral, infix_exp.right).value
+            constant_obj = create_integer(constant)
+
+            def arithmetic_constant(env):
+                left_value = left(env)
+                if left_value.__class__ is Integer:
+                    return create_integer(op(left_value.value, constant))
+                return generic(left_value, constant_obj)
+
+            return arithmetic_constant
+
+        def arithmetic_expression(env):
+            left_value = left(env)
+            right_value = right(env)
+            if left_value.__class__ is Integer and right_value.__class__ is Integer:
+                return create_integer(op(left_value.value, right_value.value))
+            return generic(left_value, right_value)
+
+        return arithmetic_expression
+
+    comparison = integer_comparison.get(operator_name)
+    if comparison:
+        compare = comparison
+
+        def comparison_expression(env):
+            left_value = left(env)
+            right_value = right(env)
+            if left_value.__class__ is Integer and right_value.__class__ is Integer:
+                if compare(left_value.value, right_value.value):
+                    return TRUE
+                return FALSE
+            return generic(left_value, right_value)
+
+        return comparison_expression
+
+    def infix_expression(env):
+        return generic(left(env), right(env))
+
+    return infix_expression
+
+
+def compile_prefix_expression(node: ast.Node) -> Compiled:
+    prefix_exp: ast.PrefixExpression = cast(ast.PrefixExpression, node)
+    operator_name = prefix_exp.operator
+    right = compile_node(prefix_exp.right)
+
+    if operator_name == "not":
+
+        def not_expression(env):
+            return evaluator.evaluate_not_operator_expression(right(env))
+
+        return not_expression
+
+    def prefix_expression(env):
+        result = evaluator.evaluate_prefix_expression(operator_name, right(env))
+        if result.__class__ is obj.Error:
+            raise LuaError(result)
+        return result
+
+    return prefix_expression
+
+
+def compile_if_expression(node: ast.Node) -> Compiled:
+    if_exp: ast.IfExpression = cast(ast.IfExpression, node)
+    condition = compile_node(if_exp.condition)
+    consequence = compile_node(if_exp.consequence)
+
+    if not if_exp.alternative:
+
+        def if_expression(env):
+            value = condition(env)
+            if value is NULL or value is FALSE:
+                return NULL
+            return consequence(env)
+
+        return if_expression
+
+    alternative = compile_node(if_exp.alternative)
+
+    def if_else_expression(env):
+        value = condition(env)
+        if value is NULL or value is FALSE:
+            return alternative(env)
+        return consequence(env)
+
+    return if_else_expression
+
+
+def compile_return_statement(node: ast.Node) -> Compiled:
+    return_statement: ast.ReturnStatement = cast(ast.ReturnStatement, node)
+    value = compile_node(return_statement.value)
+
+    def return_expression(env):
+        return obj.ReturnValue(value(env))
+
+    return return_expression
+
+
+def compile_assign_statement(node: ast.Node) -> Compiled:
+    assignment: ast.AssignStatement = cast(ast.AssignStatement, node)
+    name = assignment.name.value
+    value = compile_node(assignment.value)
+
+    def assign(env):
+        env.store[name] = value(env)
+        return None
+
+    return assign
+
+
+def compile_function_literal(node: ast.Node) -> Compiled:
+    fn_literal: ast.FunctionLiteral = cast(ast.FunctionLiteral, node)
+    body = fn_literal.body
+    parameters = fn_literal.parameters
+    invoke = compile_function_body(fn_literal)
+
+    if fn_literal.name:
+        name = fn_literal.name.value
+
+        def named_function(env):
+            env.store[name] = obj.Function(
+                body=body, env=env, parameters=parameters, compiled=invoke
+            )
+            return None
+
+        return named_function
+
+    def function(env):
+        return obj.Function(
+            body=body, env=env, parameters=parameters, compiled=invoke
+        )
+
+    return function
+
+
+def compile_function_body(fn_literal: ast.FunctionLiteral):
+    statements = list(fn_literal.body.statements)
+
+    # A trailing return is the same as the block value, skip the wrapper
+    if statements and type(statements[-1]) == ast.ReturnStatement:
+        last = cast(ast.ReturnStatement, statements[-1])
+        statements[-1] = ast.ExpressionStatement(
+            token=last.token, expression=last.value
+        )
+
+    block = compile_statements(statements)
+    body = fn_literal.body
+    steps = len(statements)
+    names = [x.value for x in fn_literal.parameters]
+    num_params = len(names)
+
+    def enter(fn_env, args):
+        active_state = state.active
+        if active_state is not None:
+            active_state.charge(steps)
+
+        call_env = obj.Environment(outer=fn_env)
+        store = call_env.store
+        if len(args) >= num_params:
+            for index in range(num_params):
+                store[names[index]] = args[index]
+        else:
+            for index in range(num_params):
+                store[names[index]] = args[index] if index < len(args) else NULL
+
+        active_profiler = profiler.active
+        if active_profiler is None:
+            result = block(call_env)
+        else:
+            active_profiler.enter(body)
+            try:
+                result = block(call_env)
+            finally:
+                active_profiler.leave()
+
+        if result.__class__ is obj.ReturnValue:
+            return result.value
+        return result
+
+    return tail_call_invoker(enter)
+
+
+def tail_call_invoker(enter):
+    """
+    Wraps a function body that may end in a TailCall, the tail calls
+    are made in a loop after the body has returned. The body is kept on
+    invoke.enter so the loop can run it without nesting another invoke.
+    """
+
+    def invoke(fn_env, args):
+        result = enter(fn_env, args)
+        if result.__class__ is TailCall:
+            return finish_tail_calls(result, fn_env)
+        return result
+
+    invoke.enter = enter  # type: ignore
+    return invoke
+
+
+def finish_tail_calls(result: Any, env: obj.Environment):
+    while result.__class__ is TailCall:
+        fn = result.fn
+        args = result.args
+
+        if fn.__class__ is obj.Function:
+            enter = getattr(fn.compiled, "enter", None)
+            if enter is not None:
+                result = enter(fn.env, args)
+                continue
+
+        return call_function(fn, args, env)
+    return result
+
+
+def call_function(fn: obj.Obj, args: List[obj.Obj], env: obj.Environment):
+    if fn.__class__ is obj.Function:
+        function = cast(obj.Function, fn)
+        if function.compiled is not None:
+            return function.compiled(function.env, args)
+        result = evaluator.apply_function(function, args, env)
+    elif fn.__class__ is obj.Builtin:
+        result = cast(obj.Builtin, fn).fn(*args)
+    else:
+        result = obj.Error.create("Not a function {0}", fn.type())
+
+    if result.__class__ is obj.Error:
+        raise LuaError(result)
+    return result
+
+
+def compile_call_expression(node: ast.Node) -> Compiled:
+    call_exp: ast.CallExpression = cast(ast.CallExpression, node)
+    function = compile_node(call_exp.function)
+    arguments = [compile_node(x) for x in call_exp.arguments]
+
+    if call_exp.tail_call:
+
+        def tail_call(env):
+            return TailCall(function(env), [x(env) for x in arguments])
+
+        return tail_call
+
+    def call(env):
+        fn = function(env)
+        args = [x(env) for x in arguments]
+        return call_function(fn, args, env)
+
+    return call
+
+
+def compile_table_literal(node: ast.Node) -> Compiled:
+    table_literal: ast.TableLiteral = cast(ast.TableLiteral, node)
+    pairs = [
+        (compile_node(key), compile_node(value))
+        for key, value in table_literal.elements
+    ]
+
+    size = state.table_size(len(pairs))
+
+    def table(env):
+        active_state = state.active
+        if active_state is not None:
+            error = active_state.allocate(size)
+            if error is not None:
+                raise LuaError(error)
+
+        table = obj.Table()
+        for key, value in pairs:
+            table.set(key(env), value(env))
+        return table
+
+    return table
+
+
+def compile_index_expression(node: ast.Node) -> Compiled:
+    index_exp: ast.IndexExpression = cast(ast.IndexExpression, node)
+    left = compile_node(index_exp.left)
+    index = compile_node(index_exp.index)
+
+    def index_expression(env):
+        result = evaluator.evaluate_index_expression(left(env), index(env))
+        if result.__class__ is obj.Error:
+            raise LuaError(result)
+        return result
+
+    return index_expression
+
+
+node_compilers: Dict[type, Callable[[ast.Node], Compiled]] = {
+    ast.Program: compile_program,
+    ast.BlockStatement: compile_block_statement,
+    ast.ExpressionStatement: compile_expression_statement,
+    ast.IntegerLiteral: compile_integer_literal,
+    ast.FloatLiteral: compile_float_literal,
+    ast.StringLiteral: compile_string_literal,
+    ast.Boolean: compile_boolean,
+    ast.Identifier: compile_identifier,
+    ast.InfixExpression: compile_infix_expression,
+    ast.PrefixExpression: compile_prefix_expression,
+    ast.IfExpression: compile_if_expression,
+    ast.ReturnStatement: compile_return_statement,
+    ast.AssignStatement: compile_assign_statement,
+    ast.FunctionLiteral: compile_function_literal,
+    ast.CallExpression: compile_call_expression,
+    ast.TableLiteral: compile_table_literal,
+    ast.IndexExpression: compile_index_expression,
+}
@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+from enum import IntEnum, auto
+from typing import Dict, List
+
+
+Instructions = List[int]
+
+
+class OpCode(IntEnum):
+    CONSTANT = auto()
+    NIL = auto()
+    TRUE = auto()
+    FALSE = auto()
+    NO_VALUE = auto()
+    POP = auto()
+
+    ADD = auto()
+    SUB = auto()
+    MUL = auto()
+    DIV = auto()
+    MOD = auto()
+    CONCAT = auto()
+    EQ = auto()
+    NOT_EQ = auto()
+    GT = auto()
+    GTE = auto()
+    LT = auto()
+    LTE = auto()
+    AND = auto()
+    OR = auto()
+
+    MINUS = auto()
+    NOT = auto()
+    LEN = auto()
+
+    JUMP = auto()
+    JUMP_NOT_TRUTHY = auto()
+
+    GET_NAME = auto()
+    SET_NAME = auto()
+
+    TABLE = auto()
+    INDEX = auto()
+
+    CALL = auto()
+    TAIL_CALL = auto()
+    RETURN_VALUE = auto()
+    CLOSURE = auto()
+
+
+@dataclass
+class Definition:
+    name: str
+    operand_count: int = 0
+
+
+definitions: Dict[OpCode, Definition] = {
+    op: Definition(name=op.name) for op in OpCode
+}
+
+for op in [
+    OpCode.CONSTANT,
+    OpCode.JUMP,
+    OpCode.JUMP_NOT_TRUTHY,
+    OpCode.GET_NAME,
+    OpCode.SET_NAME,
+    OpCode.TABLE,
+    OpCode.CALL,
+    OpCode.TAIL_CALL,
+    OpCode.CLOSURE,
+]:
+    definitions[op].operand_count = 1
+
+
+infix_operators: Dict[str, OpCode] = {
+    "+": OpCode.ADD,
+    "-": OpCode.SUB,
+    "*": OpCode.MUL,
+    "/": OpCode.DIV,
+    "%": OpCode.MOD,
+    "..": OpCode.CONCAT,
+    "==": OpCode.EQ,
+    "~=": OpCode.NOT_EQ,
+    ">": OpCode.GT,
+    ">=": OpCode.GTE,
+    "<": OpCode.LT,
+    "<=": OpCode.LTE,
+    "and": OpCode.AND,
+    "or": OpCode.OR,
+}
+
+prefix_operators: Dict[str, OpCode] = {
+    "-": OpCode.MINUS,
+    "not": OpCode.NOT,
+    "#": OpCode.LEN,
+}
+
+operator_names: Dict[int, str] = {
+    **{int(op): name for name, op in infix_operators.items()},
+    **{int(op): name for name, op in prefix_operators.items()},
+}
+
+
+def lookup(op: int) -> Definition:
+    return definitions[OpCode(op)]
+
+
+def make(op: OpCode, *operands: int) -> Instructions:
+    definition = definitions[op]
+    if len(operands) != definition.operand_count:
+        raise ValueError(
+            "{0} expects {1} operands, got {2}".format(
+                definition.name, definition.operand_count, len(operands)
+            )
+        )
+
+    return [int(op), *operands]
+
+
+def instructions_to_string(instructions: Instructions) -> str:
+    out: List[str] = []
+
+    pos: int = 0
+    while pos < len(instructions):
+        definition = lookup(instructions[pos])
+        operands = instructions[pos + 1 : pos + 1 + definition.operand_count]
+
+        line = "{0:04d} {1}".format(pos, definition.name)
+        if operands:
+            line = line + " " + " ".join(str(x) for x in operands)
+        out.append(line)
+
+        pos = pos + 1 + definition.operand_count
+
+    return "\n".join(out)
@@ -0,0 +1,275 @@
+from dataclasses import dataclass, field
+from typing import cast, Dict, List, Optional
+
+from . import ast
+from . import obj
+from . import code
+from .code import OpCode, Instructions
+
+
+@dataclass
+class Bytecode:
+    instructions: Instructions
+    constants: List[obj.Obj]
+    names: List[str]
+
+
+@dataclass
+class CompilationScope:
+    instructions: Instructions = field(default_factory=list)
+
+
+class Compiler:
+    def __init__(self) -> None:
+        self.constants: List[obj.Obj] = []
+        self.names: List[str] = []
+        self.name_indexes: Dict[str, int] = {}
+        self.scopes: List[CompilationScope] = [CompilationScope()]
+        self.errors: List[str] = []
+
+    def bytecode(self) -> Bytecode:
+        return Bytecode(
+            instructions=self.current_instructions(),
+            constants=self.constants,
+            names=self.names,
+        )
+
+    def compile(self, program: ast.Program) -> None:
+        self.compile_statements(program.statements)
+        self.emit(OpCode.RETURN_VALUE)
+
+    def compile_statements(self, statements: List[ast.Node]) -> None:
+        """
+        Compile a list of statements so that exactly one value, the
+        value of the last statement, is left on the stack. This mirrors
+        the way the evaluator returns the result of the last statement.
+        """
+
+        if not statements:
+            self.emit(OpCode.NO_VALUE)
+            return
+
+        last_index = len(statements) - 1
+        for index, statement in enumerate(statements):
+            self.compile_statement(statement, keep=index == last_index)
+
+    def compile_statement(self, node: ast.Node, keep: bool) -> None:
+        klass = type(node)
+
+        if klass == ast.AssignStatement:
+            assignment: ast.AssignStatement = cast(ast.AssignStatement, node)
+            self.compile_node(assignment.value)
+            self.emit(OpCode.SET_NAME, self.add_name(assignment.name.value))
+            if keep:
+                self.emit(OpCode.NO_VALUE)
+            return
+
+        if klass == ast.ReturnStatement:
+            return_statement: ast.ReturnStatement = cast(
+                ast.ReturnStatement, node
+            )
+            self.compile_node(return_statement.value)
+            self.emit(OpCode.RETURN_VALUE)
+            return
+
+        if klass == ast.FunctionLiteral:
+            fn_literal: ast.FunctionLiteral = cast(ast.FunctionLiteral, node)
+            if fn_literal.name:
+                self.compile_function_literal(fn_literal)
+                self.emit(OpCode.SET_NAME, self.add_name(fn_literal.name.value))
+                if keep:
+                    self.emit(OpCode.NO_VALUE)
+                return
+
+        if klass == ast.ExpressionStatement:
+            exp: ast.ExpressionStatement = cast(ast.ExpressionStatement, node)
+            if not exp.expression:
+                if keep:
+                    self.emit(OpCode.NO_VALUE)
+                return
+            self.compile_statement(exp.expression, keep)
+            return
+
+        self.compile_node(node)
+        if not keep:
+            self.emit(OpCode.POP)
+
+    def compile_node(self, node: ast.Node) -> None:
+        klass = type(node)
+
+        if klass == ast.IntegerLiteral:
+            integer_literal: ast.IntegerLiteral = cast(
+                ast.IntegerLiteral, node
+            )
+            integer = obj.Integer.create(integer_literal.value)
+            self.emit(OpCode.CONSTANT, self.add_constant(integer))
+            return
+
+        if klass == ast.FloatLiteral:
+            float_literal: ast.FloatLiteral = cast(ast.FloatLiteral, node)
+            number = obj.Float(float_literal.value)
+            self.emit(OpCode.CONSTANT, self.add_constant(number))
+            return
+
+        if klass == ast.StringLiteral:
+            string_literal: ast.StringLiteral = cast(ast.StringLiteral, node)
+            string = obj.String.intern(string_literal.value)
+            self.emit(OpCode.CONSTANT, self.add_constant(string))
+            return
+
+        if klass == ast.Boolean:
+            boolean: ast.Boolean = cast(ast.Boolean, node)
+            self.emit(OpCode.TRUE if boolean.value else OpCode.FALSE)
+            return
+
+        if klass == ast.Identifier:
+            identifier: ast.Identifier = cast(ast.Identifier, node)
+            self.emit(OpCode.GET_NAME, self.add_name(identifier.value))
+            return
+
+        if klass == ast.InfixExpression:
+            infix_exp: ast.InfixExpression = cast(ast.InfixExpression, node)
+            infix_op: Optional[OpCode] = code.infix_operators.get(
+                infix_exp.operator
+            )
+            if infix_op is None:
+                self.errors.append(
+                    "Unknown infix operator {0}".format(infix_exp.operator)
+                )
+                return
+
+            self.compile_node(infix_exp.left)
+            self.compile_node(infix_exp.right)
+            self.emit(infix_op)
+            return
+
+        if klass == ast.PrefixExpression:
+            prefix_exp: ast.PrefixExpression = cast(ast.PrefixExpression, node)
+            prefix_op: Optional[OpCode] = code.prefix_operators.get(
+                prefix_exp.operator
+            )
+            if prefix_op is None:
+                self.errors.append(
+                    "Unknown prefix operator {0}".format(prefix_exp.operator)
+                )
+                return
+
+            self.compile_node(prefix_exp.right)
+            self.emit(prefix_op)
+            return
+
+        if klass == ast.IfExpression:
+            if_exp: ast.IfExpression = cast(ast.IfExpression, node)
+            self.compile_if_expression(if_exp)
+            return
+
+        if klass == ast.BlockStatement:
+            block_statement: ast.BlockStatement = cast(
+                ast.BlockStatement, node
+            )
+            self.compile_statements(block_statement.statements)
+            return
+
+        if klass == ast.FunctionLiteral:
+            fn_literal: ast.FunctionLiteral = cast(ast.FunctionLiteral, node)
+            self.compile_function_literal(fn_literal)
+            return
+
+        if klass == ast.CallExpression:
+            call_exp: ast.CallExpression = cast(ast.CallExpression, node)
+            self.compile_node(call_exp.function)
+            for argument in call_exp.arguments:
+                self.compile_node(argument)
+            call_op = OpCode.TAIL_CALL if call_exp.tail_call else OpCode.CALL
+            self.emit(call_op, len(call_exp.arguments))
+            return
+
+        if klass == ast.TableLiteral:
+            table_literal: ast.TableLiteral = cast(ast.TableLiteral, node)
+            for key, value in table_literal.elements:
+                self.compile_node(key)
+                self.compile_node(value)
+            self.emit(OpCode.TABLE, len(table_literal.elements))
+            return
+
+        if klass == ast.IndexExpression:
+            index_exp: ast.IndexExpression = cast(ast.IndexExpression, node)
+            self.compile_node(index_exp.left)
+            self.compile_node(index_exp.index)
+            self.emit(OpCode.INDEX)
+            return
+
+        if klass in [
+            ast.ExpressionStatement,
+            ast.AssignStatement,
+            ast.ReturnStatement,
+        ]:
+            self.compile_statement(node, keep=True)
+            return
+
+        self.errors.append("Unable to compile {0}".format(klass.__name__))
+
+    def compile_if_expression(self, if_exp: ast.IfExpression) -> None:
+        self.compile_node(if_exp.condition)
+
+        jump_not_truthy_pos = self.emit(OpCode.JUMP_NOT_TRUTHY, 0)
+        self.compile_statements(if_exp.consequence.statements)
+        jump_pos = self.emit(OpCode.JUMP, 0)
+
+        self.change_operand(jump_not_truthy_pos, len(self.current_instructions()))
+
+        if if_exp.alternative:
+            self.compile_statements(if_exp.alternative.statements)
+        else:
+            self.emit(OpCode.NIL)
+
+        self.change_operand(jump_pos, len(self.current_instructions()))
+
+    def compile_function_literal(self, fn_literal: ast.FunctionLiteral) -> None:
+        self.enter_scope()
+
+        statements = fn_literal.body.statements
+        self.compile_statements(statements)
+        if not statements or type(statements[-1]) != ast.ReturnStatement:
+            self.emit(OpCode.RETURN_VALUE)
+
+        instructions = self.leave_scope()
+
+        compiled_fn = obj.CompiledFunction(
+            instructions=instructions,
+            constants=self.constants,
+            names=self.names,
+            body=fn_literal.body,
+            parameters=fn_literal.parameters,
+        )
+        self.emit(OpCode.CLOSURE, self.add_constant(compiled_fn))
+
+    def add_constant(self, value: obj.Obj) -> int:
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def add_name(self, name: str) -> int:
+        index = self.name_indexes.get(name)
+        if index is None:
+            index = len(self.names)
+            self.names.append(name)
+            self.name_indexes[name] = index
+        return index
+
+    def emit(self, op: OpCode, *operands: int) -> int:
+        instructions = self.current_instructions()
+        pos = len(instructions)
+        instructions.extend(code.make(op, *operands))
+        return pos
+
+    def change_operand(self, op_pos: int, operand: int) -> None:
+        self.current_instructions()[op_pos + 1] = operand
+
+    def current_instructions(self) -> Instructions:
+        return self.scopes[-1].instructions
+
+    def enter_scope(self) -> None:
+        self.scopes.append(CompilationScope())
+
+    def leave_scope(self) -> Instructions:
+        return self.scopes.pop().instructions
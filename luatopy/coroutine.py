@@ -0,0 +1,150 @@
+"""
+The coroutine library. Coroutines run on the stack evaluator whatever
+backend created them, so a yield suspends the generators of the
+coroutine instead of copying any state. Functions created by the
+compiling backends are evaluated from their body inside a coroutine.
+
+The dialect has no multiple results, so resume returns the value that
+was yielded or returned, and an error in the coroutine is raised in the
+code that resumed it instead of being returned.
+"""
+
+from typing import cast, Any, Dict, List, Optional
+
+from . import obj
+from . import profiler
+from . import stack_evaluator
+from .builtins import builtins, register
+from .obj import NULL, LuaError
+
+
+OUTSIDE_COROUTINE: str = "attempt to yield from outside a coroutine"
+
+
+def coroutine_yield(*args: obj.Obj) -> obj.Obj:
+    # Only reached when the call is not made by a coroutine running on the
+    # stack evaluator, but from a compiled function or the main program
+    if running is None:
+        return obj.Error.create(OUTSIDE_COROUTINE)
+    return obj.Error.create("attempt to yield across a C-call boundary")
+
+
+# Recognized by the stack evaluator, which suspends the coroutine instead
+# of calling it
+YIELD: obj.Builtin = obj.Builtin(fn=coroutine_yield)
+
+
+def resume(coroutine: obj.Coroutine, args: List[obj.Obj]) -> obj.Obj:
+    """
+    Runs coroutine until it yields or returns and hands back the value,
+    a runtime error in the coroutine is returned and leaves it dead
+    """
+
+    global running
+
+    if coroutine.status == "dead":
+        return obj.Error.create("cannot resume dead coroutine")
+    if coroutine.status != "suspended":
+        return obj.Error.create("cannot resume non-suspended coroutine")
+
+    value: Any = None
+    if coroutine.frames is None:
+        # Functions of the compiling backends are run from their body as
+        # well, so they can yield
+        coroutine.evaluator = stack_evaluator.StackEvaluator(
+            run_compiled=True
+        )
+        fn = coroutine.fn
+        env = fn.env if fn.__class__ is obj.Function else None
+        coroutine.frames = [coroutine.evaluator.call(fn, args, env)]
+    else:
+        # The value the suspended coroutine.yield call returns
+        value = args[0] if args else NULL
+
+    # Calls of the coroutine that are profiled go on top of the frames of
+    # the code that resumes it, until it yields again
+    active_profiler = profiler.active
+    if coroutine.profiled is not None:
+        active_profiler, suspended = coroutine.profiled
+        coroutine.profiled = None
+    else:
+        suspended = []
+    profiler_depth = 0
+    if active_profiler is not None:
+        profiler_depth = len(active_profiler.frames)
+        active_profiler.resume(suspended)
+
+    previous = running
+    if previous is not None:
+        previous.status = "normal"
+    running = coroutine
+    coroutine.status = "running"
+
+    try:
+        result = coroutine.evaluator.run(coroutine.frames, value, True)
+    except LuaError as e:
+        result = e.error
+    finally:
+        running = previous
+        if previous is not None:
+            previous.status = "running"
+
+    if result.__class__ is stack_evaluator.Suspend:
+        if active_profiler is not None:
+            coroutine.profiled = (
+                active_profiler,
+                active_profiler.suspend(profiler_depth),
+            )
+        coroutine.status = "suspended"
+        return result.value
+
+    # Returned or failed, the generators are done with
+    coroutine.status = "dead"
+    coroutine.frames = []
+    coroutine.evaluator = None
+    return result if result is not None else NULL
+
+
+def coroutine_create(*args: obj.Obj) -> obj.Obj:
+    if not args or args[0].__class__ not in (obj.Function, obj.Builtin):
+        return obj.Error.create("Bad argument to create, function expected")
+    return obj.Coroutine(fn=args[0])
+
+
+def coroutine_resume(*args: obj.Obj) -> obj.Obj:
+    if not args or args[0].__class__ is not obj.Coroutine:
+        return obj.Error.create("Bad argument to resume, coroutine expected")
+    return resume(cast(obj.Coroutine, args[0]), list(args[1:]))
+
+
+def coroutine_status(*args: obj.Obj) -> obj.Obj:
+    if not args or args[0].__class__ is not obj.Coroutine:
+        return obj.Error.create("Bad argument to status, coroutine expected")
+    return obj.String.intern(cast(obj.Coroutine, args[0]).status)
+
+
+def coroutine_wrap(*args: obj.Obj) -> obj.Obj:
+    coroutine = coroutine_create(*args)
+    if coroutine.__class__ is obj.Error:
+        return coroutine
+
+    def wrapped(*resume_args: obj.Obj) -> obj.Obj:
+        return resume(cast(obj.Coroutine, coroutine), list(resume_args))
+
+    return obj.Builtin(fn=wrapped)
+
+
+functions: Dict[str, obj.Obj] = {}
+functions = register(functions, "create", coroutine_create)
+functions = register(functions, "resume", coroutine_resume)
+functions = register(functions, "status", coroutine_status)
+functions = register(functions, "wrap", coroutine_wrap)
+functions["yield"] = YIELD
+
+builtins["coroutine"] = obj.Table(
+    elements={obj.String.intern(x): y for x, y in functions.items()}
+)
+
+
+# The coroutine that is running, None in the main program
+running: Optional[obj.Coroutine] = None
@@ -1,196 +1,270 @@
-from typing import cast, Optional, List, Tuple, Dict
+import operator
+from typing import cast, Any, Callable, Optional, List, Tuple, Dict
 
 from . import ast
 from . import obj
+from . import resolver
+from . import profiler
+from . import state
+from .code import OpCode, infix_operators, operator_names
 from luatopy.builtins import builtins
 
-from .obj import TRUE, FALSE, NULL
+# Registers the coroutine, table and array libraries with the builtins
+from . import array  # noqa: F401
+from . import coroutine  # noqa: F401
+from . import table  # noqa: F401
+
+from .obj import TRUE, FALSE, NULL, UNSET, LocalEnvironment
+from .obj import LuaError, Return
+
+
+NodeHandler = Callable[[Any, obj.Environment], Any]
+
+node_handlers: Dict[type, NodeHandler] = {}
+
+
+def register(store, node_type, fn):
+    store[node_type] = fn
+    return store
 
 
 def evaluate(node: ast.Node, env: obj.Environment):
-    klass = type(node)
+    handler = node_handlers.get(type(node))
+    if handler is None:
+        return None
 
-    if klass == ast.Program:
-        program: ast.Program = cast(ast.Program, node)
-        return evaluate_program(program, env)
+    return handler(node, env)
 
-    if klass == ast.ExpressionStatement:
-        exp: ast.ExpressionStatement = cast(ast.ExpressionStatement, node)
-        return evaluate(exp.expression, env)
 
-    if klass == ast.IntegerLiteral:
-        integer_literal: ast.IntegerLiteral = cast(ast.IntegerLiteral, node)
-        return obj.Integer(value=integer_literal.value)
+def evaluate_expression_statement(
+    exp: ast.ExpressionStatement, env: obj.Environment
+):
+    return evaluate(exp.expression, env)
 
-    if klass == ast.StringLiteral:
-        string_literal: ast.StringLiteral = cast(ast.StringLiteral, node)
-        return obj.String(value=string_literal.value)
 
-    if klass == ast.Boolean:
-        boolean: ast.Boolean = cast(ast.Boolean, node)
-        return native_bool_to_bool_obj(boolean.value)
+def evaluate_integer_literal(
+    integer_literal: ast.IntegerLiteral, env: obj.Environment
+) -> obj.Obj:
+    return obj.Integer.create(integer_literal.value)
 
-    if klass == ast.PrefixExpression:
-        prefix_exp: ast.PrefixExpression = cast(ast.PrefixExpression, node)
-        prefix_right: obj.Obj = evaluate(prefix_exp.right, env)
 
-        if is_error(prefix_right):
-            return prefix_right
+def evaluate_float_literal(
+    float_literal: ast.FloatLiteral, env: obj.Environment
+) -> obj.Obj:
+    return obj.Float(float_literal.value)
 
-        return evaluate_prefix_expression(prefix_exp.operator, prefix_right)
 
-    if klass == ast.InfixExpression:
-        infix_exp: ast.InfixExpression = cast(ast.InfixExpression, node)
+def evaluate_string_literal(
+    string_literal: ast.StringLiteral, env: obj.Environment
+) -> obj.Obj:
+    return obj.String.intern(string_literal.value)
 
-        infix_left: obj.Obj = evaluate(infix_exp.left, env)
-        if is_error(infix_left):
-            return infix_left
 
-        infix_right: obj.Obj = evaluate(infix_exp.right, env)
-        if is_error(infix_right):
-            return infix_right
+def evaluate_boolean(boolean: ast.Boolean, env: obj.Environment) -> obj.Obj:
+    return native_bool_to_bool_obj(boolean.value)
 
-        return evaluate_infix_expression(
-            infix_exp.operator, infix_left, infix_right
-        )
 
-    if klass == ast.BlockStatement:
-        block_statement: ast.BlockStatement = cast(ast.BlockStatement, node)
-        return evaluate_block_statement(block_statement, env)
+def evaluate_prefix_node(
+    prefix_exp: ast.PrefixExpression, env: obj.Environment
+) -> obj.Obj:
+    prefix_right: obj.Obj = evaluate(prefix_exp.right, env)
+
+    result = evaluate_prefix_expression(prefix_exp.operator, prefix_right)
+    if result.__class__ is obj.Error:
+        raise LuaError(result)
+    return result
 
-    if klass == ast.IfExpression:
-        if_exp: ast.IfExpression = cast(ast.IfExpression, node)
-        return eval_if_expression(if_exp, env)
 
-    if klass == ast.ReturnStatement:
-        return_statement: ast.ReturnStatement = cast(ast.ReturnStatement, node)
-        return_value: obj.Obj = evaluate(return_statement.value, env)
-        if is_error(return_value):
-            return return_value
-        return obj.ReturnValue(return_value)
+def evaluate_infix_node(
+    infix_exp: ast.InfixExpression, env: obj.Environment
+) -> obj.Obj:
+    infix_left: obj.Obj = evaluate(infix_exp.left, env)
+    infix_right: obj.Obj = evaluate(infix_exp.right, env)
 
-    if klass == ast.AssignStatement:
-        assignment: ast.AssignStatement = cast(ast.AssignStatement, node)
-        assignment_value: obj.Obj = evaluate(assignment.value, env)
+    # Set by the parser for every operator it reads
+    opcode = cast(int, infix_exp.opcode)
 
-        if is_error(assignment_value):
-            return assignment_value
-        env.set(assignment.name.value, assignment_value)
-        return None
+    result = evaluate_infix(opcode, infix_left, infix_right)
+    if result.__class__ is obj.Error:
+        raise LuaError(result)
+    return result
 
-    if klass == ast.Identifier:
-        identifier: ast.Identifier = cast(ast.Identifier, node)
-        return evaluate_identifier(identifier, env)
 
-    if klass == ast.FunctionLiteral:
-        fn_literal: ast.FunctionLiteral = cast(ast.FunctionLiteral, node)
+def evaluate_return_statement(
+    return_statement: ast.ReturnStatement, env: obj.Environment
+):
+    raise Return(evaluate(return_statement.value, env))
+
+
+def evaluate_assign_statement(
+    assignment: ast.AssignStatement, env: obj.Environment
+):
+    assignment_value: obj.Obj = evaluate(assignment.value, env)
+
+    slot = assignment.name.slot
+    if slot is not None:
+        cast(obj.LocalEnvironment, env).slots[slot] = assignment_value
+    else:
+        env.set(assignment.name.value, assignment_value)
+    return None
 
-        if fn_literal.name:
-            funct_assignment = obj.Function(
-                body=fn_literal.body, parameters=fn_literal.parameters, env=env
-            )
-            env.set(fn_literal.name.value, funct_assignment)
-            return None
 
-        return obj.Function(
+def evaluate_function_literal(
+    fn_literal: ast.FunctionLiteral, env: obj.Environment
+):
+    if fn_literal.name:
+        funct_assignment = obj.Function(
             body=fn_literal.body, parameters=fn_literal.parameters, env=env
         )
+        slot = fn_literal.name.slot
+        if slot is not None:
+            cast(obj.LocalEnvironment, env).slots[slot] = funct_assignment
+        else:
+            env.set(fn_literal.name.value, funct_assignment)
+        return None
 
-    if klass == ast.CallExpression:
-        call_exp: ast.CallExpression = cast(ast.CallExpression, node)
-        fn_obj: obj.Obj = evaluate(call_exp.function, env)
+    return obj.Function(
+        body=fn_literal.body, parameters=fn_literal.parameters, env=env
+    )
 
-        if is_error(fn_obj):
-            return fn_obj
 
-        fn: obj.Function = cast(obj.Function, fn_obj)
-        args: List[obj.Obj] = evaluate_expressions(call_exp.arguments, env)
-        if len(args) > 1 and is_error(args[0]):
-            return args[0]
+def evaluate_call_expression(
+    call_exp: ast.CallExpression, env: obj.Environment
+) -> obj.Obj:
+    fn: obj.Obj = evaluate(call_exp.function, env)
+    args: List[obj.Obj] = evaluate_expressions(call_exp.arguments, env)
 
-        return apply_function(fn, args, env)
+    if call_exp.tail_call:
+        # Made by call_function once the current call has returned
+        return obj.TailCall(fn=fn, args=args)
 
-    if klass == ast.TableLiteral:
-        table_literal: ast.TableLiteral = cast(ast.TableLiteral, node)
-        elements = evaluate_expression_pairs(table_literal.elements, env)
-        # if len(elements) == 1 and is_error(elements):
-        # return paris[0]
+    return call_function(fn, args, env)
 
-        return obj.Table(elements=elements)
 
-    if klass == ast.IndexExpression:
-        index_expression: ast.IndexExpression = cast(ast.IndexExpression, node)
-        left: obj.Obj = evaluate(index_expression.left, env)
-        if is_error(left):
-            return left
+def evaluate_table_literal(
+    table_literal: ast.TableLiteral, env: obj.Environment
+) -> obj.Obj:
+    elements = evaluate_expression_pairs(table_literal.elements, env)
 
-        index: obj.Obj = evaluate(index_expression.index, env)
-        if is_error(index):
-            return index
+    active_state = state.active
+    if active_state is not None:
+        error = active_state.allocate(state.table_size(len(elements)))
+        if error is not None:
+            raise LuaError(error)
 
-        return evaluate_index_expression(left, index)
+    return obj.Table(elements=elements)
 
-    return None
+
+def evaluate_index_node(
+    index_expression: ast.IndexExpression, env: obj.Environment
+) -> obj.Obj:
+    left: obj.Obj = evaluate(index_expression.left, env)
+    index: obj.Obj = evaluate(index_expression.index, env)
+
+    result = evaluate_index_expression(left, index)
+    if result.__class__ is obj.Error:
+        raise LuaError(result)
+    return result
+
+
+INDEX_TYPES = (obj.Integer, obj.String, obj.Float)
 
 
 def evaluate_index_expression(left: obj.Obj, index: obj.Obj) -> obj.Obj:
-    if left.type() == obj.ObjType.TABLE and index.type() == obj.ObjType.INTEGER:
-        return evaluate_table_index_expression(
-            cast(obj.Table, left), cast(obj.Integer, index)
-        )
-    if left.type() == obj.ObjType.TABLE and index.type() == obj.ObjType.STRING:
-        return evaluate_table_key_expression(
-            cast(obj.Table, left), cast(obj.String, index)
-        )
+    # isinstance, so tables of the array library are indexed the same way
+    if isinstance(left, obj.Table) and index.__class__ in INDEX_TYPES:
+        return cast(obj.Table, left).get(index)
 
     return obj.Error.create("Index operation not supported")
 
 
-def evaluate_table_index_expression(
-    table: obj.Table, index: obj.Integer
+def apply_function(
+    fn: obj.Obj, args: List[obj.Obj], env: obj.Environment
 ) -> obj.Obj:
-    try:
-        return table.elements[index]
-    except:
-        return NULL
-
+    """
+    Entry point for the other backends, runtime errors are returned as
+    obj.Error instead of being raised
+    """
 
-def evaluate_table_key_expression(
-    table: obj.Table, index: obj.String
-) -> obj.Obj:
-    index_value: str = index.value
     try:
-        return table.elements[index]
-    except:
-        return NULL
+        return call_function(fn, args, env)
+    except LuaError as e:
+        return e.error
 
 
-def apply_function(
+def call_function(
     fn: obj.Obj, args: List[obj.Obj], env: obj.Environment
 ) -> obj.Obj:
-    if type(fn) == obj.Function:
+    if fn.__class__ is obj.Function:
         fn_fn = cast(obj.Function, fn)
-        extended_env = extend_function_env(fn_fn, args)
-        evaluated = evaluate(fn_fn.body, extended_env)
-        return unwrap_return_value(evaluated)
+        if fn_fn.compiled is not None:
+            # Created by one of the compiling backends
+            return fn_fn.compiled(fn_fn.env, args)
+
+        evaluated = call_body(fn_fn, args)
+
+        # Tail calls are made here, in a loop, instead of recursing
+        if evaluated.__class__ is obj.TailCall:
+            tail_call = cast(obj.TailCall, evaluated)
+            return apply_tail_call(tail_call, env)
 
-    if type(fn) == obj.Builtin:
+        return evaluated
+
+    if fn.__class__ is obj.Builtin:
         builtin_fn = cast(obj.Builtin, fn)
-        return builtin_fn.fn(*args)
+        result = builtin_fn.fn(*args)
+        if result.__class__ is obj.Error:
+            raise LuaError(result)
+        return result
+
+    raise LuaError(obj.Error.create("Not a function {0}", fn.type()))
 
-    return obj.Error.create("Not a function {0}", fn.type())
 
+def call_body(fn: obj.Function, args: List[obj.Obj]) -> obj.Obj:
+    extended_env = extend_function_env(fn, args)
 
-def unwrap_return_value(value: obj.Obj) -> obj.Obj:
-    if type(value) == obj.ReturnValue:
-        return_value = cast(obj.ReturnValue, value)
-        return return_value.value
-    return value
+    active_profiler = profiler.active
+    if active_profiler is not None:
+        active_profiler.enter(fn.body)
+
+    try:
+        return evaluate(fn.body, extended_env)
+    except Return as e:
+        return e.value
+    finally:
+        if active_profiler is not None:
+            active_profiler.leave()
+
+
+def apply_tail_call(tail_call: obj.TailCall, env: obj.Environment) -> obj.Obj:
+    fn = tail_call.fn
+    args = tail_call.args
+
+    while fn.__class__ is obj.Function and fn.compiled is None:  # type: ignore
+        evaluated = call_body(cast(obj.Function, fn), args)
+
+        if evaluated.__class__ is not obj.TailCall:
+            return evaluated
+
+        fn = evaluated.fn
+        args = evaluated.args
+
+    return call_function(fn, args, env)
 
 
 def extend_function_env(
     fn: obj.Function, args: List[obj.Obj]
 ) -> obj.Environment:
+    local_names = fn.body.local_names
+    if local_names is not None:
+        local_env = obj.LocalEnvironment(fn.env, local_names)
+        slots = local_env.slots
+        for index, parameter in enumerate(fn.parameters):
+            # Set by the resolver, which gave the body its local_names
+            slot = cast(int, parameter.slot)
+            slots[slot] = args[index] if index < len(args) else NULL
+        return local_env
+
     enclosed_env = obj.Environment.create_enclosed(fn.env)
 
     param: ast.Identifier
@@ -205,11 +279,7 @@ def evaluate_expressions(
     result: List[obj.Obj] = []
 
     for exp in expressions:
-        evaluated: obj.Obj = evaluate(exp, env)
-        if is_error(evaluated):
-            return [evaluated]
-
-        result.append(evaluated)
+        result.append(evaluate(exp, env))
 
     return result
 
@@ -230,6 +300,31 @@ def evaluate_expression_pairs(
 def evaluate_identifier(
     identifier: ast.Identifier, env: obj.Environment
 ) -> obj.Obj:
+    address = identifier.address
+    if address is not None:
+        try:
+            for depth, slot in address:
+                scope = env
+                while depth:
+                    scope = cast(obj.Environment, scope.outer)
+                    depth = depth - 1
+
+                value = cast(LocalEnvironment, scope).slots[slot]
+                if value is not UNSET:
+                    return value
+        except AttributeError:
+            # The compiling backends keep the locals of a call in a plain
+            # Environment, which a function they created meets when its
+            # body is evaluated here, as coroutines do. Found by name.
+            pass
+        else:
+            if env.__class__ is LocalEnvironment:
+                env = env.globals
+
+            store = env.store
+            if identifier.value in store:
+                return store[identifier.value]
+
     val, found = env.get(identifier.value, NULL)
     if found:
         return val
@@ -241,15 +336,21 @@ def evaluate_identifier(
 
 
 def evaluate_program(program: ast.Program, env: obj.Environment):
+    if not program.resolved:
+        resolver.resolve(program)
+
     result = None
-    for statement in program.statements:
-        result = evaluate(statement, env)
+    try:
+        active_state = state.active
+        if active_state is not None:
+            active_state.charge(len(program.statements))
 
-        if type(result) == obj.ReturnValue:
-            return_value: obj.ReturnValue = cast(obj.ReturnValue, result)
-            return return_value.value
-        if type(result) == obj.Error:
-            return result
+        for statement in program.statements:
+            result = evaluate(statement, env)
+    except Return as e:
+        return e.value
+    except LuaError as e:
+        return e.error
 
     return result
 
@@ -257,12 +358,15 @@ def evaluate_program(program: ast.Program, env: obj.Environment):
 def evaluate_block_statement(
     block_statement: ast.BlockStatement, env: obj.Environment
 ):
+    statements = block_statement.statements
+
+    active_state = state.active
+    if active_state is not None:
+        active_state.charge(len(statements))
+
     result = None
-    for statement in block_statement.statements:
+    for statement in statements:
         result = evaluate(statement, env)
-        if result != None:
-            if result.type() in [obj.ObjType.RETURN, obj.ObjType.ERROR]:
-                return result
 
     return result
 
@@ -270,9 +374,6 @@ def evaluate_block_statement(
 def eval_if_expression(if_exp: ast.IfExpression, env: obj.Environment):
     condition = evaluate(if_exp.condition, env)
 
-    if is_error(condition):
-        return condition
-
     if is_truthy(condition):
         return evaluate(if_exp.consequence, env)
     elif if_exp.alternative:
@@ -282,25 +383,7 @@ def eval_if_expression(if_exp: ast.IfExpression, env: obj.Environment):
 
 
 def is_truthy(obj: obj.Obj) -> bool:
-    if obj == NULL:
-        return False
-    if obj == TRUE:
-        return True
-    if obj == FALSE:
-        return False
-    return True
-
-
-def evaluate_statements(statements, env: obj.Environment):
-    result = None
-    for statement in statements:
-        result = evaluate(statement, env)
-
-        if type(result) == obj.ReturnValue:
-            return_value: obj.ReturnValue = cast(obj.ReturnValue, result)
-            return return_value.value
-
-    return result
+    return obj is not NULL and obj is not FALSE
 
 
 def evaluate_prefix_expression(operator: str, right: obj.Obj) -> obj.Obj:
@@ -317,11 +400,7 @@ def evaluate_prefix_expression(operator: str, right: obj.Obj) -> obj.Obj:
 
 
 def evaluate_not_operator_expression(right: obj.Obj) -> obj.Boolean:
-    if right == TRUE:
-        return FALSE
-    if right == FALSE:
-        return TRUE
-    if right == NULL:
+    if right is FALSE or right is NULL:
         return TRUE
     return FALSE
 
@@ -332,122 +411,204 @@ def evaluate_minus_operator_expression(right: obj.Obj) -> obj.Obj:
             "Attempt to perform arithmetic on a boolean value"
         )
 
+    if type(right) == obj.Float:
+        return obj.Float(0 - cast(obj.Float, right).value)
+
     if type(right) != obj.Integer:
         return NULL
 
     obj_int = cast(obj.Integer, right)
-    return obj.Integer(value=0 - obj_int.value)
+    return obj.Integer.create(0 - obj_int.value)
 
 
 def evaluate_length_operator_expression(right: obj.Obj) -> obj.Obj:
     if right.type() == obj.ObjType.STRING:
-        return obj.Integer(len(right.value))
+        return obj.Integer.create(cast(obj.String, right).length)
     if right.type() == obj.ObjType.TABLE:
-        length: int = 1
-        while True:
-            try:
-                right.elements[obj.Integer(value=length)]
-                length = length + 1
-            except:
-                break
-
-        return obj.Integer(length - 1)
+        return obj.Integer.create(cast(obj.Table, right).length())
     return NULL
 
 
 def evaluate_infix_expression(
     operator: str, left: obj.Obj, right: obj.Obj
 ) -> obj.Obj:
-    if type(left) == obj.Integer and type(right) == obj.Integer:
-        left_val = cast(obj.Integer, left)
-        right_val = cast(obj.Integer, right)
-        return evaluate_infix_integer_expression(operator, left_val, right_val)
-
-    if type(left) == obj.String and type(right) == obj.String:
-        left_str_val = cast(obj.String, left)
-        right_str_val = cast(obj.String, right)
-        return evaluate_infix_string_expression(
-            operator, left_str_val, right_str_val
-        )
+    opcode = infix_operators.get(operator)
+    if opcode is None:
+        return obj.Error.create("Unknown infix operator {0}", operator)
+    return evaluate_infix(int(opcode), left, right)
 
-    if obj.ObjType.BOOLEAN in [left.type(), right.type()] and operator in [
-        "+",
-        "-",
-        "*",
-        "/",
-    ]:
+
+def evaluate_infix(opcode: int, left: obj.Obj, right: obj.Obj) -> obj.Obj:
+    handler = infix_handlers.get((opcode, left.__class__, right.__class__))
+    if handler is not None:
+        return handler(left, right)
+
+    left_class = left.__class__
+    right_class = right.__class__
+    if left_class in number_types and right_class in number_types:
+        # Operators without a meaning for numbers, like and/or
+        return NULL
+
+    if left_class is obj.String and right_class is obj.String:
+        return NULL
+
+    if (
+        obj.Boolean in (left_class, right_class)
+        and opcode in boolean_arithmetic_operators
+    ):
         return obj.Error.create(
             "Attempt to perform arithmetic on a boolean value"
         )
 
-    if operator == "==":
+    if opcode == OpCode.EQ:
         return native_bool_to_bool_obj(left == right)
 
-    if operator == "~=":
+    if opcode == OpCode.NOT_EQ:
         return native_bool_to_bool_obj(left != right)
 
-    if operator == "and":
+    if opcode == OpCode.AND:
         return native_bool_to_bool_obj(left.value and right.value)
 
-    if operator == "or":
+    if opcode == OpCode.OR:
         return native_bool_to_bool_obj(left.value or right.value)
 
-    return obj.Error.create("Unknown infix operator {0}", operator)
-
-
-def evaluate_infix_string_expression(
-    operator, left: obj.String, right: obj.String
-) -> obj.Obj:
-    if operator == "..":
-        return obj.String(left.value + right.value)
-    return NULL
+    return obj.Error.create(
+        "Unknown infix operator {0}", operator_names.get(opcode, opcode)
+    )
 
 
-def evaluate_infix_integer_expression(
-    operator, left: obj.Integer, right: obj.Integer
+def evaluate_infix_string_concat(
+    left: obj.String, right: obj.String
 ) -> obj.Obj:
-    if operator == "+":
-        return obj.Integer(left.value + right.value)
-
-    if operator == "-":
-        return obj.Integer(left.value - right.value)
-
-    if operator == "*":
-        return obj.Integer(left.value * right.value)
-
-    if operator == "/":
-        return obj.Float(left.value / right.value)
-
-    if operator == "%":
-        return obj.Float(left.value % right.value)
-
-    if operator == ">":
-        return native_bool_to_bool_obj(left.value > right.value)
-
-    if operator == ">=":
-        return native_bool_to_bool_obj(left.value >= right.value)
-
-    if operator == "<":
-        return native_bool_to_bool_obj(left.value < right.value)
-
-    if operator == "<=":
-        return native_bool_to_bool_obj(left.value <= right.value)
-
-    if operator == "==":
-        return native_bool_to_bool_obj(left.value == right.value)
+    active_state = state.active
+    if active_state is not None:
+        error = active_state.allocate(state.string_size(right.length))
+        if error is not None:
+            return error
+
+    return obj.String.concat(left, right)
+
+
+InfixHandler = Callable[[Any, Any], obj.Obj]
+
+# Keyed by (opcode, left class, right class), pairs without a handler go
+# through the generic rules of evaluate_infix
+infix_handlers: Dict[Tuple[int, type, type], InfixHandler] = {}
+
+number_types: Tuple[type, ...] = (obj.Integer, obj.Float)
+
+boolean_arithmetic_operators: Tuple[int, ...] = (
+    OpCode.ADD,
+    OpCode.SUB,
+    OpCode.MUL,
+    OpCode.DIV,
+)
+
+# Integer operands give an Integer, anything involving a Float (and
+# division or modulo of integers) gives a Float
+arithmetic_operators: Dict[OpCode, Callable[[Any, Any], Any]] = {
+    OpCode.ADD: operator.add,
+    OpCode.SUB: operator.sub,
+    OpCode.MUL: operator.mul,
+    OpCode.DIV: operator.truediv,
+    OpCode.MOD: operator.mod,
+}
+
+integer_result_operators: Tuple[OpCode, ...] = (
+    OpCode.ADD,
+    OpCode.SUB,
+    OpCode.MUL,
+)
+
+comparison_operators: Dict[OpCode, Callable[[Any, Any], bool]] = {
+    OpCode.GT: operator.gt,
+    OpCode.GTE: operator.ge,
+    OpCode.LT: operator.lt,
+    OpCode.LTE: operator.le,
+    OpCode.EQ: operator.eq,
+    OpCode.NOT_EQ: operator.ne,
+}
+
+
+def arithmetic_handler(
+    op: Callable[[Any, Any], Any], create: Callable[[Any], obj.Obj]
+) -> InfixHandler:
+    def handler(left, right):
+        return create(op(left.value, right.value))
+
+    return handler
+
+
+def comparison_handler(op: Callable[[Any, Any], bool]) -> InfixHandler:
+    def handler(left, right):
+        return TRUE if op(left.value, right.value) else FALSE
+
+    return handler
+
+
+for left_type in number_types:
+    for right_type in number_types:
+        for opcode, fn in arithmetic_operators.items():
+            integer_result = (
+                left_type is obj.Integer
+                and right_type is obj.Integer
+                and opcode in integer_result_operators
+            )
+            create = obj.Integer.create if integer_result else obj.Float
+            infix_handlers = register(
+                infix_handlers,
+                (int(opcode), left_type, right_type),
+                arithmetic_handler(fn, create),
+            )
 
-    if operator == "~=":
-        return native_bool_to_bool_obj(left.value != right.value)
+        for opcode, fn in comparison_operators.items():
+            infix_handlers = register(
+                infix_handlers,
+                (int(opcode), left_type, right_type),
+                comparison_handler(fn),
+            )
 
-    return NULL
+infix_handlers = register(
+    infix_handlers,
+    (int(OpCode.CONCAT), obj.String, obj.String),
+    evaluate_infix_string_concat,
+)
 
 
 def native_bool_to_bool_obj(value: bool) -> obj.Boolean:
     return TRUE if value else FALSE
 
 
-def is_error(instance: obj.Obj) -> bool:
-    if instance == None:
-        return False
-
-    return instance.type() == obj.ObjType.ERROR
+node_handlers = register(node_handlers, ast.Program, evaluate_program)
+node_handlers = register(
+    node_handlers, ast.ExpressionStatement, evaluate_expression_statement
+)
+node_handlers = register(
+    node_handlers, ast.IntegerLiteral, evaluate_integer_literal
+)
+node_handlers = register(
+    node_handlers, ast.FloatLiteral, evaluate_float_literal
+)
+node_handlers = register(node_handlers, ast.StringLiteral, evaluate_string_literal)
+node_handlers = register(node_handlers, ast.Boolean, evaluate_boolean)
+node_handlers = register(node_handlers, ast.PrefixExpression, evaluate_prefix_node)
+node_handlers = register(node_handlers, ast.InfixExpression, evaluate_infix_node)
+node_handlers = register(
+    node_handlers, ast.BlockStatement, evaluate_block_statement
+)
+node_handlers = register(node_handlers, ast.IfExpression, eval_if_expression)
+node_handlers = register(
+    node_handlers, ast.ReturnStatement, evaluate_return_statement
+)
+node_handlers = register(
+    node_handlers, ast.AssignStatement, evaluate_assign_statement
+)
+node_handlers = register(node_handlers, ast.Identifier, evaluate_identifier)
+node_handlers = register(
+    node_handlers, ast.FunctionLiteral, evaluate_function_literal
+)
+node_handlers = register(
+    node_handlers, ast.CallExpression, evaluate_call_expression
+)
+node_handlers = register(node_handlers, ast.TableLiteral, evaluate_table_literal)
+node_handlers = register(node_handlers, ast.IndexExpression, evaluate_index_node)
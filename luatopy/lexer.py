@@ -1,44 +1,119 @@
+import codecs
+import mmap
+import os
 import re
-from io import StringIO
-from typing import Optional, Iterator
+import sys
+from typing import cast, Dict, IO, Iterator, Optional, Pattern, Union
 
 from .token import TokenType, Token
 
 
 EOF_MARKER: str = "<<EOF>>"
 
+# Number of characters (or bytes for binary streams) read at a time
+CHUNK_SIZE: int = 64 * 1024
+
+Source = Union[IO, mmap.mmap, str, os.PathLike]
+
+keywords: Dict[str, TokenType] = {
+    "nil": TokenType.NIL,
+    "and": TokenType.AND,
+    "or": TokenType.OR,
+    "not": TokenType.NOT,
+    "true": TokenType.TRUE,
+    "false": TokenType.FALSE,
+    "if": TokenType.IF,
+    "then": TokenType.THEN,
+    "else": TokenType.ELSE,
+    "end": TokenType.END,
+    "function": TokenType.FUNCTION,
+    "return": TokenType.RETURN,
+}
+
+operators: Dict[str, TokenType] = {
+    "\n": TokenType.NEWLINE,
+    ";": TokenType.SEMICOLON,
+    "%": TokenType.PERCENT,
+    "#": TokenType.HASH,
+    "(": TokenType.LPAREN,
+    ")": TokenType.RPAREN,
+    "{": TokenType.LBRACE,
+    "}": TokenType.RBRACE,
+    "[": TokenType.LBRACKET,
+    "]": TokenType.RBRACKET,
+    ",": TokenType.COMMA,
+    "+": TokenType.PLUS,
+    "-": TokenType.MINUS,
+    "*": TokenType.ASTERISK,
+    "/": TokenType.SLASH,
+    "=": TokenType.ASSIGN,
+    "==": TokenType.EQ,
+    "~=": TokenType.NOT_EQ,
+    "..": TokenType.CONCAT,
+    ".": TokenType.DOT,
+    ">": TokenType.GT,
+    ">=": TokenType.GTE,
+    "<": TokenType.LT,
+    "<=": TokenType.LTE,
+}
+
+# One alternative per kind of token, the order decides which one wins
+# when several could match at the same position. Anything not covered
+# ends up in the final catch all and becomes an ILLEGAL token. Leading
+# spaces are consumed as part of the match, trailing spaces at the end
+# of the source do not match at all and are skipped by finditer. The
+# empty start group marks where the token itself begins.
+master_pattern: Pattern = re.compile(
+    r"""
+    \ *(?P<start>)(?:
+      --\[\[(?P<multiline_comment>.*?)(?:\]\]--|\Z)
+    | --(?P<comment>[^\n]*)
+    | (?P<name>[a-zA-Z_][a-zA-Z0-9_]*)
+    | (?P<float>[0-9]+\.[0-9]+)
+    | (?P<number>[0-9]+)
+    | "(?P<double_quoted>(?:\\"|[^"])*)"?
+    | '(?P<single_quoted>(?:\\'|[^'])*)'?
+    | (?P<operator>==|~=|>=|<=|\.\.|[-\n;%\#(){}\[\],+*/=<>.])
+    | (?P<illegal>[^ ])
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
 
-class Lexer:
-    def __init__(self, source: StringIO) -> None:
-        self.source: str = source.getvalue()
-        self.pos: int = 0
-        self.read_pos: int = 0
-        self.ch: str = ""
-
-        self.read_char()
 
-    def read_char(self) -> None:
-        if self.read_pos >= len(self.source):
-            self.ch = EOF_MARKER
+class Lexer:
+    """
+    Pulls the source in chunks from a text or binary stream (including
+    mmap objects) or from a path, so only the part of the source around
+    the current token is kept in memory. Positions are offsets into the
+    whole source, not into the current chunk.
+    """
+
+    def __init__(self, source: Source, chunk_size: int = CHUNK_SIZE) -> None:
+        self.chunk_size: int = chunk_size
+        self.reader: Optional[Union[IO, mmap.mmap]] = None
+        self.owns_reader: bool = False
+        self.decoder: Optional[codecs.IncrementalDecoder] = None
+        self.exhausted: bool = False
+
+        if isinstance(source, (str, os.PathLike)):
+            self.reader = open(source, encoding="utf-8")
+            self.owns_reader = True
         else:
-            self.ch = self.source[self.read_pos]
+            self.reader = source
 
-        self.pos = self.read_pos
-        self.read_pos = self.read_pos + 1
+        self.buffer: str = ""
+        self.buffer_pos: int = 0
 
-    def peek_ahead(self, steps: int = 0) -> str:
-        if self.read_pos + steps >= len(self.source):
-            return EOF_MARKER
-        return self.source[self.read_pos + steps]
+        # Source offset of the first character in the buffer
+        self.offset: int = 0
 
-    def peek_behind(self, steps: int = 0) -> str:
-        if self.read_pos - steps >= len(self.source):
-            return EOF_MARKER
-        return self.source[self.read_pos - steps]
+        # Source offset right after the last token
+        self.pos: int = 0
 
-    def skip_whitespace(self) -> None:
-        while self.ch == " ":
-            self.read_char()
+        # Line of the last token and the source offset where it begins
+        self.line: int = 1
+        self.line_offset: int = 0
 
     def tokens(self) -> Iterator[Token]:
         while True:
@@ -48,281 +123,121 @@ class Lexer:
             if token.token_type == TokenType.EOF:
                 break
 
-    def next_token(self) -> Token:
-        self.skip_whitespace()
-
-        if self.ch == EOF_MARKER:
-            tok = Token(token_type=TokenType.EOF, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "\n":
-            tok = Token(token_type=TokenType.NEWLINE, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == ";":
-            tok = Token(token_type=TokenType.SEMICOLON, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "%":
-            tok = Token(token_type=TokenType.PERCENT, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "#":
-            tok = Token(token_type=TokenType.HASH, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "(":
-            tok = Token(token_type=TokenType.LPAREN, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == ")":
-            tok = Token(token_type=TokenType.RPAREN, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "{":
-            tok = Token(token_type=TokenType.LBRACE, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "}":
-            tok = Token(token_type=TokenType.RBRACE, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "[":
-            tok = Token(token_type=TokenType.LBRACKET, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "]":
-            tok = Token(token_type=TokenType.RBRACKET, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == ",":
-            tok = Token(token_type=TokenType.COMMA, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "+":
-            tok = Token(token_type=TokenType.PLUS, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "*":
-            tok = Token(token_type=TokenType.ASTERISK, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "/":
-            tok = Token(token_type=TokenType.SLASH, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == "=":
-            if self.peek_ahead() == "=":
-                literal = self.ch
-                self.read_char()
-                literal = literal + self.ch
-                self.read_char()
-                tok = Token(token_type=TokenType.EQ, literal=literal)
-                return tok
-
-            tok = Token(token_type=TokenType.ASSIGN, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if self.ch == ".":
-            if self.peek_ahead(0) == ".":
-                literal = self.ch
-                self.read_char()
-                literal = literal + self.ch
-                self.read_char()
-                tok = Token(token_type=TokenType.CONCAT, literal=literal)
-                return tok
-
-        if self.ch == "~":
-            if self.peek_ahead(0) == "=":
-                literal = self.ch
-                self.read_char()
-                literal = literal + self.ch
-                self.read_char()
-                tok = Token(token_type=TokenType.NOT_EQ, literal=literal)
-                return tok
-
-        if self.ch == ">":
-            if self.peek_ahead(0) == "=":
-                literal = self.ch
-                self.read_char()
-                literal = literal + self.ch
-                self.read_char()
-                tok = Token(token_type=TokenType.GTE, literal=literal)
-                return tok
-
-            literal = self.ch
-            self.read_char()
-            tok = Token(token_type=TokenType.GT, literal=literal)
-            return tok
-
-        if self.ch == "<":
-            if self.peek_ahead(0) == "=":
-                literal = self.ch
-                self.read_char()
-                literal = literal + self.ch
-                self.read_char()
-                tok = Token(token_type=TokenType.LTE, literal=literal)
-                return tok
-
-            literal = self.ch
-            self.read_char()
-            tok = Token(token_type=TokenType.LT, literal=literal)
-            return tok
-
-        if self.ch == "-":
-            if (
-                self.peek_ahead(0) == "-"
-                and self.peek_ahead(1) == "["
-                and self.peek_ahead(2) == "["
-            ):
-                comment = self.read_multiline_comment()
-                tok = Token(token_type=TokenType.COMMENT, literal=comment)
-                return tok
-
-            if self.peek_ahead(0) == "-":
-                comment = self.read_comment()
-                tok = Token(token_type=TokenType.COMMENT, literal=comment)
-                return tok
-
-            tok = Token(token_type=TokenType.MINUS, literal=self.ch)
-            self.read_char()
-            return tok
-
-        if is_letter(self.ch):
-            identifier = self.read_identifier()
-
-            if identifier == "nil":
-                return Token(token_type=TokenType.NIL, literal=identifier)
-
-            if identifier == "and":
-                return Token(token_type=TokenType.AND, literal=identifier)
-
-            if identifier == "or":
-                return Token(token_type=TokenType.OR, literal=identifier)
-
-            if identifier == "not":
-                return Token(token_type=TokenType.NOT, literal=identifier)
-
-            if identifier == "true":
-                return Token(token_type=TokenType.TRUE, literal=identifier)
-
-            if identifier == "false":
-                return Token(token_type=TokenType.FALSE, literal=identifier)
-
-            # TODO: Add is_keyword
-            if identifier == "if":
-                return Token(token_type=TokenType.IF, literal=identifier)
-
-            if identifier == "then":
-                return Token(token_type=TokenType.THEN, literal=identifier)
-
-            if identifier == "else":
-                return Token(token_type=TokenType.ELSE, literal=identifier)
-
-            if identifier == "end":
-                return Token(token_type=TokenType.END, literal=identifier)
-
-            if identifier == "function":
-                return Token(token_type=TokenType.FUNCTION, literal=identifier)
-
-            if identifier == "return":
-                return Token(token_type=TokenType.RETURN, literal=identifier)
-
-            return Token(token_type=TokenType.IDENTIFIER, literal=identifier)
-
-        if is_digit(self.ch):
-            value = self.read_number()
-            return Token(token_type=TokenType.INT, literal=value)
-
-        if self.ch == '"':
-            value = self.read_string('"')
-            return Token(token_type=TokenType.STR, literal=value)
-
-        if self.ch == "'":
-            value = self.read_string("'")
-            return Token(token_type=TokenType.STR, literal=value)
-
-        tok = Token(token_type=TokenType.ILLEGAL, literal=self.ch)
-        self.read_char()
-        return tok
-
-    def read_identifier(self) -> str:
-        start_position = self.pos
-        while self.ch != EOF_MARKER and (is_letter(
-            self.ch) or is_digit(self.ch)
-        ):
-            self.read_char()
-        return self.source[start_position : self.pos]
-
-    def read_number(self) -> str:
-        start_position = self.pos
-        while self.ch != EOF_MARKER and is_digit(self.ch):
-            self.read_char()
-        return self.source[start_position : self.pos]
-
-    def read_string(self, indicator: str = '"') -> str:
-        self.read_char()
-
-        start_position = self.pos
-        out: str = self.ch
-
-        while True:
-            self.read_char()
-
-            if self.ch == "\\" and self.peek_ahead(0) == indicator:
-                self.read_char()
-                out += indicator
+    def decode(self, data: Union[str, bytes]) -> str:
+        if isinstance(data, str):
+            return data
+
+        if self.decoder is None:
+            self.decoder = codecs.getincrementaldecoder("utf-8")()
+        return self.decoder.decode(data)
+
+    def fill_buffer(self) -> bool:
+        """
+        Replaces the consumed part of the buffer with the next chunk,
+        returns False once the source is exhausted.
+        """
+
+        # Nothing consumed means a single token spans the whole buffer,
+        # grow the reads so long tokens are not rescanned over and over
+        size = self.chunk_size
+        if self.buffer_pos == 0:
+            size = max(size, len(self.buffer))
+
+        chunk = ""
+        while not chunk and not self.exhausted:
+            data = cast(IO, self.reader).read(size)
+            if data:
+                # Binary chunks can end inside a multi byte character,
+                # the decoder then holds on to it and returns less
+                chunk = self.decode(data)
                 continue
 
-            if self.ch == indicator or self.ch == EOF_MARKER:
-                break
-
-            out = out + self.ch
-
-        self.read_char()
-        return out
-
-    def read_comment(self) -> str:
-        start_position = self.pos
-        while self.ch != "\n":
-            self.read_char()
-        return self.source[start_position + 2 : self.pos]
-
-    def read_multiline_comment(self) -> str:
-        start_position = self.pos
-        while not (
-            self.ch == "]"
-            and self.peek_ahead(0) == "]"
-            and self.peek_ahead(1) == "-"
-            and self.peek_ahead(2) == "-"
-        ):
-            self.read_char()
+            if self.decoder is not None:
+                chunk = self.decoder.decode(b"", final=True)
+            self.close()
 
-        for _ in range(0, 4):
-            self.read_char()
+        if not chunk:
+            return False
 
-        return self.source[start_position + 4 : self.pos - 4]
+        self.offset = self.offset + self.buffer_pos
+        self.buffer = self.buffer[self.buffer_pos :] + chunk
+        self.buffer_pos = 0
+        return True
 
+    def close(self) -> None:
+        self.exhausted = True
+        if self.owns_reader and self.reader is not None:
+            cast(IO, self.reader).close()
+        self.reader = None
 
-def is_letter(char) -> bool:
-    return bool(re.search(r"[a-zA-Z]|_", char))
-
+    def next_token(self) -> Token:
+        while True:
+            match = master_pattern.match(self.buffer, self.buffer_pos)
+
+            # A match running into the end of the buffer might continue
+            # in the next chunk, like a name or a string split in two.
+            # One character short of the end is not safe either, a number
+            # followed by the "." of a float split right after it has to
+            # be matched again with the digits that follow.
+            if match is None or (
+                match.end() >= len(self.buffer) - 1 and not self.exhausted
+            ):
+                if self.fill_buffer():
+                    continue
+
+            if match is None:
+                self.pos = self.offset + len(self.buffer)
+                return Token(
+                    token_type=TokenType.EOF,
+                    literal=EOF_MARKER,
+                    line=self.line,
+                    column=self.pos - self.line_offset + 1,
+                )
+            break
+
+        start = match.start("start")
+        end = match.end()
+        self.buffer_pos = end
+        self.pos = self.offset + end
+
+        line = self.line
+        column = self.offset + start - self.line_offset + 1
+
+        # Newlines are tokens of their own, but comments and strings can
+        # span several lines as well
+        newlines = self.buffer.count("\n", start, end)
+        if newlines:
+            self.line = line + newlines
+            self.line_offset = (
+                self.offset + self.buffer.rindex("\n", start, end) + 1
+            )
+
+        # Every alternative is a named group, so there always is one
+        kind = cast(str, match.lastgroup)
+        literal = match[kind]
+
+        if kind == "name":
+            # Names end up as keys of every environment, interned they
+            # compare by identity
+            literal = sys.intern(literal)
+            token_type = keywords.get(literal, TokenType.IDENTIFIER)
+        elif kind == "operator":
+            token_type = operators[literal]
+        elif kind == "number":
+            token_type = TokenType.INT
+        elif kind == "float":
+            token_type = TokenType.FLOAT
+        elif kind == "double_quoted":
+            token_type = TokenType.STR
+            literal = literal.replace('\\"', '"')
+        elif kind == "single_quoted":
+            token_type = TokenType.STR
+            literal = literal.replace("\\'", "'")
+        elif kind == "comment" or kind == "multiline_comment":
+            token_type = TokenType.COMMENT
+        else:
+            token_type = TokenType.ILLEGAL
 
-def is_digit(char) -> bool:
-    return bool(re.search(r"[0-9]", char))
+        return Token(
+            token_type=token_type, literal=literal, line=line, column=column
+        )
@@ -1,7 +1,8 @@
 from dataclasses import dataclass, field
-from typing import Any, Dict, Tuple, List, Optional, Callable
+from typing import cast, Any, Dict, Tuple, List, Optional, Callable
 from mypy_extensions import VarArg
 from enum import Enum, auto
+from types import MappingProxyType
 
 from luatopy import ast
 
@@ -17,9 +18,14 @@ class ObjType(Enum):
     STRING = auto()
     BUILTIN = auto()
     TABLE = auto()
+    COMPILED_FUNCTION = auto()
+    TAIL_CALL = auto()
+    COROUTINE = auto()
 
 
 class Obj:
+    __slots__ = ()
+
     def type(self) -> ObjType:
         pass
 
@@ -33,13 +39,13 @@ class Environment:
         self.outer: Optional["Environment"] = outer
 
     def get(self, name: str, default: Obj) -> Tuple[Obj, bool]:
-        val = self.store.get(name, default)
-        found = self.contains(name)
+        if name in self.store:
+            return (self.store[name], True)
 
-        if not found and self.outer:
+        if self.outer:
             return self.outer.get(name, default)
 
-        return (val, found)
+        return (default, False)
 
     def contains(self, name: str) -> bool:
         return name in self.store
@@ -59,10 +65,78 @@ class Environment:
         return Environment(outer=outer)
 
 
-@dataclass
+# Marks a local slot whose name has not been assigned yet
+UNSET: Any = object()
+
+
+class LocalEnvironment(Environment):
+    """
+    Environment of a function call, locals live in a fixed size list of
+    slots assigned by the resolver. Names outside of the slots are only
+    stored in a dict when code that was not resolved assigns them.
+    """
+
+    store: Dict[str, Obj] = MappingProxyType({})  # type: ignore
+
+    def __init__(self, outer: Environment, local_names: Tuple[str, ...]):
+        # Function calls always have an enclosing environment
+        self.outer: Environment = outer
+        self.local_names: Tuple[str, ...] = local_names
+        self.slots: List[Obj] = [UNSET] * len(local_names)
+
+        # Closest enclosing environment that is not a function call
+        self.globals: Environment = (
+            outer.globals if type(outer) is LocalEnvironment else outer
+        )
+
+    def get(self, name: str, default: Obj) -> Tuple[Obj, bool]:
+        if name in self.local_names:
+            value = self.slots[self.local_names.index(name)]
+            if value is not UNSET:
+                return (value, True)
+        elif name in self.store:
+            return (self.store[name], True)
+
+        return self.outer.get(name, default)
+
+    def contains(self, name: str) -> bool:
+        if name in self.local_names:
+            return self.slots[self.local_names.index(name)] is not UNSET
+        return name in self.store
+
+    def set(self, name: str, value: Obj) -> Obj:
+        if name in self.local_names:
+            self.slots[self.local_names.index(name)] = value
+            return value
+
+        if type(self.store) is MappingProxyType:
+            self.store = {}
+        self.store[name] = value
+        return value
+
+    def __str__(self):
+        local_values = {
+            name: value
+            for name, value in zip(self.local_names, self.slots)
+            if value is not UNSET
+        }
+        return str({**local_values, **self.store})
+
+
+@dataclass(slots=True)
 class Integer(Obj):
     value: int = 0
 
+    @staticmethod
+    def create(value: int) -> "Integer":
+        """
+        Returns the shared instance for small values, values are never
+        mutated so the same object can be handed out everywhere.
+        """
+        if SMALL_INTEGER_MIN <= value <= SMALL_INTEGER_MAX:
+            return small_integers[value - SMALL_INTEGER_MIN]
+        return Integer(value)
+
     def type(self) -> ObjType:
         return ObjType.INTEGER
 
@@ -73,7 +147,7 @@ class Integer(Obj):
         return hash(self.value)
 
 
-@dataclass
+@dataclass(slots=True)
 class Float(Obj):
     value: float = 0.0
 
@@ -83,8 +157,11 @@ class Float(Obj):
     def inspect(self) -> str:
         return str(self.value)
 
+    def __hash__(self):
+        return hash(self.value)
 
-@dataclass
+
+@dataclass(slots=True)
 class Boolean(Obj):
     value: bool = False
 
@@ -96,6 +173,8 @@ class Boolean(Obj):
 
 
 class Null(Obj):
+    __slots__ = ()
+
     def type(self) -> ObjType:
         return ObjType.NULL
 
@@ -103,7 +182,7 @@ class Null(Obj):
         return "nil"
 
 
-@dataclass
+@dataclass(slots=True)
 class ReturnValue(Obj):
     value: Obj
 
@@ -114,10 +193,54 @@ class ReturnValue(Obj):
         return self.value.inspect()
 
 
+@dataclass(slots=True)
+class TailCall(Obj):
+    """
+    Result of a call in tail position, the caller that is about to
+    return makes the call instead, so the stack does not grow
+    """
+
+    fn: Obj
+    args: List[Obj]
+
+    def type(self) -> ObjType:
+        return ObjType.TAIL_CALL
+
+    def inspect(self) -> str:
+        return "Tail call"
+
+
+class LuaError(Exception):
+    """
+    Raised by the evaluator and compiled backends to unwind on a runtime
+    error
+    """
+
+    def __init__(self, error: "Error") -> None:
+        super().__init__(error.message)
+        self.error = error
+
+
+class Return(Exception):
+    """
+    Raised by return statements in the tree evaluators, unwinds to the
+    function call or program that returns
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Obj) -> None:
+        self.value = value
+
+
 @dataclass
 class Error(Obj):
     message: str
 
+    # Set on errors raised by the interpreter state when a script runs
+    # past one of its limits, "steps", "timeout" or "memory"
+    kind: Optional[str] = field(default=None, compare=False)
+
     @staticmethod
     def create(str_format, *args):
         return Error(message=str_format.format(*args))
@@ -134,6 +257,12 @@ class Function(Obj):
     body: ast.BlockStatement
     env: Environment
     parameters: List[ast.Identifier] = field(default_factory=list)
+    code: Optional["CompiledFunction"] = field(
+        default=None, compare=False, repr=False
+    )
+    compiled: Optional[Callable[["Environment", List[Obj]], Any]] = field(
+        default=None, compare=False, repr=False
+    )
 
     def type(self) -> ObjType:
         return ObjType.FUNCTION
@@ -149,8 +278,110 @@ class Function(Obj):
 
 
 @dataclass
+class CompiledFunction(Obj):
+    instructions: List[int]
+    constants: List[Obj]
+    names: List[str]
+    body: Optional[ast.BlockStatement] = None
+    parameters: List[ast.Identifier] = field(default_factory=list)
+    invoke: Optional[Callable[["Environment", List[Obj]], Any]] = field(
+        default=None, compare=False, repr=False
+    )
+
+    def type(self) -> ObjType:
+        return ObjType.COMPILED_FUNCTION
+
+    def inspect(self) -> str:
+        return "Compiled function"
+
+
+# Concatenations shorter than this are copied right away, longer ones
+# build a rope
+ROPE_MIN_LENGTH: int = 256
+
+# Strings up to this length are shared by String.intern, the table is
+# emptied when it grows past INTERN_MAX_ENTRIES so it stays bounded in
+# long running processes
+INTERN_MAX_LENGTH: int = 40
+INTERN_MAX_ENTRIES: int = 100000
+
+
 class String(Obj):
-    value: str = ""
+    """
+    Lua string. Concatenation can build a rope instead of copying, the
+    pieces are kept in a list and only joined once the value is needed,
+    when the string is inspected, hashed or compared. Appending to the
+    newest string of a rope reuses its list, so `s = s .. piece` over and
+    over is linear instead of quadratic. Earlier strings of the same rope
+    only see the first count pieces of the list.
+
+    The hash is computed once and kept. Literals and names are interned,
+    so table keys written in the source are the same object as the keys
+    they are looked up with and compare by identity.
+    """
+
+    __slots__ = ("flat", "pieces", "count", "length", "hashed")
+
+    def __init__(self, value: str = "") -> None:
+        self.flat: Optional[str] = value
+        self.pieces: Optional[List[str]] = None
+        self.count: int = 0
+        self.length: int = len(value)
+        self.hashed: Optional[int] = None
+
+    @staticmethod
+    def intern(value: str) -> "String":
+        """
+        Returns the shared instance for short strings, with its hash
+        already computed
+        """
+
+        string = interned.get(value)
+        if string is not None:
+            return string
+
+        string = String(value)
+        if len(value) > INTERN_MAX_LENGTH:
+            return string
+
+        if len(interned) >= INTERN_MAX_ENTRIES:
+            interned.clear()
+
+        string.hashed = hash(value)
+        interned[value] = string
+        return string
+
+    @property
+    def value(self) -> str:
+        flat = self.flat
+        if flat is None:
+            pieces = cast(List[str], self.pieces)
+            if len(pieces) != self.count:
+                pieces = pieces[: self.count]
+            flat = self.flat = "".join(pieces)
+            self.pieces = None
+        return flat
+
+    @staticmethod
+    def concat(left: "String", right: "String") -> "String":
+        right_value = right.value
+        length = left.length + len(right_value)
+
+        pieces = left.pieces
+        if pieces is not None and len(pieces) == left.count:
+            pieces.append(right_value)
+        elif length >= ROPE_MIN_LENGTH:
+            pieces = [left.value, right_value]
+        else:
+            return String(left.value + right_value)
+
+        rope = String.__new__(String)
+        rope.flat = None
+        rope.pieces = pieces
+        rope.count = len(pieces)
+        rope.length = length
+        rope.hashed = None
+        return rope
 
     def type(self) -> ObjType:
         return ObjType.STRING
@@ -159,12 +390,27 @@ class String(Obj):
         return self.value
 
     def __hash__(self):
-        return hash(self.value)
+        hashed = self.hashed
+        if hashed is None:
+            hashed = self.hashed = hash(self.value)
+        return hashed
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if other.__class__ is not String:
+            return NotImplemented
+        return self.length == other.length and self.value == other.value
+
+    def __repr__(self) -> str:
+        return "String(value={0!r})".format(self.value)
+
+    def __reduce__(self):
+        return (String, (self.value,))
+
 
-    # def __eq__(self, other):
-    # if not other:
-    # return False
-    # return self.value == other.value
+# Shared instances of short strings, see String.intern
+interned: Dict[str, String] = {}
 
 
 @dataclass
@@ -178,9 +424,129 @@ class Builtin(Obj):
         return "Builtin function"
 
 
-@dataclass
+@dataclass(eq=False)
+class Coroutine(Obj):
+    """
+    Lua coroutine (a thread in Lua terms), frames holds the suspended
+    generators of the stack evaluator once the coroutine has started
+    """
+
+    fn: Obj
+
+    # "suspended", "running", "normal" (resumed another coroutine) or
+    # "dead" (returned or failed)
+    status: str = "suspended"
+    frames: Optional[List[Any]] = field(default=None, repr=False)
+    evaluator: Any = field(default=None, repr=False)
+
+    # The profiler and the stats of the calls that were left open when
+    # the coroutine yielded, entered again when it is resumed
+    profiled: Any = field(default=None, repr=False)
+
+    def type(self) -> ObjType:
+        return ObjType.COROUTINE
+
+    def inspect(self) -> str:
+        return "thread: {0}".format(hex(id(self)))
+
+
 class Table(Obj):
-    elements: Dict[Obj, Obj]
+    """
+    Lua style table, the values for the keys 1..n are kept in a list (the
+    array part) and every other key in a dict (the hash part). The array
+    part always ends at a border, so the length is the size of the list.
+    Keys move from the hash part to the array part once the gap before
+    them is filled, and back again when a nil punches a hole in the array.
+    """
+
+    __slots__ = ("array", "hash")
+
+    def __init__(self, elements: Optional[Dict[Obj, Obj]] = None) -> None:
+        self.array: List[Obj] = []
+        self.hash: Dict[Obj, Obj] = {}
+
+        if elements:
+            for key, value in elements.items():
+                self.set(key, value)
+
+    def get(self, key: Obj) -> Obj:
+        if key.__class__ is Float:
+            key = table_key(cast(Float, key))
+        if key.__class__ is Integer:
+            index = key.value - 1  # type: ignore
+            if 0 <= index < len(self.array):
+                return self.array[index]
+        return self.hash.get(key, NULL)
+
+    def set(self, key: Obj, value: Obj) -> None:
+        array = self.array
+
+        if key.__class__ is Float:
+            key = table_key(cast(Float, key))
+        if key.__class__ is Integer:
+            index = key.value - 1  # type: ignore
+
+            if 0 <= index < len(array):
+                if value is NULL:
+                    self.move_to_hash(index)
+                else:
+                    array[index] = value
+                return
+
+            if index == len(array):
+                if value is NULL:
+                    self.hash.pop(key, None)
+                    return
+
+                array.append(value)
+                self.move_to_array()
+                return
+
+        if value is NULL:
+            self.hash.pop(key, None)
+        else:
+            self.hash[key] = value
+
+    def move_to_array(self) -> None:
+        hash_part = self.hash
+        if not hash_part:
+            return
+
+        array = self.array
+        while True:
+            key = Integer.create(len(array) + 1)
+            value = hash_part.pop(key, None)
+            if value is None:
+                return
+            array.append(value)
+
+    def move_to_hash(self, index: int) -> None:
+        array = self.array
+        for position in range(index + 1, len(array)):
+            self.hash[Integer.create(position + 1)] = array[position]
+        del array[index:]
+
+    def length(self) -> int:
+        return len(self.array)
+
+    @property
+    def elements(self) -> Dict[Obj, Obj]:
+        elements: Dict[Obj, Obj] = {
+            Integer.create(index + 1): value
+            for index, value in enumerate(self.array)
+        }
+        elements.update(self.hash)
+        return elements
+
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not Table:
+            return NotImplemented
+        return self.array == other.array and self.hash == other.hash
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return "Table(elements={0!r})".format(self.elements)
 
     def type(self) -> ObjType:
         return ObjType.TABLE
@@ -199,6 +565,26 @@ class Table(Obj):
         return out
 
 
+def table_key(key: Float) -> Obj:
+    """
+    Floats with an integral value are the same key as the Integer, like
+    in Lua t[1.0] is t[1]
+    """
+
+    value = key.value
+    if value.is_integer():
+        return Integer.create(int(value))
+    return key
+
+
 TRUE = Boolean(value=True)
 FALSE = Boolean(value=False)
 NULL = Null()
+
+# Same range as the CPython small int cache
+SMALL_INTEGER_MIN = -5
+SMALL_INTEGER_MAX = 256
+
+small_integers: List[Integer] = [
+    Integer(value=x) for x in range(SMALL_INTEGER_MIN, SMALL_INTEGER_MAX + 1)
+]
@@ -0,0 +1,261 @@
+"""
+AST level optimizations that run after parsing and before evaluation.
+Infix and prefix expressions on literals are folded into a single
+literal, and if statements with a literal condition are replaced by
+the branch that is taken. Every change is described in
+Optimizer.changes.
+"""
+
+from typing import cast, List, Optional
+
+from . import ast
+from . import obj
+from . import evaluator
+
+
+class Optimizer:
+    def __init__(self) -> None:
+        self.changes: List[str] = []
+
+    def optimize(self, program: ast.Program) -> ast.Program:
+        program.statements = self.optimize_statements(program.statements)
+        return program
+
+    def optimize_statements(
+        self, statements: List[ast.Node]
+    ) -> List[ast.Node]:
+        out: List[ast.Node] = []
+        last_index = len(statements) - 1
+
+        for index, statement in enumerate(statements):
+            statement = self.visit(statement)
+
+            taken = self.taken_branch(statement)
+            if taken is None:
+                out.append(statement)
+                continue
+
+            branch_statements = taken[0].statements if taken[0] else []
+
+            # The value of a block is the value of its last statement, an
+            # if without a taken branch still has to evaluate to nil there
+            if index == last_index and not branch_statements:
+                out.append(statement)
+                continue
+
+            self.changes.append(
+                "Replaced {0} with {1} branch".format(
+                    describe(statement), taken[1]
+                )
+            )
+            out.extend(branch_statements)
+
+        return out
+
+    def taken_branch(self, statement: ast.Node):
+        """
+        Returns (block, description) for if statements with a constant
+        condition, block is None when the condition is false and there
+        is no else branch
+        """
+
+        if type(statement) != ast.ExpressionStatement:
+            return None
+
+        expression = cast(ast.ExpressionStatement, statement).expression
+        if type(expression) != ast.IfExpression:
+            return None
+
+        if_exp = cast(ast.IfExpression, expression)
+        truthy = constant_truthiness(if_exp.condition)
+        if truthy is None:
+            return None
+
+        if truthy:
+            return (if_exp.consequence, "then")
+        return (if_exp.alternative, "else")
+
+    def visit(self, node: Optional[ast.Node]):
+        klass = type(node)
+
+        if klass == ast.ExpressionStatement:
+            statement = cast(ast.ExpressionStatement, node)
+            statement.expression = self.visit(statement.expression)
+            return statement
+
+        if klass == ast.AssignStatement:
+            assignment = cast(ast.AssignStatement, node)
+            assignment.value = self.visit(assignment.value)
+            return assignment
+
+        if klass == ast.ReturnStatement:
+            return_statement = cast(ast.ReturnStatement, node)
+            return_statement.value = self.visit(return_statement.value)
+            return return_statement
+
+        if klass == ast.BlockStatement:
+            block = cast(ast.BlockStatement, node)
+            block.statements = self.optimize_statements(block.statements)
+            return block
+
+        if klass == ast.InfixExpression:
+            infix_exp = cast(ast.InfixExpression, node)
+            infix_exp.left = self.visit(infix_exp.left)
+            infix_exp.right = self.visit(infix_exp.right)
+            return self.fold_infix_expression(infix_exp)
+
+        if klass == ast.PrefixExpression:
+            prefix_exp = cast(ast.PrefixExpression, node)
+            prefix_exp.right = self.visit(prefix_exp.right)
+            return self.fold_prefix_expression(prefix_exp)
+
+        if klass == ast.IfExpression:
+            if_exp = cast(ast.IfExpression, node)
+            if_exp.condition = self.visit(if_exp.condition)
+            if_exp.consequence = self.visit(if_exp.consequence)
+            if if_exp.alternative:
+                if_exp.alternative = self.visit(if_exp.alternative)
+            return self.fold_if_expression(if_exp)
+
+        if klass == ast.FunctionLiteral:
+            fn_literal = cast(ast.FunctionLiteral, node)
+            fn_literal.body = self.visit(fn_literal.body)
+            return fn_literal
+
+        if klass == ast.CallExpression:
+            call_exp = cast(ast.CallExpression, node)
+            call_exp.function = self.visit(call_exp.function)
+            call_exp.arguments = [self.visit(x) for x in call_exp.arguments]
+            return call_exp
+
+        if klass == ast.TableLiteral:
+            table_literal = cast(ast.TableLiteral, node)
+            table_literal.elements = [
+                (self.visit(key), self.visit(value))
+                for key, value in table_literal.elements
+            ]
+            return table_literal
+
+        if klass == ast.IndexExpression:
+            index_exp = cast(ast.IndexExpression, node)
+            index_exp.left = self.visit(index_exp.left)
+            index_exp.index = self.visit(index_exp.index)
+            return index_exp
+
+        return node
+
+    def fold_infix_expression(self, infix_exp: ast.InfixExpression):
+        left = constant_value(infix_exp.left)
+        right = constant_value(infix_exp.right)
+        if left is None or right is None:
+            return infix_exp
+
+        try:
+            result = evaluator.evaluate_infix_expression(
+                infix_exp.operator, left, right
+            )
+        except ArithmeticError:
+            # Like 1 / 0, left for the runtime to fail on if it is ever
+            # evaluated at all
+            return infix_exp
+        return self.replace_with_constant(infix_exp, result)
+
+    def fold_prefix_expression(self, prefix_exp: ast.PrefixExpression):
+        right = constant_value(prefix_exp.right)
+        if right is None:
+            return prefix_exp
+
+        result = evaluator.evaluate_prefix_expression(
+            prefix_exp.operator, right
+        )
+        return self.replace_with_constant(prefix_exp, result)
+
+    def fold_if_expression(self, if_exp: ast.IfExpression):
+        """
+        An if used as a value can be replaced by the taken branch when
+        that branch is a single expression
+        """
+
+        truthy = constant_truthiness(if_exp.condition)
+        if truthy is None:
+            return if_exp
+
+        taken = if_exp.consequence if truthy else if_exp.alternative
+        if not taken or len(taken.statements) != 1:
+            return if_exp
+
+        statement = taken.statements[0]
+        if type(statement) != ast.ExpressionStatement:
+            return if_exp
+
+        expression = cast(ast.ExpressionStatement, statement).expression
+        self.changes.append(
+            "Replaced {0} with {1}".format(
+                describe(if_exp), expression.to_code()
+            )
+        )
+        return expression
+
+    def replace_with_constant(self, node: ast.Node, value: obj.Obj):
+        literal = constant_literal(node.token, value)
+        if literal is None:
+            return node
+
+        self.changes.append(
+            "Folded {0} into {1}".format(node.to_code(), literal.to_code())
+        )
+        return literal
+
+
+def constant_value(node: ast.Node) -> Optional[obj.Obj]:
+    klass = type(node)
+    if klass == ast.IntegerLiteral:
+        return obj.Integer.create(cast(ast.IntegerLiteral, node).value)
+    if klass == ast.FloatLiteral:
+        return obj.Float(cast(ast.FloatLiteral, node).value)
+    if klass == ast.StringLiteral:
+        return obj.String.intern(cast(ast.StringLiteral, node).value)
+    if klass == ast.Boolean:
+        boolean = cast(ast.Boolean, node)
+        return evaluator.native_bool_to_bool_obj(boolean.value)
+    return None
+
+
+def constant_literal(token, value: obj.Obj) -> Optional[ast.Node]:
+    """
+    Results without a literal form (nil and errors) are left to be
+    computed at runtime, and so are floats, which keep the expression
+    they were written as since inf and nan have no literal
+    """
+
+    klass = value.__class__
+    if klass is obj.Integer:
+        integer = cast(obj.Integer, value)
+        return ast.IntegerLiteral(token=token, value=integer.value)
+    if klass is obj.String:
+        string = cast(obj.String, value)
+        return ast.StringLiteral(token=token, value=string.value)
+    if klass is obj.Boolean:
+        boolean = cast(obj.Boolean, value)
+        return ast.Boolean(token=token, value=boolean.value)
+    return None
+
+
+def constant_truthiness(node: ast.Node) -> Optional[bool]:
+    value = constant_value(node)
+    if value is None:
+        return None
+    return evaluator.is_truthy(value)
+
+
+def describe(node: ast.Node) -> str:
+    if type(node) == ast.ExpressionStatement:
+        node = cast(ast.ExpressionStatement, node).expression
+    if type(node) == ast.IfExpression:
+        condition = cast(ast.IfExpression, node).condition
+        return "if {0}".format(condition.to_code())
+    return node.to_code()
+
+
+def optimize(program: ast.Program) -> ast.Program:
+    return Optimizer().optimize(program)
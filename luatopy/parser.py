@@ -4,6 +4,8 @@ from enum import IntEnum, auto
 from .token import TokenType, Token
 from .lexer import Lexer
 from . import ast
+from . import code
+from . import resolver
 
 
 class Precedence(IntEnum):
@@ -48,6 +50,7 @@ precedences: Dict[TokenType, Precedence] = {
     TokenType.IF: Precedence.CALL,
     TokenType.CONCAT: Precedence.CONCAT,
     TokenType.LBRACKET: Precedence.INDEX,
+    TokenType.DOT: Precedence.INDEX,
 }
 
 
@@ -59,6 +62,7 @@ class Parser:
         self.prefix_parse_fns: Dict[TokenType, Callable] = {
             TokenType.IDENTIFIER: self.parse_identifier,
             TokenType.INT: self.parse_integer_literal,
+            TokenType.FLOAT: self.parse_float_literal,
             TokenType.STR: self.parse_string_literal,
             TokenType.MINUS: self.parse_prefix_expression,
             TokenType.HASH: self.parse_prefix_expression,
@@ -90,6 +94,7 @@ class Parser:
             TokenType.LPAREN: self.parse_call_expression,
             TokenType.CONCAT: self.parse_infix_expression,
             TokenType.LBRACKET: self.parse_index_expression,
+            TokenType.DOT: self.parse_field_expression,
         }
 
         self.table_prefix_fns = {
@@ -118,7 +123,7 @@ class Parser:
             statements.append(statement)
             self.next_token()
 
-        return ast.Program(statements)
+        return resolver.resolve(ast.Program(statements))
 
     def parse_statement(self) -> ast.Node:
         if (
@@ -193,6 +198,13 @@ class Parser:
             and self.cur_token.token_type != TokenType.ELSE
             and self.cur_token.token_type != TokenType.EOF
         ):
+            if self.cur_token.token_type in [
+                TokenType.NEWLINE,
+                TokenType.SEMICOLON,
+            ]:
+                self.next_token()
+                continue
+
             statement = self.parse_statement()
 
             if statement:
@@ -203,11 +215,10 @@ class Parser:
         return ast.BlockStatement(token=token, statements=statements)
 
     def parse_expression_statement(self) -> ast.ExpressionStatement:
+        token = self.cur_token
         expression = self.parse_expression(Precedence.LOWEST)
 
-        return ast.ExpressionStatement(
-            token=self.cur_token, expression=expression
-        )
+        return ast.ExpressionStatement(token=token, expression=expression)
 
     def parse_expression(self, precedence: Precedence):
         prefix_fn = self.prefix_parse_fns.get(self.cur_token.token_type, None)
@@ -246,6 +257,11 @@ class Parser:
         value = int(literal)
         return ast.IntegerLiteral(token=self.cur_token, value=value)
 
+    def parse_float_literal(self) -> ast.FloatLiteral:
+        literal = self.cur_token.literal
+        value = float(literal)
+        return ast.FloatLiteral(token=self.cur_token, value=value)
+
     def parse_string_literal(self) -> ast.StringLiteral:
         literal = self.cur_token.literal
         value = literal
@@ -327,8 +343,13 @@ class Parser:
         self.next_token()
         right = self.parse_expression(precedence)
 
+        opcode = code.infix_operators.get(token.literal)
         return ast.InfixExpression(
-            token=token, left=left, operator=token.literal, right=right
+            token=token,
+            left=left,
+            operator=token.literal,
+            right=right,
+            opcode=int(opcode) if opcode is not None else None,
         )
 
     def parse_call_expression(self, function: ast.Node) -> ast.CallExpression:
@@ -474,3 +495,23 @@ class Parser:
         return ast.IndexExpression(
             token=token, left=left_expression, index=index
         )
+
+    def parse_field_expression(self, left: ast.Node):
+        """
+        Parses t.name as t["name"]
+        """
+
+        left_expression = cast(ast.Expression, left)
+        token = self.cur_token
+
+        if not self.expect_peek(TokenType.IDENTIFIER):
+            return None
+
+        index = ast.StringLiteral(
+            token=self.cur_token, value=self.cur_token.literal
+        )
+        return ast.IndexExpression(
+            token=token,
+            left=left_expression,
+            index=cast(ast.Expression, index),
+        )
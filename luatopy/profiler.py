@@ -0,0 +1,383 @@
+"""
+Profiler for Lua functions. While a Profiler is active every call of a
+Lua function is recorded against the function body that runs, with the
+number of calls, the inclusive time (including the functions it calls)
+and the self time (excluding them).
+
+    profiler = Profiler()
+    profiler.add_program(program)
+    with profiler:
+        backends.evaluate(program, env)
+    print(profiler.report())
+
+When no profiler is active the call paths only check `active`.
+
+LineProfiler does the same for source lines on the tree evaluator, by
+swapping in timed handlers for statements while it is active.
+
+    line_profiler = LineProfiler()
+    with line_profiler:
+        evaluator.evaluate(program, env)
+    print(line_profiler.annotate(source))
+"""
+
+import json
+import time
+from dataclasses import dataclass, field
+from typing import cast, Any, Callable, Dict, List, Optional, Tuple, Union
+
+from . import ast
+from . import evaluator
+
+
+ANONYMOUS: str = "<anonymous>"
+
+SORT_KEYS: Dict[str, Callable[["FunctionStats"], Any]] = {
+    "self": lambda x: x.self_time,
+    "inclusive": lambda x: x.inclusive_time,
+    "calls": lambda x: x.calls,
+    "name": lambda x: x.name,
+}
+
+
+@dataclass
+class FunctionStats:
+    name: str
+    site: str
+    calls: int = 0
+    inclusive_time: float = 0.0
+    self_time: float = 0.0
+
+    # Calls of this function that have not returned yet, recursive calls
+    # only add to the inclusive time of the outermost one
+    active_calls: int = field(default=0, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "site": self.site,
+            "calls": self.calls,
+            "inclusive_time": self.inclusive_time,
+            "self_time": self.self_time,
+        }
+
+
+class Profiler:
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock: Callable[[], float] = clock
+
+        # Keyed by id() of the function body, the body is kept in names
+        # so the id is not reused while the profiler lives
+        self.functions: Dict[int, FunctionStats] = {}
+        self.names: Dict[int, Tuple[str, str, ast.BlockStatement]] = {}
+
+        # [stats, start time, time spent in calls made from the frame]
+        self.frames: List[List[Any]] = []
+
+        self.previous: Optional["Profiler"] = None
+
+    def add_program(self, program: ast.Program) -> None:
+        """
+        Collects names of the functions in program, functions are named
+        by their declaration or the variable they are assigned to
+        """
+
+        self.add_names(program)
+
+    def add_names(self, node: Union[ast.Program, ast.Node]) -> None:
+        for child in ast.iter_child_nodes(node):
+            klass = type(child)
+
+            if klass == ast.FunctionLiteral:
+                fn_literal = cast(ast.FunctionLiteral, child)
+                name = fn_literal.name.value if fn_literal.name else ANONYMOUS
+                self.add_function(fn_literal, name)
+
+            if klass == ast.AssignStatement:
+                assignment = cast(ast.AssignStatement, child)
+                if type(assignment.value) == ast.FunctionLiteral:
+                    fn_literal = cast(ast.FunctionLiteral, assignment.value)
+                    self.add_function(fn_literal, assignment.name.value)
+                    self.add_names(fn_literal)
+                    continue
+
+            self.add_names(child)
+
+    def add_function(self, fn_literal: ast.FunctionLiteral, name: str) -> None:
+        self.names[id(fn_literal.body)] = (
+            name,
+            definition_site(fn_literal),
+            fn_literal.body,
+        )
+
+    def enter(self, body: ast.BlockStatement) -> None:
+        stats = self.functions.get(id(body))
+        if stats is None:
+            name, site, _ = self.names.get(id(body), (ANONYMOUS, "?", body))
+            stats = FunctionStats(name=name, site=site)
+            self.functions[id(body)] = stats
+            self.names[id(body)] = (name, site, body)
+
+        stats.calls = stats.calls + 1
+        stats.active_calls = stats.active_calls + 1
+        self.frames.append([stats, self.clock(), 0.0])
+
+    def leave(self) -> None:
+        stats, start, children = self.frames.pop()
+        elapsed = self.clock() - start
+
+        stats.self_time = stats.self_time + elapsed - children
+        stats.active_calls = stats.active_calls - 1
+        if not stats.active_calls:
+            stats.inclusive_time = stats.inclusive_time + elapsed
+
+        if self.frames:
+            self.frames[-1][2] = self.frames[-1][2] + elapsed
+
+    def suspend(self, depth: int) -> List[FunctionStats]:
+        """
+        Leaves the frames above depth, which belong to a coroutine that
+        yields, and returns their stats so resume can enter them again.
+        The time the coroutine is suspended is not charged to them.
+        """
+
+        suspended = []
+        while len(self.frames) > depth:
+            suspended.append(self.frames[-1][0])
+            self.leave()
+
+        suspended.reverse()
+        return suspended
+
+    def resume(self, suspended: List[FunctionStats]) -> None:
+        for stats in suspended:
+            stats.active_calls = stats.active_calls + 1
+            self.frames.append([stats, self.clock(), 0.0])
+
+    def start(self) -> None:
+        global active
+
+        self.previous = active
+        active = self
+
+    def stop(self) -> None:
+        global active
+
+        active = self.previous
+        self.previous = None
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self, sort: str = "self") -> List[FunctionStats]:
+        if sort not in SORT_KEYS:
+            raise ValueError("Unknown sort key {0}".format(sort))
+
+        return sorted(
+            self.functions.values(),
+            key=SORT_KEYS[sort],
+            reverse=sort != "name",
+        )
+
+    def report(self, sort: str = "self") -> str:
+        lines = [
+            "{0:<24} {1:<24} {2:>8} {3:>12} {4:>12}".format(
+                "function", "defined at", "calls", "incl (ms)", "self (ms)"
+            )
+        ]
+        for stats in self.stats(sort):
+            lines.append(
+                "{0:<24} {1:<24} {2:>8} {3:>12.3f} {4:>12.3f}".format(
+                    stats.name,
+                    stats.site,
+                    stats.calls,
+                    stats.inclusive_time * 1000,
+                    stats.self_time * 1000,
+                )
+            )
+        return "\n".join(lines)
+
+    def to_json(self, sort: str = "self") -> str:
+        return json.dumps(
+            {"functions": [x.to_dict() for x in self.stats(sort)]}, indent=2
+        )
+
+
+def profiled(invoke: Callable, body: ast.BlockStatement) -> Callable:
+    """
+    Wraps the entry point of a compiled function so its calls are
+    recorded, the tail call entry point is wrapped as well
+    """
+
+    def profiled_invoke(fn_env, args):
+        active_profiler = active
+        if active_profiler is None:
+            return invoke(fn_env, args)
+
+        active_profiler.enter(body)
+        try:
+            return invoke(fn_env, args)
+        finally:
+            active_profiler.leave()
+
+    enter = getattr(invoke, "enter", None)
+    if enter is not None:
+        profiled_invoke.enter = profiled(enter, body)  # type: ignore
+    return profiled_invoke
+
+
+def definition_site(fn_literal: ast.FunctionLiteral) -> str:
+    return "{0}:{1}".format(fn_literal.line, fn_literal.column)
+
+
+@dataclass
+class LineStats:
+    line: int
+    hits: int = 0
+    inclusive_time: float = 0.0
+    self_time: float = 0.0
+
+    # Statements of this line that have not finished yet, like in
+    # FunctionStats only the outermost one adds to the inclusive time
+    active_calls: int = field(default=0, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "line": self.line,
+            "hits": self.hits,
+            "inclusive_time": self.inclusive_time,
+            "self_time": self.self_time,
+        }
+
+
+LINE_SORT_KEYS: Dict[str, Callable[[LineStats], Any]] = {
+    "self": lambda x: x.self_time,
+    "inclusive": lambda x: x.inclusive_time,
+    "hits": lambda x: x.hits,
+    "line": lambda x: x.line,
+}
+
+# Statements are what a line executes, expressions are timed as part of
+# the statement they belong to
+LINE_NODES: List[type] = [
+    ast.ExpressionStatement,
+    ast.AssignStatement,
+    ast.ReturnStatement,
+]
+
+
+class LineProfiler:
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock: Callable[[], float] = clock
+        self.lines: Dict[int, LineStats] = {}
+
+        # [stats, start time, time spent in statements run from it]
+        self.frames: List[List[Any]] = []
+
+        self.replaced: Dict[type, Any] = {}
+
+    def start(self) -> None:
+        for node_type in LINE_NODES:
+            handler = evaluator.node_handlers[node_type]
+            self.replaced[node_type] = handler
+            evaluator.register(
+                evaluator.node_handlers, node_type, self.timed(handler)
+            )
+
+    def stop(self) -> None:
+        for node_type, handler in self.replaced.items():
+            evaluator.register(evaluator.node_handlers, node_type, handler)
+        self.replaced = {}
+
+    def __enter__(self) -> "LineProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def timed(self, handler: Callable) -> Callable:
+        def timed_handler(node, env):
+            self.enter(node.line)
+            try:
+                return handler(node, env)
+            finally:
+                self.leave()
+
+        return timed_handler
+
+    def enter(self, line: int) -> None:
+        stats = self.lines.get(line)
+        if stats is None:
+            stats = self.lines[line] = LineStats(line=line)
+
+        stats.hits = stats.hits + 1
+        stats.active_calls = stats.active_calls + 1
+        self.frames.append([stats, self.clock(), 0.0])
+
+    def leave(self) -> None:
+        stats, start, children = self.frames.pop()
+        elapsed = self.clock() - start
+
+        stats.self_time = stats.self_time + elapsed - children
+        stats.active_calls = stats.active_calls - 1
+        if not stats.active_calls:
+            stats.inclusive_time = stats.inclusive_time + elapsed
+
+        if self.frames:
+            self.frames[-1][2] = self.frames[-1][2] + elapsed
+
+    def stats(self, sort: str = "self") -> List[LineStats]:
+        if sort not in LINE_SORT_KEYS:
+            raise ValueError("Unknown sort key {0}".format(sort))
+
+        return sorted(
+            self.lines.values(),
+            key=LINE_SORT_KEYS[sort],
+            reverse=sort != "line",
+        )
+
+    def annotate(self, source: str) -> str:
+        """
+        Returns source with the hits, inclusive and self time (in ms) of
+        each line in front of it
+        """
+
+        lines = [
+            "{0:>6} {1:>10} {2:>10} {3:>6}  {4}".format(
+                "hits", "incl (ms)", "self (ms)", "line", "source"
+            )
+        ]
+        for number, text in enumerate(source.splitlines(), 1):
+            stats = self.lines.get(number)
+            if stats is None:
+                lines.append(
+                    "{0:>6} {1:>10} {2:>10} {3:>6}  {4}".format(
+                        "", "", "", number, text
+                    )
+                )
+                continue
+
+            lines.append(
+                "{0:>6} {1:>10.3f} {2:>10.3f} {3:>6}  {4}".format(
+                    stats.hits,
+                    stats.inclusive_time * 1000,
+                    stats.self_time * 1000,
+                    number,
+                    text,
+                )
+            )
+        return "\n".join(lines)
+
+    def to_json(self, sort: str = "line") -> str:
+        return json.dumps(
+            {"lines": [x.to_dict() for x in self.stats(sort)]}, indent=2
+        )
+
+
+# The profiler that records calls, None when profiling is off
+active: Optional[Profiler] = None
@@ -0,0 +1,107 @@
+"""
+Static scope resolution. Every function body gets a fixed list of local
+slots (its parameters followed by the names it assigns), and every
+identifier read gets the (depth, slot) pairs it has to check, innermost
+function first. Names are only bound once they are assigned, so a slot
+can still be unset at runtime, in which case the next pair is tried and
+finally the globals of the program.
+"""
+
+from typing import cast, Dict, List, Optional
+
+from . import ast
+
+
+class Scope:
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self.slots: Dict[str, int] = {}
+
+    def declare(self, name: str) -> int:
+        if name not in self.slots:
+            self.slots[name] = len(self.names)
+            self.names.append(name)
+        return self.slots[name]
+
+
+class Resolver:
+    def __init__(self) -> None:
+        self.scopes: List[Scope] = []
+
+    def resolve(self, program: ast.Program) -> ast.Program:
+        for statement in program.statements:
+            self.visit(statement)
+
+        program.resolved = True
+        return program
+
+    def visit(self, node: Optional[ast.Node]) -> None:
+        klass = type(node)
+
+        if klass == ast.Identifier:
+            identifier: ast.Identifier = cast(ast.Identifier, node)
+            identifier.address = self.address(identifier.value)
+            return
+
+        if klass == ast.AssignStatement:
+            assignment: ast.AssignStatement = cast(ast.AssignStatement, node)
+            self.visit(assignment.value)
+            assignment.name.slot = self.declaration_slot(assignment.name.value)
+            return
+
+        if klass == ast.FunctionLiteral:
+            self.visit_function_literal(cast(ast.FunctionLiteral, node))
+            return
+
+        if klass == ast.ReturnStatement and self.scopes:
+            return_statement = cast(ast.ReturnStatement, node)
+            if type(return_statement.value) == ast.CallExpression:
+                call_exp = cast(ast.CallExpression, return_statement.value)
+                call_exp.tail_call = True
+
+        if node is None:
+            return
+
+        for child in ast.iter_child_nodes(node):
+            self.visit(child)
+
+    def visit_function_literal(self, fn_literal: ast.FunctionLiteral) -> None:
+        if fn_literal.name:
+            fn_literal.name.slot = self.declaration_slot(fn_literal.name.value)
+
+        scope = Scope()
+        for parameter in fn_literal.parameters:
+            parameter.slot = scope.declare(parameter.value)
+
+        for node in ast.iter_scope_nodes(fn_literal.body):
+            klass = type(node)
+            if klass == ast.AssignStatement:
+                scope.declare(cast(ast.AssignStatement, node).name.value)
+            if klass == ast.FunctionLiteral:
+                nested_fn = cast(ast.FunctionLiteral, node)
+                if nested_fn.name:
+                    scope.declare(nested_fn.name.value)
+
+        fn_literal.body.local_names = tuple(scope.names)
+
+        self.scopes.append(scope)
+        for statement in fn_literal.body.statements:
+            self.visit(statement)
+        self.scopes.pop()
+
+    def declaration_slot(self, name: str) -> Optional[int]:
+        if not self.scopes:
+            return None
+        return self.scopes[-1].slots[name]
+
+    def address(self, name: str):
+        candidates = []
+        for depth, scope in enumerate(reversed(self.scopes)):
+            slot = scope.slots.get(name)
+            if slot is not None:
+                candidates.append((depth, slot))
+        return tuple(candidates)
+
+
+def resolve(program: ast.Program) -> ast.Program:
+    return Resolver().resolve(program)
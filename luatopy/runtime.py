@@ -0,0 +1,190 @@
+"""
+Support functions for Python source emitted by the transpiler, the
+generated modules only ever reference names defined in this module.
+"""
+
+from typing import cast, Any, Dict, List, Optional
+
+from . import ast
+from . import obj
+from . import evaluator
+from . import profiler
+from . import state
+from .builtins import builtins
+from .closure_compiler import call_function, tail_call_invoker
+from .obj import LuaError, Environment, Integer, Float, String, Table
+from .obj import TailCall
+from .obj import TRUE, FALSE, NULL
+
+create_integer = Integer.create
+
+
+def lookup(env: Environment, name: str) -> obj.Obj:
+    scope: Optional[Environment] = env
+    while scope is not None:
+        store = scope.store
+        if name in store:
+            return store[name]
+        scope = scope.outer
+    return builtins.get(name, NULL)
+
+
+def bind(args: List[obj.Obj], count: int) -> List[obj.Obj]:
+    return [args[x] if x < len(args) else NULL for x in range(count)]
+
+
+def call(fn: obj.Obj, args: List[obj.Obj], env: Environment) -> Any:
+    return call_function(fn, args, env)
+
+
+def make_function(
+    env: Environment, literal: ast.FunctionLiteral, invoke
+) -> obj.Function:
+    if profiler.active is not None:
+        invoke = profiler.profiled(invoke, literal.body)
+    if state.active is not None:
+        invoke = state.limited(invoke, len(literal.body.statements))
+
+    return obj.Function(
+        body=literal.body,
+        env=env,
+        parameters=literal.parameters,
+        compiled=invoke,
+    )
+
+
+def tail_calls(invoke):
+    return tail_call_invoker(invoke)
+
+
+def infix(operator: str, left: obj.Obj, right: obj.Obj) -> obj.Obj:
+    result = evaluator.evaluate_infix_expression(operator, left, right)
+    if result.__class__ is obj.Error:
+        raise LuaError(cast(obj.Error, result))
+    return result
+
+
+def prefix(operator: str, right: obj.Obj) -> obj.Obj:
+    result = evaluator.evaluate_prefix_expression(operator, right)
+    if result.__class__ is obj.Error:
+        raise LuaError(cast(obj.Error, result))
+    return result
+
+
+def index(left: obj.Obj, key: obj.Obj) -> obj.Obj:
+    result = evaluator.evaluate_index_expression(left, key)
+    if result.__class__ is obj.Error:
+        raise LuaError(cast(obj.Error, result))
+    return result
+
+
+def truthy(value: obj.Obj) -> bool:
+    return value is not NULL and value is not FALSE
+
+
+def not_(value: obj.Obj) -> obj.Obj:
+    return FALSE if value is not NULL and value is not FALSE else TRUE
+
+
+def add(left: obj.Obj, right: obj.Obj) -> obj.Obj:
+    if left.__class__ is Integer and right.__class__ is Integer:
+        return create_integer(left.value + right.value)
+    return infix("+", left, right)
+
+
+def sub(left: obj.Obj, right: obj.Obj) -> obj.Obj:
+    if left.__class__ is Integer and right.__class__ is Integer:
+        return create_integer(left.value - right.value)
+    return infix("-", left, right)
+
+
+def mul(left: obj.Obj, right: obj.Obj) -> obj.Obj:
+    if left.__class__ is Integer and right.__class__ is Integer:
+        return create_integer(left.value * right.value)
+    return infix("*", left, right)
+
+
+def lt(left: obj.Obj, right: obj.Obj) -> obj.Obj:
+    if left.__class__ is Integer and right.__class__ is Integer:
+        return TRUE if left.value < right.value else FALSE
+    return infix("<", left, right)
+
+
+def lte(left: obj.Obj, right: obj.Obj) -> obj.Obj:
+    if left.__class__ is Integer and right.__class__ is Integer:
+        return TRUE if left.value <= right.value else FALSE
+    return infix("<=", left, right)
+
+
+def gt(left: obj.Obj, right: obj.Obj) -> obj.Obj:
+    if left.__class__ is Integer and right.__class__ is Integer:
+        return TRUE if left.value > right.value else FALSE
+    return infix(">", left, right)
+
+
+def gte(left: obj.Obj, right: obj.Obj) -> obj.Obj:
+    if left.__class__ is Integer and right.__class__ is Integer:
+        return TRUE if left.value >= right.value else FALSE
+    return infix(">=", left, right)
+
+
+def eq(left: obj.Obj, right: obj.Obj) -> obj.Obj:
+    if left.__class__ is Integer and right.__class__ is Integer:
+        return TRUE if left.value == right.value else FALSE
+    return infix("==", left, right)
+
+
+def concat(left: obj.Obj, right: obj.Obj) -> obj.Obj:
+    if left.__class__ is String and right.__class__ is String:
+        if state.active is None:
+            return String.concat(left, right)
+    return infix("..", left, right)
+
+
+def table(elements: Dict[obj.Obj, obj.Obj]) -> Table:
+    active_state = state.active
+    if active_state is not None:
+        error = active_state.allocate(state.table_size(len(elements)))
+        if error is not None:
+            raise LuaError(error)
+
+    return Table(elements=elements)
+
+
+# Operators with a dedicated helper, everything else goes through infix()
+infix_helpers: Dict[str, str] = {
+    "+": "add",
+    "-": "sub",
+    "*": "mul",
+    "<": "lt",
+    "<=": "lte",
+    ">": "gt",
+    ">=": "gte",
+    "==": "eq",
+    "..": "concat",
+}
+
+__all__ = [
+    "LuaError",
+    "Environment",
+    "Integer",
+    "Float",
+    "String",
+    "Table",
+    "TailCall",
+    "TRUE",
+    "FALSE",
+    "NULL",
+    "lookup",
+    "bind",
+    "call",
+    "make_function",
+    "tail_calls",
+    "infix",
+    "prefix",
+    "index",
+    "table",
+    "truthy",
+    "not_",
+    *infix_helpers.values(),
+]
@@ -0,0 +1,355 @@
+"""
+Tree walking evaluator that does not use the Python stack for Lua calls.
+Nodes that contain a call are evaluated by generators, a node asks for
+the value of a child by yielding the generator of the child, and a
+single loop keeps the suspended generators on an explicit stack. Nodes
+without calls are handed to the regular evaluator, so only the path to
+a call pays for the generators.
+
+Return statements and runtime errors are raised like in the regular
+evaluator, the loop throws them into the generator below the one that
+raised until one of them handles it.
+
+The depth of Lua calls is limited by max_depth instead of the Python
+recursion limit, going past it is reported as a "stack overflow" error.
+
+Coroutines are run on a stack of their own. A call to coroutine.yield
+makes the loop return with the generators of the coroutine left as they
+are, and coroutine.resume picks them up again where they stopped.
+"""
+
+from types import GeneratorType
+from typing import cast, Any, Callable, Dict, Generator, List, Optional
+
+from . import ast
+from . import obj
+from . import evaluator
+from . import resolver
+from . import profiler
+from . import state
+from . import coroutine
+from .obj import NULL, LuaError, Return
+
+
+DEFAULT_MAX_DEPTH: int = 200000
+
+Step = Generator[Any, Any, Any]
+
+
+class Suspend:
+    """
+    Requested by a call to coroutine.yield, the coroutine that is running
+    returns value to the one that resumed it
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: obj.Obj) -> None:
+        self.value = value
+
+
+class StackEvaluator:
+    def __init__(
+        self, max_depth: int = DEFAULT_MAX_DEPTH, run_compiled: bool = False
+    ) -> None:
+        self.max_depth: int = max_depth
+        self.depth: int = 0
+
+        # Also evaluate the bodies of functions created by the compiling
+        # backends instead of calling their compiled code
+        self.run_compiled: bool = run_compiled
+
+        # Keyed by id(node), nodes stay alive as long as the program does
+        self.pure: Dict[int, bool] = {}
+
+        self.node_steps: Dict[type, Callable[[Any, obj.Environment], Step]] = {
+            ast.Program: self.program,
+            ast.BlockStatement: self.block_statement,
+            ast.ExpressionStatement: self.expression_statement,
+            ast.ReturnStatement: self.return_statement,
+            ast.AssignStatement: self.assign_statement,
+            ast.InfixExpression: self.infix_expression,
+            ast.PrefixExpression: self.prefix_expression,
+            ast.IfExpression: self.if_expression,
+            ast.CallExpression: self.call_expression,
+            ast.TableLiteral: self.table_literal,
+            ast.IndexExpression: self.index_expression,
+        }
+
+    def evaluate(self, node: ast.Node, env: obj.Environment):
+        value = self.step(node, env)
+
+        if type(value) is not GeneratorType:
+            return value
+
+        return self.run([value], None, False)
+
+    def run(self, stack: List[Step], value: Any, resumable: bool):
+        """
+        Runs the generators on stack until it is empty, when resumable a
+        yield stops the loop and returns the Suspend request instead
+        """
+
+        raised: Optional[BaseException] = None
+
+        while stack:
+            try:
+                if raised is None:
+                    request = stack[-1].send(value)
+                else:
+                    exception, raised = raised, None
+                    request = stack[-1].throw(exception)
+            except StopIteration as e:
+                stack.pop()
+                value = e.value
+                continue
+            except (LuaError, Return) as e:
+                stack.pop()
+                if not stack:
+                    raise
+                raised = e
+                continue
+
+            if type(request) is GeneratorType:
+                stack.append(request)
+                value = None
+            elif request.__class__ is Suspend:
+                if resumable:
+                    return request
+                raised = LuaError(
+                    obj.Error.create(coroutine.OUTSIDE_COROUTINE)
+                )
+            else:
+                value = request
+
+        return value
+
+    def step(self, node: ast.Node, env: obj.Environment):
+        """
+        Returns the value of node right away when it contains no calls,
+        otherwise a generator that has to be run by the evaluate loop
+        """
+
+        if self.is_pure(node):
+            return evaluator.evaluate(node, env)
+        return self.node_steps[type(node)](node, env)
+
+    def is_pure(self, node: Optional[ast.Node]) -> bool:
+        if node is None:
+            return True
+
+        key = id(node)
+        pure = self.pure.get(key)
+        if pure is not None:
+            return pure
+
+        klass = type(node)
+        if klass == ast.CallExpression:
+            pure = False
+        elif klass == ast.FunctionLiteral or klass not in self.node_steps:
+            # Creating a function does not run its body
+            pure = True
+        else:
+            pure = all(self.is_pure(x) for x in ast.iter_child_nodes(node))
+
+        self.pure[key] = pure
+        return pure
+
+    def program(self, program: ast.Program, env: obj.Environment) -> Step:
+        if not program.resolved:
+            resolver.resolve(program)
+
+        result = None
+        try:
+            active_state = state.active
+            if active_state is not None:
+                active_state.charge(len(program.statements))
+
+            for statement in program.statements:
+                result = yield self.step(statement, env)
+        except Return as e:
+            return e.value
+        except LuaError as e:
+            return e.error
+
+        return result
+
+    def block_statement(
+        self, block_statement: ast.BlockStatement, env: obj.Environment
+    ) -> Step:
+        statements = block_statement.statements
+
+        active_state = state.active
+        if active_state is not None:
+            active_state.charge(len(statements))
+
+        result = None
+        for statement in statements:
+            result = yield self.step(statement, env)
+
+        return result
+
+    def expression_statement(
+        self, statement: ast.ExpressionStatement, env: obj.Environment
+    ) -> Step:
+        return (yield self.step(statement.expression, env))
+
+    def return_statement(
+        self, return_statement: ast.ReturnStatement, env: obj.Environment
+    ) -> Step:
+        raise Return((yield self.step(return_statement.value, env)))
+
+    def assign_statement(
+        self, assignment: ast.AssignStatement, env: obj.Environment
+    ) -> Step:
+        value = yield self.step(assignment.value, env)
+
+        slot = assignment.name.slot
+        if slot is not None:
+            cast(obj.LocalEnvironment, env).slots[slot] = value
+        else:
+            env.set(assignment.name.value, value)
+        return None
+
+    def infix_expression(
+        self, infix_exp: ast.InfixExpression, env: obj.Environment
+    ) -> Step:
+        left = yield self.step(infix_exp.left, env)
+        right = yield self.step(infix_exp.right, env)
+
+        opcode = cast(int, infix_exp.opcode)
+        result = evaluator.evaluate_infix(opcode, left, right)
+        if result.__class__ is obj.Error:
+            raise LuaError(result)
+        return result
+
+    def prefix_expression(
+        self, prefix_exp: ast.PrefixExpression, env: obj.Environment
+    ) -> Step:
+        right = yield self.step(prefix_exp.right, env)
+
+        result = evaluator.evaluate_prefix_expression(prefix_exp.operator, right)
+        if result.__class__ is obj.Error:
+            raise LuaError(result)
+        return result
+
+    def if_expression(
+        self, if_exp: ast.IfExpression, env: obj.Environment
+    ) -> Step:
+        condition = yield self.step(if_exp.condition, env)
+
+        if evaluator.is_truthy(condition):
+            return (yield self.step(if_exp.consequence, env))
+        elif if_exp.alternative:
+            return (yield self.step(if_exp.alternative, env))
+
+        return NULL
+
+    def table_literal(
+        self, table_literal: ast.TableLiteral, env: obj.Environment
+    ) -> Step:
+        elements: Dict[obj.Obj, obj.Obj] = {}
+        for key_exp, value_exp in table_literal.elements:
+            key = yield self.step(key_exp, env)
+            elements[key] = yield self.step(value_exp, env)
+
+        active_state = state.active
+        if active_state is not None:
+            error = active_state.allocate(state.table_size(len(elements)))
+            if error is not None:
+                raise LuaError(error)
+
+        return obj.Table(elements=elements)
+
+    def index_expression(
+        self, index_exp: ast.IndexExpression, env: obj.Environment
+    ) -> Step:
+        left = yield self.step(index_exp.left, env)
+        index = yield self.step(index_exp.index, env)
+
+        result = evaluator.evaluate_index_expression(left, index)
+        if result.__class__ is obj.Error:
+            raise LuaError(result)
+        return result
+
+    def call(
+        self, fn: obj.Obj, args: List[obj.Obj], env: obj.Environment
+    ) -> Step:
+        """
+        Calls fn with arguments that are already evaluated, which is how
+        coroutines start
+        """
+
+        return self.call_expression(None, env, fn, args)
+
+    def call_expression(
+        self,
+        call_exp: Optional[ast.CallExpression],
+        env: obj.Environment,
+        fn: Any = None,
+        args: Any = None,
+    ) -> Step:
+        if call_exp is not None:
+            fn = yield self.step(call_exp.function, env)
+
+            args = []
+            for argument in call_exp.arguments:
+                args.append((yield self.step(argument, env)))
+
+            if call_exp.tail_call:
+                return obj.TailCall(fn=fn, args=args)
+
+        if self.depth >= self.max_depth:
+            raise LuaError(obj.Error.create("stack overflow"))
+
+        # Left in a finally, so a runtime error or a coroutine that is
+        # thrown away does not leave the depth too high
+        self.depth = self.depth + 1
+        try:
+            while fn.__class__ is obj.Function and (
+                fn.compiled is None or self.run_compiled
+            ):
+                function = cast(obj.Function, fn)
+                fn_env = evaluator.extend_function_env(function, args)
+
+                active_profiler = profiler.active
+                if active_profiler is not None:
+                    active_profiler.enter(function.body)
+
+                try:
+                    result = yield self.step(function.body, fn_env)
+                except Return as e:
+                    result = e.value
+                except GeneratorExit:
+                    # A suspended coroutine that is thrown away, its
+                    # profiler frames were already left when it yielded
+                    active_profiler = None
+                    raise
+                finally:
+                    if active_profiler is not None:
+                        active_profiler.leave()
+
+                # Made here in a loop, the depth stays the same
+                if result.__class__ is obj.TailCall:
+                    fn = result.fn
+                    args = result.args
+                    continue
+
+                return result
+        finally:
+            self.depth = self.depth - 1
+
+        if fn is coroutine.YIELD:
+            return (yield Suspend(args[0] if args else NULL))
+
+        # Builtins and functions from other backends
+        return evaluator.call_function(fn, args, env)
+
+
+def evaluate(
+    node: ast.Node,
+    env: obj.Environment,
+    max_depth: int = DEFAULT_MAX_DEPTH,
+):
+    return StackEvaluator(max_depth).evaluate(node, env)
+
@@ -0,0 +1,171 @@
+"""
+Interpreter state for running untrusted scripts. A State limits how many
+steps a script may take, how long it may run and how much memory it may
+allocate, and keeps the counters of the last run afterwards.
+
+    state = State(max_steps=1000000, timeout=2.0, max_memory=64 * 1024**2)
+    with state:
+        result = backends.evaluate(program, env)
+    state.steps, state.elapsed, state.memory, state.error
+
+A step is a statement for the tree walking backends and an instruction
+for the VM. Steps are added up where the backends already do work per
+block or per call, the limits themselves are only checked every
+CHECK_INTERVAL steps.
+
+Memory is an estimate in bytes of what the script allocated, sized like
+the structures of the reference Lua implementation. Tables are charged
+when they are created and concatenation for the piece it appends.
+Nothing is given back when values become unreachable, so the count is
+what the run allocated so far rather than what is still alive.
+"""
+
+import time
+from typing import Callable, Optional
+
+from . import obj
+
+
+CHECK_INTERVAL: int = 1000
+
+TABLE_SIZE: int = 56
+TABLE_ENTRY_SIZE: int = 16
+STRING_SIZE: int = 24
+
+
+class State:
+    def __init__(
+        self,
+        max_steps: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_memory: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_steps: Optional[int] = max_steps
+        self.timeout: Optional[float] = timeout
+        self.max_memory: Optional[int] = max_memory
+        self.clock: Callable[[], float] = clock
+
+        # Counters of the current or last run
+        self.steps: int = 0
+        self.elapsed: float = 0.0
+        self.memory: int = 0
+        self.error: Optional[obj.Error] = None
+
+        self.started: float = 0.0
+        self.deadline: Optional[float] = None
+        self.next_check: int = CHECK_INTERVAL
+
+        self.previous: Optional["State"] = None
+
+    def start(self) -> None:
+        global active
+
+        self.steps = 0
+        self.elapsed = 0.0
+        self.memory = 0
+        self.error = None
+        self.started = self.clock()
+        self.deadline = None
+        if self.timeout is not None:
+            self.deadline = self.started + self.timeout
+        self.schedule_check()
+
+        self.previous = active
+        active = self
+
+    def stop(self) -> None:
+        global active
+
+        self.elapsed = self.clock() - self.started
+        active = self.previous
+        self.previous = None
+
+    def __enter__(self) -> "State":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def schedule_check(self) -> None:
+        next_check = self.steps + CHECK_INTERVAL
+        if self.max_steps is not None and next_check > self.max_steps:
+            next_check = self.max_steps + 1
+        self.next_check = next_check
+
+    def check(self) -> Optional[obj.Error]:
+        """
+        Called by the backends once steps reaches next_check, returns the
+        error to abort with when a limit is exceeded
+        """
+
+        if self.max_steps is not None and self.steps > self.max_steps:
+            self.error = obj.Error(
+                message="Step limit of {0} exceeded".format(self.max_steps),
+                kind="steps",
+            )
+            return self.error
+
+        if self.deadline is not None and self.clock() > self.deadline:
+            self.error = obj.Error(
+                message="Timeout of {0}s exceeded".format(self.timeout),
+                kind="timeout",
+            )
+            return self.error
+
+        self.schedule_check()
+        return None
+
+    def charge(self, steps: int) -> None:
+        """
+        Adds steps and raises obj.LuaError when a limit is exceeded
+        """
+
+        self.steps = self.steps + steps
+        if self.steps >= self.next_check:
+            error = self.check()
+            if error is not None:
+                raise obj.LuaError(error)
+
+    def allocate(self, size: int) -> Optional[obj.Error]:
+        """
+        Adds size bytes to memory, returns the error to abort with when
+        that goes past max_memory
+        """
+
+        self.memory = self.memory + size
+        if self.max_memory is not None and self.memory > self.max_memory:
+            self.error = obj.Error(message="not enough memory", kind="memory")
+            return self.error
+        return None
+
+
+def table_size(entries: int) -> int:
+    return TABLE_SIZE + entries * TABLE_ENTRY_SIZE
+
+
+def string_size(length: int) -> int:
+    return STRING_SIZE + length
+
+
+def limited(invoke: Callable, steps: int) -> Callable:
+    """
+    Wraps the entry point of a compiled function so every call is
+    charged steps, the tail call entry point is wrapped as well
+    """
+
+    def limited_invoke(fn_env, args):
+        active_state = active
+        if active_state is not None:
+            active_state.charge(steps)
+        return invoke(fn_env, args)
+
+    enter = getattr(invoke, "enter", None)
+    if enter is not None:
+        limited_invoke.enter = limited(enter, steps)  # type: ignore
+    return limited_invoke
+
+
+# The state of the script that is running, None when nothing is limited
+active: Optional[State] = None
@@ -1,6 +1,6 @@
 from enum import Enum, auto
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 class TokenType(Enum):
@@ -10,6 +10,7 @@ class TokenType(Enum):
 
     IDENTIFIER = auto()
     INT = auto()
+    FLOAT = auto()
     STR = auto()
     NIL = auto()
     TRUE = auto()
@@ -49,6 +50,7 @@ class TokenType(Enum):
 
     COMMA = auto()
     CONCAT = auto()
+    DOT = auto()
 
     # Keywords
     FUNCTION = auto()
@@ -63,3 +65,7 @@ class TokenType(Enum):
 class Token:
     token_type: TokenType
     literal: str
+
+    # Where the token starts in the source, both counted from 1
+    line: int = field(default=0, compare=False)
+    column: int = field(default=0, compare=False)
@@ -0,0 +1,468 @@
+"""
+Generates Python source from a parsed program. The output is compiled
+with compile()/exec and runs against luatopy.runtime, which provides the
+same obj values, environments and builtins as the evaluator.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from typing import cast, Any, Callable, Dict, Iterator, List, Optional, Set
+
+from . import ast
+from . import obj
+from .obj import LuaError
+from .runtime import infix_helpers
+
+
+HEADER = """# Generated by luatopy. FUNCTIONS holds the Lua function literals of
+# the source program and is supplied by the loader.
+from luatopy.runtime import *
+"""
+
+RETURN = "return"
+DISCARD = "discard"
+
+
+@dataclass
+class FunctionContext:
+    locals: Set[str] = field(default_factory=set)
+    store_locals: bool = False
+
+    # Calls marked as tail calls are only returned as TailCall directly
+    # from a function body, never from a helper used as a value
+    tail_calls: bool = False
+
+
+class CodeBuffer:
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self.level: int = 0
+
+    def write(self, line: str) -> None:
+        self.lines.append("    " * self.level + line)
+
+    @contextmanager
+    def indent(self) -> Iterator[None]:
+        self.level = self.level + 1
+        yield
+        self.level = self.level - 1
+
+    def to_code(self) -> str:
+        return "\n".join(self.lines)
+
+
+def is_simple_branch(block: Optional[ast.BlockStatement]) -> bool:
+    if not block or not block.statements:
+        return True
+
+    if len(block.statements) != 1:
+        return False
+
+    statement = block.statements[0]
+    if type(statement) != ast.ExpressionStatement:
+        return False
+
+    expression = cast(ast.ExpressionStatement, statement).expression
+    if type(expression) == ast.FunctionLiteral:
+        return not cast(ast.FunctionLiteral, expression).name
+    return expression is not None
+
+
+def local_name(name: str) -> str:
+    return "v_{0}".format(name)
+
+
+class Transpiler:
+    def __init__(self) -> None:
+        self.constants: List[str] = []
+        self.constant_names: Dict[Any, str] = {}
+        self.functions: List[ast.FunctionLiteral] = []
+        self.definitions: List[CodeBuffer] = []
+        self.helper_count: int = 0
+        self.errors: List[str] = []
+
+    def transpile(self, program: ast.Program) -> str:
+        main = CodeBuffer()
+        main.write("def main(env):")
+        with main.indent():
+            self.emit_block(main, FunctionContext(), program.statements, RETURN)
+
+        out: List[str] = [HEADER]
+        if self.constants:
+            out.append("\n".join(self.constants) + "\n")
+        for definition in self.definitions:
+            out.append(definition.to_code() + "\n")
+        out.append(main.to_code())
+        return "\n\n".join(out) + "\n"
+
+    def emit_block(
+        self,
+        buffer: CodeBuffer,
+        ctx: FunctionContext,
+        statements: List[ast.Node],
+        mode: str,
+    ) -> None:
+        if not statements:
+            buffer.write("return None" if mode == RETURN else "pass")
+            return
+
+        line_count = len(buffer.lines)
+        last_index = len(statements) - 1
+        for index, statement in enumerate(statements):
+            statement_mode = mode if index == last_index else DISCARD
+            self.emit_statement(buffer, ctx, statement, statement_mode)
+
+        if len(buffer.lines) == line_count:
+            buffer.write("pass")
+
+    def emit_statement(
+        self,
+        buffer: CodeBuffer,
+        ctx: FunctionContext,
+        node: ast.Node,
+        mode: str,
+    ) -> None:
+        klass = type(node)
+
+        if klass == ast.ReturnStatement:
+            return_statement = cast(ast.ReturnStatement, node)
+            buffer.write(
+                "return {0}".format(self.expression(ctx, return_statement.value))
+            )
+            return
+
+        if klass == ast.AssignStatement:
+            assignment = cast(ast.AssignStatement, node)
+            self.emit_assignment(
+                buffer,
+                ctx,
+                assignment.name.value,
+                self.expression(ctx, assignment.value),
+            )
+            if mode == RETURN:
+                buffer.write("return None")
+            return
+
+        if klass != ast.ExpressionStatement:
+            self.errors.append("Unable to transpile {0}".format(klass.__name__))
+            return
+
+        expression = cast(ast.ExpressionStatement, node).expression
+        expression_klass = type(expression)
+
+        if expression is None:
+            if mode == RETURN:
+                buffer.write("return None")
+            return
+
+        if expression_klass == ast.IfExpression:
+            self.emit_if(buffer, ctx, cast(ast.IfExpression, expression), mode)
+            return
+
+        if expression_klass == ast.FunctionLiteral:
+            fn_literal = cast(ast.FunctionLiteral, expression)
+            if fn_literal.name:
+                self.emit_assignment(
+                    buffer,
+                    ctx,
+                    fn_literal.name.value,
+                    self.function_literal(ctx, fn_literal),
+                )
+                if mode == RETURN:
+                    buffer.write("return None")
+                return
+
+        value = self.expression(ctx, expression)
+        buffer.write("return {0}".format(value) if mode == RETURN else value)
+
+    def emit_assignment(
+        self, buffer: CodeBuffer, ctx: FunctionContext, name: str, value: str
+    ) -> None:
+        if name in ctx.locals:
+            buffer.write("{0} = {1}".format(local_name(name), value))
+            if ctx.store_locals:
+                buffer.write(
+                    "env.store[{0!r}] = {1}".format(name, local_name(name))
+                )
+            return
+
+        buffer.write("env.store[{0!r}] = {1}".format(name, value))
+
+    def emit_if(
+        self,
+        buffer: CodeBuffer,
+        ctx: FunctionContext,
+        if_exp: ast.IfExpression,
+        mode: str,
+    ) -> None:
+        condition = self.expression(ctx, if_exp.condition)
+        buffer.write(
+            "if (_c := {0}) is not NULL and _c is not FALSE:".format(condition)
+        )
+        with buffer.indent():
+            self.emit_block(buffer, ctx, if_exp.consequence.statements, mode)
+
+        if if_exp.alternative:
+            buffer.write("else:")
+            with buffer.indent():
+                self.emit_block(
+                    buffer, ctx, if_exp.alternative.statements, mode
+                )
+        elif mode == RETURN:
+            buffer.write("else:")
+            with buffer.indent():
+                buffer.write("return NULL")
+
+    def expression(self, ctx: FunctionContext, node: Optional[ast.Node]) -> str:
+        klass = type(node)
+
+        if klass == ast.IntegerLiteral:
+            integer = cast(ast.IntegerLiteral, node).value
+            return self.constant("Integer.create", integer)
+
+        if klass == ast.FloatLiteral:
+            number = cast(ast.FloatLiteral, node).value
+            return self.constant("Float", number)
+
+        if klass == ast.StringLiteral:
+            string = cast(ast.StringLiteral, node).value
+            return self.constant("String.intern", string)
+
+        if klass == ast.Boolean:
+            return "TRUE" if cast(ast.Boolean, node).value else "FALSE"
+
+        if klass == ast.Identifier:
+            name = cast(ast.Identifier, node).value
+            if name in ctx.locals:
+                return local_name(name)
+            return "lookup(env, {0!r})".format(name)
+
+        if klass == ast.InfixExpression:
+            infix_exp = cast(ast.InfixExpression, node)
+            left = self.expression(ctx, infix_exp.left)
+            right = self.expression(ctx, infix_exp.right)
+
+            helper = infix_helpers.get(infix_exp.operator)
+            if helper:
+                return "{0}({1}, {2})".format(helper, left, right)
+            return "infix({0!r}, {1}, {2})".format(
+                infix_exp.operator, left, right
+            )
+
+        if klass == ast.PrefixExpression:
+            prefix_exp = cast(ast.PrefixExpression, node)
+            right = self.expression(ctx, prefix_exp.right)
+            if prefix_exp.operator == "not":
+                return "not_({0})".format(right)
+            return "prefix({0!r}, {1})".format(prefix_exp.operator, right)
+
+        if klass == ast.CallExpression:
+            call_exp = cast(ast.CallExpression, node)
+            function = self.expression(ctx, call_exp.function)
+            arguments = ", ".join(
+                self.expression(ctx, x) for x in call_exp.arguments
+            )
+            if call_exp.tail_call and ctx.tail_calls:
+                return "TailCall({0}, [{1}])".format(function, arguments)
+            return "call({0}, [{1}], env)".format(function, arguments)
+
+        if klass == ast.TableLiteral:
+            table_literal = cast(ast.TableLiteral, node)
+            pairs = ", ".join(
+                "{0}: {1}".format(
+                    self.expression(ctx, key), self.expression(ctx, value)
+                )
+                for key, value in table_literal.elements
+            )
+            return "table({{{0}}})".format(pairs)
+
+        if klass == ast.IndexExpression:
+            index_exp = cast(ast.IndexExpression, node)
+            return "index({0}, {1})".format(
+                self.expression(ctx, index_exp.left),
+                self.expression(ctx, index_exp.index),
+            )
+
+        if klass == ast.FunctionLiteral:
+            fn_literal = cast(ast.FunctionLiteral, node)
+            if fn_literal.name:
+                return self.helper(
+                    ctx,
+                    ast.ExpressionStatement(
+                        token=fn_literal.token,
+                        expression=cast(ast.Expression, fn_literal),
+                    ),
+                )
+            return self.function_literal(ctx, fn_literal)
+
+        if klass == ast.IfExpression:
+            if_exp = cast(ast.IfExpression, node)
+            if is_simple_branch(if_exp.consequence) and is_simple_branch(
+                if_exp.alternative
+            ):
+                return self.conditional_expression(ctx, if_exp)
+            return self.helper(
+                ctx,
+                ast.ExpressionStatement(token=if_exp.token, expression=if_exp),
+            )
+
+        if node is None:
+            return "None"
+
+        self.errors.append("Unable to transpile {0}".format(klass.__name__))
+        return "None"
+
+    def conditional_expression(
+        self, ctx: FunctionContext, if_exp: ast.IfExpression
+    ) -> str:
+        def branch_value(block: Optional[ast.BlockStatement]) -> str:
+            if block is None or not block.statements:
+                return "None"
+            statement = cast(ast.ExpressionStatement, block.statements[0])
+            return self.expression(ctx, statement.expression)
+
+        consequence = branch_value(if_exp.consequence)
+        alternative = (
+            branch_value(if_exp.alternative) if if_exp.alternative else "NULL"
+        )
+        return "({0} if truthy({1}) else {2})".format(
+            consequence, self.expression(ctx, if_exp.condition), alternative
+        )
+
+    def helper(self, ctx: FunctionContext, statement: ast.Node) -> str:
+        """
+        Statements that are used as values are moved into a module level
+        function, callers never keep locals when this is needed.
+        """
+
+        name = "_helper_{0}".format(self.helper_count)
+        self.helper_count = self.helper_count + 1
+
+        buffer = CodeBuffer()
+        buffer.write("def {0}(env):".format(name))
+        with buffer.indent():
+            self.emit_statement(
+                buffer, replace(ctx, tail_calls=False), statement, RETURN
+            )
+        self.definitions.append(buffer)
+
+        return "{0}(env)".format(name)
+
+    def function_literal(
+        self, ctx: FunctionContext, fn_literal: ast.FunctionLiteral
+    ) -> str:
+        index = len(self.functions)
+        self.functions.append(fn_literal)
+        name = "_fn_{0}".format(index)
+
+        self.definitions.append(self.function_definition(name, fn_literal))
+        return "make_function(env, FUNCTIONS[{0}], {1})".format(index, name)
+
+    def function_definition(
+        self, name: str, fn_literal: ast.FunctionLiteral
+    ) -> CodeBuffer:
+        assigns = False
+        closures = False
+        helpers = False
+        statement_expressions = set()
+
+        tail_calls = False
+
+        for node in ast.iter_scope_nodes(fn_literal.body):
+            klass = type(node)
+            if klass == ast.CallExpression:
+                call_exp = cast(ast.CallExpression, node)
+                tail_calls = tail_calls or call_exp.tail_call
+            if klass == ast.ExpressionStatement:
+                expression = cast(ast.ExpressionStatement, node).expression
+                statement_expressions.add(id(expression))
+            if klass == ast.AssignStatement:
+                assigns = True
+            if klass == ast.FunctionLiteral:
+                closures = True
+                if cast(ast.FunctionLiteral, node).name:
+                    assigns = True
+                    helpers = helpers or id(node) not in statement_expressions
+            if klass == ast.IfExpression and id(node) not in statement_expressions:
+                if_exp = cast(ast.IfExpression, node)
+                helpers = helpers or not (
+                    is_simple_branch(if_exp.consequence)
+                    and is_simple_branch(if_exp.alternative)
+                )
+
+        parameters = [x.value for x in fn_literal.parameters]
+        own_env = assigns or closures or helpers
+
+        ctx = FunctionContext(
+            locals=set() if helpers else set(parameters),
+            store_locals=closures,
+            tail_calls=True,
+        )
+
+        buffer = CodeBuffer()
+        buffer.write(
+            "def {0}({1}, args):".format(name, "fn_env" if own_env else "env")
+        )
+        with buffer.indent():
+            if own_env:
+                buffer.write("env = Environment(fn_env)")
+
+            if parameters:
+                targets = ", ".join(local_name(x) for x in parameters) + ","
+                buffer.write("if len(args) == {0}:".format(len(parameters)))
+                with buffer.indent():
+                    buffer.write("{0} = args".format(targets))
+                buffer.write("else:")
+                with buffer.indent():
+                    buffer.write(
+                        "{0} = bind(args, {1})".format(targets, len(parameters))
+                    )
+
+                if helpers or closures:
+                    for parameter in parameters:
+                        buffer.write(
+                            "env.store[{0!r}] = {1}".format(
+                                parameter, local_name(parameter)
+                            )
+                        )
+
+            self.emit_block(buffer, ctx, fn_literal.body.statements, RETURN)
+
+        if tail_calls:
+            buffer.write("{0} = tail_calls({0})".format(name))
+
+        return buffer
+
+    def constant(self, constructor: str, value: Any) -> str:
+        key = (constructor, value)
+        if key not in self.constant_names:
+            name = "K{0}".format(len(self.constants))
+            self.constants.append(
+                "{0} = {1}(value={2!r})".format(name, constructor, value)
+            )
+            self.constant_names[key] = name
+        return self.constant_names[key]
+
+
+def load(program: ast.Program) -> Callable[[obj.Environment], Any]:
+    transpiler = Transpiler()
+    source = transpiler.transpile(program)
+
+    if transpiler.errors:
+        raise ValueError(transpiler.errors[0])
+
+    namespace: Dict[str, Any] = {"FUNCTIONS": transpiler.functions}
+    exec(compile(source, "<luatopy>", "exec"), namespace)
+    return namespace["main"]
+
+
+def evaluate(program: ast.Program, env: obj.Environment):
+    try:
+        main = load(program)
+    except ValueError as e:
+        return obj.Error.create(str(e))
+
+    try:
+        return main(env)
+    except LuaError as e:
+        return e.error
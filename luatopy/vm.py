@@ -0,0 +1,408 @@
+from dataclasses import dataclass
+from typing import cast, List, Optional
+
+from . import ast
+from . import obj
+from . import evaluator
+from . import profiler
+from . import state
+from .code import OpCode, operator_names
+from .compiler import Bytecode, Compiler
+from .builtins import builtins
+from .obj import TRUE, FALSE, NULL
+
+
+# Plain int aliases, the run loop compares against these on every
+# instruction and IntEnum attribute lookups are noticeably slower
+CONSTANT = int(OpCode.CONSTANT)
+NIL = int(OpCode.NIL)
+PUSH_TRUE = int(OpCode.TRUE)
+PUSH_FALSE = int(OpCode.FALSE)
+NO_VALUE = int(OpCode.NO_VALUE)
+POP = int(OpCode.POP)
+ADD = int(OpCode.ADD)
+SUB = int(OpCode.SUB)
+MUL = int(OpCode.MUL)
+EQ = int(OpCode.EQ)
+NOT_EQ = int(OpCode.NOT_EQ)
+GT = int(OpCode.GT)
+GTE = int(OpCode.GTE)
+LT = int(OpCode.LT)
+LTE = int(OpCode.LTE)
+JUMP = int(OpCode.JUMP)
+JUMP_NOT_TRUTHY = int(OpCode.JUMP_NOT_TRUTHY)
+GET_NAME = int(OpCode.GET_NAME)
+SET_NAME = int(OpCode.SET_NAME)
+TABLE = int(OpCode.TABLE)
+INDEX = int(OpCode.INDEX)
+CALL = int(OpCode.CALL)
+TAIL_CALL = int(OpCode.TAIL_CALL)
+RETURN_VALUE = int(OpCode.RETURN_VALUE)
+CLOSURE = int(OpCode.CLOSURE)
+MINUS = int(OpCode.MINUS)
+NOT = int(OpCode.NOT)
+LEN = int(OpCode.LEN)
+
+FIRST_INFIX = int(OpCode.ADD)
+LAST_INFIX = int(OpCode.OR)
+
+# Pushed for statements without a value, a run or call that ends on one
+# returns None like the evaluator does
+NO_RESULT: obj.Obj = cast(obj.Obj, None)
+
+
+@dataclass
+class Frame:
+    code: obj.CompiledFunction
+    env: obj.Environment
+    base_pointer: int
+    ip: int = 0
+
+
+class VM:
+    def __init__(
+        self, bytecode: Bytecode, env: Optional[obj.Environment] = None
+    ) -> None:
+        self.env: obj.Environment = env if env is not None else obj.Environment()
+
+        main_fn = obj.CompiledFunction(
+            instructions=bytecode.instructions,
+            constants=bytecode.constants,
+            names=bytecode.names,
+        )
+
+        self.frames: List[Frame] = [
+            Frame(code=main_fn, env=self.env, base_pointer=0)
+        ]
+        self.stack: List[obj.Obj] = []
+
+    def run(self) -> Optional[obj.Obj]:
+        active_profiler = profiler.active
+        active_state = state.active
+        if active_profiler is None:
+            return self.execute(None, active_state)
+
+        # Errors end the run without returning from the open frames
+        depth = len(active_profiler.frames)
+        try:
+            return self.execute(active_profiler, active_state)
+        finally:
+            while len(active_profiler.frames) > depth:
+                active_profiler.leave()
+
+    def execute(
+        self,
+        active_profiler: Optional[profiler.Profiler],
+        active_state: Optional[state.State],
+    ) -> Optional[obj.Obj]:
+        frames = self.frames
+        stack = self.stack
+        push = stack.append
+        pop = stack.pop
+        frame = frames[-1]
+        ins = frame.code.instructions
+        constants = frame.code.constants
+        names = frame.code.names
+        env = frame.env
+        ip = frame.ip
+
+        # Jumps only go forward, so the instructions run since the last
+        # call or return are counted as the distance from segment to ip
+        segment = ip
+
+        Integer = obj.Integer
+        create_integer = obj.Integer.create
+        evaluate_infix = evaluator.evaluate_infix
+
+        while True:
+            op = ins[ip]
+            ip = ip + 1
+
+            if op == GET_NAME:
+                name = names[ins[ip]]
+                ip = ip + 1
+
+                scope: Optional[obj.Environment] = env
+                while scope is not None:
+                    store = scope.store
+                    if name in store:
+                        push(store[name])
+                        break
+                    scope = scope.outer
+                else:
+                    push(builtins.get(name, NULL))
+                continue
+
+            if op == CONSTANT:
+                push(constants[ins[ip]])
+                ip = ip + 1
+                continue
+
+            if op == POP:
+                pop()
+                continue
+
+            if op == SET_NAME:
+                env.store[names[ins[ip]]] = pop()
+                ip = ip + 1
+                continue
+
+            if FIRST_INFIX <= op <= LAST_INFIX:
+                right = pop()
+                left = pop()
+
+                if left.__class__ is Integer and right.__class__ is Integer:
+                    if op == ADD:
+                        push(create_integer(left.value + right.value))
+                        continue
+                    if op == SUB:
+                        push(create_integer(left.value - right.value))
+                        continue
+                    if op == MUL:
+                        push(create_integer(left.value * right.value))
+                        continue
+                    if op == LT:
+                        push(TRUE if left.value < right.value else FALSE)
+                        continue
+                    if op == GT:
+                        push(TRUE if left.value > right.value else FALSE)
+                        continue
+                    if op == EQ:
+                        push(TRUE if left.value == right.value else FALSE)
+                        continue
+                    if op == LTE:
+                        push(TRUE if left.value <= right.value else FALSE)
+                        continue
+                    if op == GTE:
+                        push(TRUE if left.value >= right.value else FALSE)
+                        continue
+
+                result = evaluate_infix(op, left, right)
+                if result.__class__ is obj.Error:
+                    return result
+                push(result)
+                continue
+
+            if op == JUMP_NOT_TRUTHY:
+                condition = pop()
+                if condition is NULL or condition is FALSE:
+                    ip = ins[ip]
+                else:
+                    ip = ip + 1
+                continue
+
+            if op == JUMP:
+                ip = ins[ip]
+                continue
+
+            if op == CALL or op == TAIL_CALL:
+                num_args = ins[ip]
+                ip = ip + 1
+
+                if active_state is not None:
+                    active_state.steps = active_state.steps + ip - segment
+                    segment = ip
+                    if active_state.steps >= active_state.next_check:
+                        error = active_state.check()
+                        if error is not None:
+                            return error
+
+                base_pointer = len(stack) - num_args - 1
+                fn = stack[base_pointer]
+                args = stack[base_pointer + 1 :]
+                del stack[base_pointer:]
+
+                if fn.__class__ is obj.Function:
+                    function = cast(obj.Function, fn)
+                    fn_code = function.code
+                    if fn_code is None:
+                        # Created by the tree walking evaluator
+                        result = evaluator.apply_function(function, args, env)
+                        if result.__class__ is obj.Error:
+                            return result
+                        push(result)
+                        continue
+
+                    call_env = obj.Environment(outer=function.env)
+                    call_store = call_env.store
+                    for index, param in enumerate(function.parameters):
+                        call_store[param.value] = (
+                            args[index] if index < num_args else NULL
+                        )
+
+                    if op == TAIL_CALL:
+                        # The current frame is done, the callee takes
+                        # its place instead of stacking on top
+                        frames.pop()
+                        base_pointer = frame.base_pointer
+                        del stack[base_pointer:]
+
+                        # The bottom frame of a run is not profiled
+                        if active_profiler is not None and frames:
+                            active_profiler.leave()
+                    else:
+                        frame.ip = ip
+
+                    if active_profiler is not None:
+                        active_profiler.enter(function.body)
+
+                    frame = Frame(
+                        code=fn_code, env=call_env, base_pointer=base_pointer
+                    )
+                    frames.append(frame)
+
+                    ins = fn_code.instructions
+                    constants = fn_code.constants
+                    names = fn_code.names
+                    env = call_env
+                    ip = 0
+                    segment = 0
+                    continue
+
+                if fn.__class__ is obj.Builtin:
+                    builtin_fn = cast(obj.Builtin, fn)
+                    result = builtin_fn.fn(*args)
+                    if result.__class__ is obj.Error:
+                        return result
+                    push(result)
+                    continue
+
+                return obj.Error.create("Not a function {0}", fn.type())
+
+            if op == RETURN_VALUE:
+                return_value = pop()
+                frames.pop()
+
+                if active_state is not None:
+                    active_state.steps = active_state.steps + ip - segment
+
+                if not frames:
+                    return return_value
+
+                if active_profiler is not None:
+                    active_profiler.leave()
+
+                del stack[frame.base_pointer :]
+                push(return_value)
+
+                frame = frames[-1]
+                ins = frame.code.instructions
+                constants = frame.code.constants
+                names = frame.code.names
+                env = frame.env
+                ip = frame.ip
+                segment = ip
+                continue
+
+            if op == INDEX:
+                index_value = pop()
+                left = pop()
+                result = evaluator.evaluate_index_expression(left, index_value)
+                if result.__class__ is obj.Error:
+                    return result
+                push(result)
+                continue
+
+            if op == TABLE:
+                num_elements = ins[ip]
+                ip = ip + 1
+
+                start = len(stack) - num_elements * 2
+                items = stack[start:]
+                del stack[start:]
+
+                if active_state is not None:
+                    error = active_state.allocate(
+                        state.table_size(num_elements)
+                    )
+                    if error is not None:
+                        return error
+
+                table = obj.Table()
+                for pos in range(0, len(items), 2):
+                    table.set(items[pos], items[pos + 1])
+                push(table)
+                continue
+
+            if op == CLOSURE:
+                compiled_fn = cast(obj.CompiledFunction, constants[ins[ip]])
+                ip = ip + 1
+
+                invoke = compiled_fn.invoke
+                if invoke is None:
+                    invoke = compiled_fn.invoke = function_invoker(compiled_fn)
+
+                push(
+                    obj.Function(
+                        # Only the main program is compiled without a body
+                        body=cast(ast.BlockStatement, compiled_fn.body),
+                        env=env,
+                        parameters=compiled_fn.parameters,
+                        code=compiled_fn,
+                        compiled=invoke,
+                    )
+                )
+                continue
+
+            if op == NO_VALUE:
+                push(NO_RESULT)
+                continue
+
+            if op == NIL:
+                push(NULL)
+                continue
+
+            if op == PUSH_TRUE:
+                push(TRUE)
+                continue
+
+            if op == PUSH_FALSE:
+                push(FALSE)
+                continue
+
+            if op == MINUS or op == NOT or op == LEN:
+                result = evaluator.evaluate_prefix_expression(
+                    operator_names[op], pop()
+                )
+                if result.__class__ is obj.Error:
+                    return result
+                push(result)
+                continue
+
+            return obj.Error.create("Unknown opcode {0}", op)
+
+
+def function_invoker(compiled_fn: obj.CompiledFunction):
+    """
+    Entry point used when a function created by the VM is called from
+    another backend, the call runs on a VM of its own.
+    """
+
+    bytecode = Bytecode(
+        instructions=compiled_fn.instructions,
+        constants=compiled_fn.constants,
+        names=compiled_fn.names,
+    )
+    parameters = [x.value for x in compiled_fn.parameters]
+
+    def invoke(fn_env: obj.Environment, args: List[obj.Obj]):
+        call_env = obj.Environment(outer=fn_env)
+        for index, name in enumerate(parameters):
+            call_env.store[name] = args[index] if index < len(args) else NULL
+
+        result = VM(bytecode, call_env).run()
+        if result.__class__ is obj.Error:
+            raise obj.LuaError(cast(obj.Error, result))
+        return result
+
+    return invoke
+
+
+def evaluate(program: ast.Program, env: obj.Environment) -> Optional[obj.Obj]:
+    compiler = Compiler()
+    compiler.compile(program)
+
+    if compiler.errors:
+        return obj.Error.create(compiler.errors[0])
+
+    return VM(compiler.bytecode(), env).run()
@@ -5,13 +5,29 @@ import click
 from luatopy.lexer import Lexer
 from luatopy.parser import Parser
 from luatopy.obj import Environment
-from luatopy import evaluator
+from luatopy import backends
+from luatopy import optimizer
+from luatopy.profiler import Profiler
 
 
 @click.command()
 @click.option('--tokens', is_flag=True, help='Show lexer tokens')
 @click.option('--ast-code', is_flag=True, help='Show AST code')
-def run(tokens, ast_code):
+@click.option(
+    '--backend',
+    type=click.Choice(list(backends.backends)),
+    default='tree',
+    help='Execution backend',
+)
+@click.option(
+    '--optimize/--no-optimize',
+    default=True,
+    help='Fold constants and remove dead branches',
+)
+@click.option(
+    '--profile', is_flag=True, help='Show time spent in each Lua function'
+)
+def run(tokens, ast_code, backend, optimize, profile):
     print("luatopy repl")
     if tokens:
         print("* Config: Show lexer tokens")
@@ -19,6 +35,14 @@ def run(tokens, ast_code):
     if ast_code:
         print("* Config: Show ast code")
 
+    if backend != 'tree':
+        print("* Config: Using {0} backend".format(backend))
+
+    function_profiler = Profiler() if profile else None
+    if function_profiler:
+        print("* Config: Profile functions")
+        function_profiler.start()
+
     env = Environment()
     while True:
         source = input("> ")
@@ -33,13 +57,22 @@ def run(tokens, ast_code):
             for err in parser.errors:
                 print("ERROR: {0}".format(err))
 
+        if optimize:
+            program = optimizer.optimize(program)
+
         if ast_code:
             print(program.to_code())
 
-        evaluated = evaluator.evaluate(program, env)
+        if function_profiler:
+            function_profiler.add_program(program)
+
+        evaluated = backends.evaluate(program, env, backend)
         if evaluated:
             print(evaluated.inspect())
 
+        if function_profiler and function_profiler.functions:
+            print(function_profiler.report())
+
 
 if __name__ == '__main__':
     run()
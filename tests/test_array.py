@@ -0,0 +1,178 @@
+from io import StringIO
+import subprocess
+import sys
+import unittest
+
+from luatopy.lexer import Lexer
+from luatopy.parser import Parser
+from luatopy import obj
+from luatopy import backends
+from luatopy.array import NUMPY_AVAILABLE
+from luatopy.state import State
+
+
+BACKENDS = ["tree", "stack", "closure", "vm", "python"]
+
+
+@unittest.skipIf(not NUMPY_AVAILABLE, "NumPy is not installed")
+class ArrayLibraryTest(unittest.TestCase):
+    def test_index_and_length(self):
+        tests = [
+            ("a = array.new({3, 1, 2}); a[1]", obj.Integer(3)),
+            ("a = array.new({3, 1.5}); a[2]", obj.Float(1.5)),
+            ("a = array.new({3, 1, 2}); a[4]", obj.NULL),
+            ("a = array.new({3, 1, 2}); a.x", obj.NULL),
+            ("#array.new({3, 1, 2})", obj.Integer(3)),
+            ("#array.zeros(5)", obj.Integer(5)),
+            ("#array.new({})", obj.Integer(0)),
+            ("type(array.range(1, 3))", obj.String("table")),
+        ]
+
+        for source, expected in tests:
+            for backend in BACKENDS:
+                evaluated = evaluate(source, backend)
+                self.assertEqual(evaluated, expected, (source, backend))
+
+    def test_elementwise_arithmetic(self):
+        tests = [
+            ("array.add(array.range(1, 3), array.range(1, 3))", [2, 4, 6]),
+            ("array.sub(array.range(1, 3), 1)", [0, 1, 2]),
+            ("array.sub(10, array.range(1, 3))", [9, 8, 7]),
+            ("array.mul(array.new({1, 2}), 2.5)", [2.5, 5.0]),
+            ("array.div(array.range(1, 4), 2)", [0.5, 1.0, 1.5, 2.0]),
+            ("array.mod(array.range(5, 7), 5)", [0.0, 1.0, 2.0]),
+        ]
+
+        for source, expected in tests:
+            evaluated = evaluate(source)
+            self.assertEqual(evaluated.data.tolist(), expected, source)
+
+    def test_reductions(self):
+        tests = [
+            ("array.sum(array.range(1, 100))", obj.Integer(5050)),
+            ("array.sum(array.new({}))", obj.Integer(0)),
+            ("array.sum(array.new({1, 0.5}))", obj.Float(1.5)),
+            ("array.min(array.new({3, 1, 2}))", obj.Integer(1)),
+            ("array.max(array.new({3, 1, 2}))", obj.Integer(3)),
+            ("array.mean(array.new({1, 2}))", obj.Float(1.5)),
+        ]
+
+        for source, expected in tests:
+            for backend in BACKENDS:
+                evaluated = evaluate(source, backend)
+                self.assertEqual(evaluated, expected, (source, backend))
+
+    def test_slice_and_sort(self):
+        tests = [
+            ("array.slice(array.range(1, 5), 2, 4)", [2, 3, 4]),
+            ("array.slice(array.range(1, 5), 3)", [3, 4, 5]),
+            ("array.slice(array.range(1, 5), -2)", [4, 5]),
+            ("array.slice(array.range(1, 5), 4, 2)", []),
+            ("array.slice(array.range(1, 5), 0, 9)", [1, 2, 3, 4, 5]),
+            ("array.sort(array.new({3, 1, 2}))", [1, 2, 3]),
+        ]
+
+        for source, expected in tests:
+            evaluated = evaluate(source)
+            self.assertEqual(evaluated.data.tolist(), expected, source)
+
+    def test_totable(self):
+        evaluated = evaluate("array.totable(array.new({1, 2}))")
+
+        self.assertIs(type(evaluated), obj.Table)
+        self.assertEqual(evaluated.array, [obj.Integer(1), obj.Integer(2)])
+
+    def test_errors(self):
+        tests = [
+            ("array.new(1)", "Bad argument to new, table expected"),
+            (
+                'array.new({1, "a"})',
+                "Invalid value (at index 2) in table for new",
+            ),
+            ("array.add(1, 2)", "Bad argument to add, array expected"),
+            (
+                'array.add(array.zeros(2), "a")',
+                "Bad argument to add, array or number expected",
+            ),
+            (
+                "array.add(array.zeros(2), array.zeros(3))",
+                "Bad argument to add, arrays of different length",
+            ),
+            ("array.min(array.new({}))", "Bad argument to min, empty array"),
+            ("array.sum({1, 2})", "Bad argument to sum, array expected"),
+        ]
+
+        for source, expected in tests:
+            evaluated = evaluate(source)
+            self.assertEqual(type(evaluated), obj.Error, source)
+            self.assertEqual(evaluated.message, expected)
+
+    def test_integer_overflow(self):
+        big = 2**62
+        tests = [
+            "array.add(array.new({{{0}}}), {0})".format(big),
+            "array.sub(array.new({{0 - {0} - {0}}}), 1)".format(big),
+            "array.mul(array.new({{1, {0}}}), 2)".format(big),
+        ]
+
+        for source in tests:
+            evaluated = evaluate(source)
+            self.assertEqual(type(evaluated), obj.Error, source)
+            self.assertTrue(evaluated.message.startswith("Integer overflow"))
+
+        source = "array.mul(array.new({{{0}}}), 0 - 2)".format(big)
+        self.assertEqual(evaluate(source).data.tolist(), [-(2**63)])
+
+        source = "array.sum(array.new({{{0}, {0}, 1}}))".format(big)
+        evaluated = evaluate(source)
+        self.assertEqual(evaluated, obj.Integer(2**63 + 1))
+
+    def test_table_concat(self):
+        evaluated = evaluate('table.concat(array.range(1, 4), ", ", 2)')
+        self.assertEqual(evaluated, obj.String("2, 3, 4"))
+
+    def test_memory_is_accounted(self):
+        script_state = State()
+        with script_state:
+            evaluate("a = array.zeros(1000)")
+
+        self.assertGreaterEqual(script_state.memory, 8000)
+
+        script_state = State(max_memory=4096)
+        with script_state:
+            evaluated = evaluate("a = array.zeros(1000)")
+
+        self.assertEqual(type(evaluated), obj.Error)
+        self.assertEqual(evaluated.kind, "memory")
+
+    def test_memory_limit_is_checked_before_allocating(self):
+        # Would need 80 GB if NumPy was asked for it
+        script_state = State(max_memory=1024**2)
+        with script_state:
+            evaluated = evaluate("a = array.range(1, 10000000000)")
+
+        self.assertEqual(type(evaluated), obj.Error)
+        self.assertEqual(evaluated.kind, "memory")
+
+    def test_numpy_is_imported_on_first_use(self):
+        source = (
+            "import sys\n"
+            "from luatopy import evaluator\n"
+            "print('numpy' in sys.modules)\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", source],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+        self.assertEqual(output, "False\n")
+        self.assertEqual(evaluate("array.sum(array.range(1, 3))").value, 6)
+
+
+def evaluate(source, backend="tree"):
+    parser = Parser(Lexer(StringIO(source)))
+    program = parser.parse_program()
+    assert not parser.errors, parser.errors
+    return backends.evaluate(program, obj.Environment(), backend)
@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from luatopy.batch import collect_scripts, run_script, run_batch
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_script(self, name, source):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(source)
+        return path
+
+    def test_collect_scripts(self):
+        first = self.write_script("jobs/b.lua", "1")
+        second = self.write_script("jobs/nested/a.lua", "2")
+        self.write_script("jobs/notes.txt", "")
+        single = self.write_script("single.lua", "3")
+
+        scripts = collect_scripts(
+            [os.path.join(self.directory, "jobs"), single]
+        )
+
+        self.assertEqual(scripts, [first, second, single])
+
+    def test_run_script(self):
+        path = self.write_script(
+            "script.lua", 'print("hello")\nfunction f (x) return 2 * x end f(4)'
+        )
+
+        job = run_script(path)
+
+        self.assertEqual(job["status"], "ok")
+        self.assertEqual(job["result"], "8")
+        self.assertIsNone(job["error"])
+        self.assertEqual(job["stdout"], "hello\n")
+        self.assertGreater(job["steps"], 0)
+
+    def test_run_script_failures(self):
+        tests = [
+            ("a = ", {}, "parse_error"),
+            ("1 + true", {}, "error"),
+            ("function f () return f() end f()", {"max_steps": 100}, "steps"),
+            ("function f () return f() end f()", {"timeout": 0.0}, "timeout"),
+            ("t = {1, 2, 3}", {"max_memory": 10}, "memory"),
+        ]
+
+        for source, limits, expected in tests:
+            path = self.write_script("script.lua", source)
+            job = run_script(path, **limits)
+
+            self.assertEqual(job["status"], expected, source)
+            self.assertIsNotNone(job["error"])
+
+    def test_run_script_interpreter_failure(self):
+        path = self.write_script("script.lua", 'print("before")\na = 1 / 0')
+
+        job = run_script(path)
+
+        self.assertEqual(job["status"], "error")
+        self.assertEqual(job["error"], "ZeroDivisionError: division by zero")
+        self.assertEqual(job["stdout"], "before\n")
+        self.assertGreater(job["elapsed"], 0.0)
+
+    def test_jobs_without_result_are_given_up(self):
+        self.write_script(
+            "jobs/runaway.lua", "function f () return f() end f()"
+        )
+        self.write_script("jobs/sum.lua", "1 + 1")
+
+        # Waits half a second for a job allowed to run for one, the job
+        # queued behind it gets its own half second once it starts
+        with mock.patch("luatopy.batch.RESULT_GRACE", -0.5):
+            report = run_batch(
+                [os.path.join(self.directory, "jobs")], workers=1, timeout=1.0
+            )
+
+        self.assertEqual(
+            report["summary"]["statuses"], {"timeout": 1, "ok": 1}
+        )
+        self.assertTrue(report["jobs"][0]["error"].startswith("No result"))
+        self.assertEqual(report["jobs"][1]["result"], "2")
+
+    @unittest.skipIf(
+        multiprocessing.get_start_method() != "fork",
+        "The patched run_script only reaches forked processes",
+    )
+    def test_crashed_jobs_are_reported(self):
+        self.write_script("jobs/exit.lua", "1 + 1")
+
+        with mock.patch("luatopy.batch.run_script", side_effect=SystemExit):
+            report = run_batch([os.path.join(self.directory, "jobs")])
+
+        self.assertEqual(report["summary"]["statuses"], {"crashed": 1})
+        self.assertEqual(
+            report["jobs"][0]["error"], "Process exited with code 0"
+        )
+
+    def test_run_batch(self):
+        self.write_script("jobs/ok.lua", "1 + 1")
+        self.write_script("jobs/print.lua", 'print("a" .. "b")')
+        self.write_script(
+            "jobs/runaway.lua", "function f () return f() end f()"
+        )
+
+        report = run_batch(
+            [os.path.join(self.directory, "jobs")],
+            workers=2,
+            backend="vm",
+            max_steps=1000,
+        )
+
+        self.assertEqual(report["workers"], 2)
+        self.assertEqual(
+            report["summary"],
+            {
+                "total": 3,
+                "ok": 2,
+                "failed": 1,
+                "statuses": {"ok": 2, "steps": 1},
+            },
+        )
+        jobs = {os.path.basename(x["path"]): x for x in report["jobs"]}
+        self.assertEqual(jobs["ok.lua"]["result"], "2")
+        self.assertEqual(jobs["print.lua"]["stdout"], "ab\n")
+        self.assertEqual(jobs["runaway.lua"]["status"], "steps")
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            run_batch([self.directory], backend="unknown")
@@ -0,0 +1,39 @@
+import unittest
+
+from benchmarks import suite
+from luatopy.parser import Parser
+
+
+class BenchmarkSuiteTest(unittest.TestCase):
+    def test_workloads_parse(self):
+        for name, read in suite.WORKLOADS.items():
+            parser = Parser(suite.TokenReplay(suite.lex(read())))
+            parser.parse_program()
+
+            self.assertEqual(parser.errors, [], name)
+
+    def test_compare_flags_regressions(self):
+        baseline = results({"fib": {"lex": 1.0, "parse": 1.0, "evaluate": 1.0}})
+        current = results(
+            {
+                "fib": {"lex": 1.05, "parse": 0.5, "evaluate": 1.2},
+                "strings": {"lex": 1.0, "parse": 1.0, "evaluate": 1.0},
+            }
+        )
+
+        rows = suite.compare(baseline, current, threshold=0.1)
+
+        self.assertEqual(
+            [(x["phase"], x["regression"]) for x in rows],
+            [("lex", False), ("parse", False), ("evaluate", True)],
+        )
+        self.assertAlmostEqual(rows[2]["ratio"], 1.2)
+
+
+def results(timings):
+    return {
+        "results": {
+            name: {phase: {"best": x} for phase, x in phases.items()}
+            for name, phases in timings.items()
+        }
+    }
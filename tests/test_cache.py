@@ -0,0 +1,118 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from luatopy import ast
+from luatopy import obj
+from luatopy import evaluator
+from luatopy.cache import ParseCache, parse_path
+
+
+class ParseCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.cache_directory = os.path.join(self.directory, "cache")
+
+    def write_script(self, name, source):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            f.write(source)
+        return path
+
+    def test_second_parse_is_loaded_from_cache(self):
+        path = self.write_script(
+            "script.lua", "function f (x) return x * 2 end; f(4)"
+        )
+        cache = ParseCache(self.cache_directory)
+
+        cache.parse(path)
+        program, errors = cache.parse(path)
+
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+        self.assertEqual(errors, [])
+        self.assertTrue(program.resolved)
+        evaluated = evaluator.evaluate(program, obj.Environment())
+        self.assertEqual(evaluated.value, 8)
+
+    def test_changed_source_misses(self):
+        path = self.write_script("script.lua", "1 + 1")
+        cache = ParseCache(self.cache_directory)
+        cache.parse(path)
+
+        self.write_script("script.lua", "2 + 2")
+        program, _ = cache.parse(path)
+
+        self.assertEqual(cache.misses, 2)
+        evaluated = evaluator.evaluate(program, obj.Environment())
+        self.assertEqual(evaluated.value, 4)
+
+    def test_programs_with_errors_are_not_cached(self):
+        path = self.write_script("script.lua", "a = ")
+        cache = ParseCache(self.cache_directory)
+
+        _, errors = cache.parse(path)
+
+        self.assertNotEqual(errors, [])
+        self.assertEqual(cache.entries(), [])
+
+    def test_stale_and_corrupt_entries_are_removed(self):
+        path = self.write_script("script.lua", "1")
+        cache = ParseCache(self.cache_directory)
+        os.makedirs(self.cache_directory)
+
+        stale = os.path.join(self.cache_directory, "luatopy-0.0.0-old.abc.ast")
+        with open(stale, "wb") as f:
+            f.write(b"old")
+        with open(cache.entry_path(cache.key(path)), "wb") as f:
+            f.write(b"not a pickle")
+
+        program, _ = cache.parse(path)
+
+        self.assertEqual(type(program), ast.Program)
+        self.assertEqual(cache.misses, 1)
+        self.assertFalse(os.path.exists(stale))
+        self.assertEqual(len(cache.entries()), 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ParseCache(self.cache_directory)
+        paths = [
+            self.write_script("{0}.lua".format(x), "a = {0}".format(x))
+            for x in range(3)
+        ]
+
+        for index, path in enumerate(paths):
+            cache.parse(path)
+            entry_path = cache.entry_path(cache.key(path))
+            os.utime(entry_path, (time.time() - 100 + index,) * 2)
+
+        entry_size = cache.entries()[0][1]
+        cache.max_size = entry_size * 2
+        cache.evict()
+
+        remaining = [entry_path for _, _, entry_path in cache.entries()]
+        self.assertEqual(len(remaining), 2)
+        self.assertNotIn(cache.entry_path(cache.key(paths[0])), remaining)
+
+    def test_failed_store_removes_the_temporary_file(self):
+        path = self.write_script("script.lua", "1")
+        cache = ParseCache(self.cache_directory)
+        program, _ = parse_path(path)
+
+        with mock.patch("os.replace", side_effect=OSError("disk full")):
+            stored = cache.store(cache.key(path), program)
+
+        self.assertFalse(stored)
+        self.assertEqual(os.listdir(self.cache_directory), [])
+
+    def test_parse_path_without_cache(self):
+        path = self.write_script("script.lua", "1 + 2")
+
+        program, errors = parse_path(path)
+
+        self.assertEqual(errors, [])
+        evaluated = evaluator.evaluate(program, obj.Environment())
+        self.assertEqual(evaluated.value, 3)
@@ -0,0 +1,55 @@
+from luatopy import obj
+from luatopy import evaluator
+from luatopy import closure_compiler
+from luatopy import backends
+
+from tests import test_evaluator
+from tests.test_parser import program_from_source
+
+
+class ClosureCompilerTest(test_evaluator.EvaluatorTest):
+    """
+    Runs the whole evaluator suite against the closure compiled backend
+    """
+
+    backend = "closure"
+
+    def test_error_inside_function_call(self):
+        evaluated = self.evaluate(
+            "function f (a) return a + true end; f(1); 5"
+        )
+
+        self.assertEqual(type(evaluated), obj.Error)
+        self.assertEqual(
+            evaluated.message, "Attempt to perform arithmetic on a boolean value"
+        )
+
+    def test_functions_are_shared_with_evaluator(self):
+        env = obj.Environment()
+        evaluator.evaluate(
+            program_from_source("function double (x) return x * 2 end"), env
+        )
+        closure_compiler.evaluate(
+            program_from_source("function inc (x) return x + 1 end"), env
+        )
+
+        self.assertEqual(
+            closure_compiler.evaluate(
+                program_from_source("double(inc(2))"), env
+            ).value,
+            6,
+        )
+        self.assertEqual(
+            evaluator.evaluate(program_from_source("inc(double(2))"), env).value,
+            5,
+        )
+
+    def test_backend_selection(self):
+        program = program_from_source("a = {1, 2}; #a + a[2]")
+
+        for backend in backends.backends:
+            evaluated = backends.evaluate(program, obj.Environment(), backend)
+            self.assertEqual(evaluated.value, 4)
+
+        with self.assertRaises(ValueError):
+            backends.evaluate(program, obj.Environment(), "missing")
@@ -0,0 +1,110 @@
+from io import StringIO
+import unittest
+
+from luatopy.lexer import Lexer
+from luatopy.parser import Parser
+from luatopy.compiler import Compiler
+from luatopy.code import OpCode, make, instructions_to_string
+from luatopy import obj
+
+
+class CompilerTest(unittest.TestCase):
+    def test_make(self):
+        self.assertEqual(make(OpCode.CONSTANT, 65534), [OpCode.CONSTANT, 65534])
+        self.assertEqual(make(OpCode.ADD), [OpCode.ADD])
+
+        with self.assertRaises(ValueError):
+            make(OpCode.ADD, 1)
+
+    def test_instructions_to_string(self):
+        instructions = (
+            make(OpCode.CONSTANT, 1)
+            + make(OpCode.ADD)
+            + make(OpCode.JUMP, 65535)
+        )
+
+        self.assertEqual(
+            instructions_to_string(instructions),
+            "0000 CONSTANT 1\n0002 ADD\n0003 JUMP 65535",
+        )
+
+    def test_integer_arithmetic(self):
+        compiler = compile_source("1 + 2; 3")
+        bytecode = compiler.bytecode()
+
+        self.assertEqual(
+            bytecode.instructions,
+            make(OpCode.CONSTANT, 0)
+            + make(OpCode.CONSTANT, 1)
+            + make(OpCode.ADD)
+            + make(OpCode.POP)
+            + make(OpCode.CONSTANT, 2)
+            + make(OpCode.RETURN_VALUE),
+        )
+        self.assertEqual(
+            [x.value for x in bytecode.constants], [1, 2, 3],
+        )
+
+    def test_assignments(self):
+        compiler = compile_source("a = 1; a")
+        bytecode = compiler.bytecode()
+
+        self.assertEqual(
+            bytecode.instructions,
+            make(OpCode.CONSTANT, 0)
+            + make(OpCode.SET_NAME, 0)
+            + make(OpCode.GET_NAME, 0)
+            + make(OpCode.RETURN_VALUE),
+        )
+        self.assertEqual(bytecode.names, ["a"])
+
+    def test_conditionals(self):
+        compiler = compile_source("if true then 10 end")
+        bytecode = compiler.bytecode()
+
+        self.assertEqual(
+            bytecode.instructions,
+            make(OpCode.TRUE)
+            + make(OpCode.JUMP_NOT_TRUTHY, 7)
+            + make(OpCode.CONSTANT, 0)
+            + make(OpCode.JUMP, 8)
+            + make(OpCode.NIL)
+            + make(OpCode.RETURN_VALUE),
+        )
+
+    def test_functions(self):
+        compiler = compile_source("function (a) return a end")
+        bytecode = compiler.bytecode()
+
+        self.assertEqual(
+            bytecode.instructions,
+            make(OpCode.CLOSURE, 0) + make(OpCode.RETURN_VALUE),
+        )
+
+        compiled_fn = bytecode.constants[0]
+        self.assertEqual(type(compiled_fn), obj.CompiledFunction)
+        self.assertEqual(
+            compiled_fn.instructions,
+            make(OpCode.GET_NAME, 0) + make(OpCode.RETURN_VALUE),
+        )
+
+    def test_tail_calls(self):
+        compiler = compile_source("function (a) return f(a) end")
+        compiled_fn = compiler.bytecode().constants[0]
+
+        self.assertEqual(
+            compiled_fn.instructions,
+            make(OpCode.GET_NAME, 0)
+            + make(OpCode.GET_NAME, 1)
+            + make(OpCode.TAIL_CALL, 1)
+            + make(OpCode.RETURN_VALUE),
+        )
+
+
+def compile_source(source) -> Compiler:
+    lexer = Lexer(StringIO(source))
+    parser = Parser(lexer)
+    program = parser.parse_program()
+    compiler = Compiler()
+    compiler.compile(program)
+    return compiler
@@ -0,0 +1,198 @@
+from io import StringIO
+import unittest
+
+from luatopy.lexer import Lexer
+from luatopy.parser import Parser
+from luatopy import obj
+from luatopy import backends
+from luatopy.coroutine import OUTSIDE_COROUTINE
+
+
+BACKENDS = ["tree", "stack", "closure", "vm", "python"]
+
+
+class CoroutineTest(unittest.TestCase):
+    def test_resume_and_yield(self):
+        source = """
+function count (n)
+    coroutine.yield(n)
+    return count(n + 1)
+end
+co = coroutine.create(count)
+a = coroutine.resume(co, 1)
+b = coroutine.resume(co)
+c = coroutine.resume(co)
+"""
+
+        for backend in BACKENDS:
+            env = run(source, backend)
+            self.assertEqual(values(env, "a", "b", "c"), [1, 2, 3], backend)
+
+    def test_values_passed_in_both_directions(self):
+        source = """
+function accumulate (total)
+    x = coroutine.yield(total)
+    return accumulate(total + x)
+end
+co = coroutine.create(accumulate)
+coroutine.resume(co, 0)
+coroutine.resume(co, 5)
+a = coroutine.resume(co, 10)
+"""
+
+        for backend in BACKENDS:
+            env = run(source, backend)
+            self.assertEqual(values(env, "a"), [15], backend)
+
+    def test_status(self):
+        source = """
+function inner ()
+    return coroutine.status(outer_co)
+end
+function outer ()
+    coroutine.yield(coroutine.status(outer_co))
+    inner_co = coroutine.create(inner)
+    return coroutine.resume(inner_co)
+end
+outer_co = coroutine.create(outer)
+a = coroutine.status(outer_co)
+b = coroutine.resume(outer_co)
+c = coroutine.status(outer_co)
+d = coroutine.resume(outer_co)
+e = coroutine.status(outer_co)
+"""
+
+        for backend in BACKENDS:
+            env = run(source, backend)
+            self.assertEqual(
+                values(env, "a", "b", "c", "d", "e"),
+                ["suspended", "running", "suspended", "normal", "dead"],
+                backend,
+            )
+
+    def test_wrap(self):
+        source = """
+function double (x)
+    y = coroutine.yield(x * 2)
+    return y * 2
+end
+f = coroutine.wrap(double)
+a = f(5)
+b = f(7)
+t = type(f)
+"""
+
+        for backend in BACKENDS:
+            env = run(source, backend)
+            self.assertEqual(values(env, "a", "b", "t"), [10, 14, "function"])
+
+    def test_closures_as_coroutine_bodies(self):
+        source = """
+function make (n)
+    return function () return n end
+end
+co = coroutine.create(make(3))
+a = coroutine.resume(co)
+function generator (start, step)
+    return coroutine.wrap(function ()
+        coroutine.yield(start)
+        coroutine.yield(start + step)
+        return start + step * 2
+    end)
+end
+g = generator(5, 10)
+b = g()
+c = g()
+d = g()
+"""
+
+        for backend in BACKENDS:
+            env = run(source, backend)
+            self.assertEqual(
+                values(env, "a", "b", "c", "d"), [3, 5, 15, 25], backend
+            )
+
+    def test_type(self):
+        env = run("co = coroutine.create(type)\nt = type(co)")
+        self.assertEqual(values(env, "t"), ["thread"])
+
+    def test_large_sequence_is_streamed(self):
+        source = """
+function produce (n)
+    coroutine.yield(n)
+    return produce(n + 1)
+end
+function consume (next, total, n)
+    if n == 0 then return total end
+    return consume(next, total + next(), n - 1)
+end
+f = coroutine.wrap(produce)
+consume(f, f(1), 1999)
+"""
+
+        for backend in BACKENDS:
+            evaluated = evaluate(source, backend)
+            self.assertEqual(evaluated.value, 2001000, backend)
+
+    def test_errors(self):
+        tests = [
+            ("coroutine.yield(1)", OUTSIDE_COROUTINE),
+            (
+                "co = coroutine.create(function () return 1 end)\n"
+                "coroutine.resume(co)\ncoroutine.resume(co)",
+                "cannot resume dead coroutine",
+            ),
+            (
+                "function f () return coroutine.resume(co) end\n"
+                "co = coroutine.create(f)\ncoroutine.resume(co)",
+                "cannot resume non-suspended coroutine",
+            ),
+            (
+                "coroutine.create(1)",
+                "Bad argument to create, function expected",
+            ),
+            (
+                "coroutine.status(1)",
+                "Bad argument to status, coroutine expected",
+            ),
+        ]
+
+        for source, expected in tests:
+            for backend in BACKENDS:
+                evaluated = evaluate(source, backend)
+                self.assertEqual(type(evaluated), obj.Error, backend)
+                self.assertEqual(evaluated.message, expected, backend)
+
+    def test_error_inside_coroutine_kills_it(self):
+        source = """
+co = coroutine.create(function () return 1 + true end)
+coroutine.resume(co)
+"""
+
+        for backend in BACKENDS:
+            env = obj.Environment()
+            evaluated = backends.evaluate(parse(source), env, backend)
+            self.assertEqual(type(evaluated), obj.Error, backend)
+            self.assertEqual(env.store["co"].status, "dead", backend)
+
+
+def parse(source):
+    parser = Parser(Lexer(StringIO(source)))
+    program = parser.parse_program()
+    assert not parser.errors, parser.errors
+    return program
+
+
+def evaluate(source, backend="tree"):
+    return backends.evaluate(parse(source), obj.Environment(), backend)
+
+
+def run(source, backend="tree"):
+    env = obj.Environment()
+    evaluated = backends.evaluate(parse(source), env, backend)
+    assert evaluated.__class__ is not obj.Error, evaluated
+    return env
+
+
+def values(env, *names):
+    return [env.store[x].value for x in names]
@@ -1,13 +1,26 @@
+from dataclasses import dataclass
 from io import StringIO
 import unittest
 
 from luatopy.lexer import Lexer
 from luatopy.parser import Parser
+from luatopy import ast
 from luatopy import obj
 from luatopy import evaluator
+from luatopy import backends
 
 
 class EvaluatorTest(unittest.TestCase):
+    """
+    The evaluator suite, the tests of the other backends subclass it and
+    set backend to run the whole suite on their backend
+    """
+
+    backend: str = "tree"
+
+    def evaluate(self, source) -> obj.Obj:
+        return source_to_eval(source, self.backend)
+
     def test_integer_expressions(self):
         tests = [
             ("1", 1),
@@ -21,7 +34,7 @@ class EvaluatorTest(unittest.TestCase):
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.Integer)
             self.assertEqual(evaluated.value, expected)
@@ -30,14 +43,52 @@ class EvaluatorTest(unittest.TestCase):
         tests = [
             ("4 / 2", 2.0),
             ("5 % 10", 5.0),
+            ("1.5", 1.5),
+            ("-1.5", -1.5),
+            ("1.5 + 2", 3.5),
+            ("2 * 0.25", 0.5),
+            ("3 - 1.5", 1.5),
+            ("1.5 * 1.5", 2.25),
+            ("1 / 4", 0.25),
+            ("7.5 % 2", 1.5),
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.Float)
             self.assertEqual(evaluated.value, expected)
 
+    def test_float_table_keys(self):
+        tests = [
+            ("t = {[1.5] = 2}; t[1.5]", 2),
+            ("x = 1.0; t = {[x] = 1}; t[1]", 1),
+            ("t = {10, 20}; t[2.0]", 20),
+            ("t = {[1] = 1, [1.0] = 2}; t[1]", 2),
+        ]
+
+        for source, expected in tests:
+            evaluated = self.evaluate(source)
+
+            self.assertEqual(type(evaluated), obj.Integer, source)
+            self.assertEqual(evaluated.value, expected)
+
+    def test_mixed_number_comparisons(self):
+        tests = [
+            ("1.5 < 2", True),
+            ("2 <= 1.5", False),
+            ("2 >= 2.0", True),
+            ("0.5 > 1", False),
+            ("1 == 1.0", True),
+            ("2.5 ~= 2.5", False),
+        ]
+
+        for source, expected in tests:
+            evaluated = self.evaluate(source)
+
+            self.assertEqual(type(evaluated), obj.Boolean)
+            self.assertEqual(evaluated.value, expected)
+
     def test_string_concat(self):
         tests = [
             ('"hello" .. "world"', "helloworld"),
@@ -45,7 +96,7 @@ class EvaluatorTest(unittest.TestCase):
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.String)
             self.assertEqual(evaluated.value, expected)
@@ -67,7 +118,7 @@ class EvaluatorTest(unittest.TestCase):
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.Boolean)
             self.assertEqual(evaluated.value, expected)
@@ -82,7 +133,7 @@ class EvaluatorTest(unittest.TestCase):
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.Boolean)
             self.assertEqual(evaluated.value, expected)
@@ -100,7 +151,7 @@ class EvaluatorTest(unittest.TestCase):
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.Boolean)
             self.assertEqual(evaluated.value, expected)
@@ -113,7 +164,7 @@ class EvaluatorTest(unittest.TestCase):
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.Integer)
             self.assertEqual(evaluated.value, expected)
@@ -130,7 +181,7 @@ class EvaluatorTest(unittest.TestCase):
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             if evaluated == evaluator.NULL:
                 self.assertEqual(evaluated, expected)
@@ -167,7 +218,7 @@ return 5
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.Integer)
             self.assertEqual(evaluated.value, expected)
@@ -206,10 +257,19 @@ true + false
                 "if true + false then 1 else 2 end",
                 "Attempt to perform arithmetic on a boolean value",
             ),
+            (
+                "function f (a) return a end; f(1, true + 1); 5",
+                "Attempt to perform arithmetic on a boolean value",
+            ),
+            (
+                "function f (a) return -a end; x = f(true); x",
+                "Attempt to perform arithmetic on a boolean value",
+            ),
+            ('{1, 2}["a"]["b"]', "Index operation not supported"),
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.Error)
             self.assertEqual(evaluated.message, expected)
@@ -220,7 +280,7 @@ true + false
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.Null)
 
@@ -233,7 +293,7 @@ true + false
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.Integer)
             self.assertEqual(evaluated.value, expected)
@@ -247,7 +307,7 @@ true + false
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
 
             self.assertEqual(type(evaluated), obj.Function)
             self.assertEqual(evaluated.inspect(), expected)
@@ -259,7 +319,7 @@ true + false
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
             self.assertEqual(evaluated.value, expected)
 
     def test_function_call(self):
@@ -271,7 +331,7 @@ true + false
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
             self.assertEqual(evaluated.value, expected)
 
     def test_function_closure(self):
@@ -281,14 +341,14 @@ add_two = add(2)
 add_two(3)
 """
 
-        evaluated = source_to_eval(source)
+        evaluated = self.evaluate(source)
         self.assertEqual(evaluated.value, 5)
 
     def test_string_expressions(self):
         tests = [('"hello world"', "hello world")]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
             self.assertEqual(evaluated.value, expected)
 
     def test_builints(self):
@@ -301,7 +361,7 @@ add_two(3)
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
             self.assertEqual(evaluated.value, expected)
 
     def test_table_expressions(self):
@@ -317,7 +377,7 @@ add_two(3)
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
             self.assertEqual(evaluated.inspect(), expected)
 
     def test_table_index_expressions(self):
@@ -331,13 +391,69 @@ add_two(3)
         ]
 
         for source, expected in tests:
-            evaluated = source_to_eval(source)
+            evaluated = self.evaluate(source)
             self.assertEqual(evaluated.inspect(), expected)
 
+    def test_tail_calls_do_not_grow_the_stack(self):
+        functions = """
+function loop (n, acc)
+    if n == 0 then return acc end
+    return loop(n - 1, acc + 1)
+end
+function even (n) if n == 0 then return true end return odd(n - 1) end
+function odd (n) if n == 0 then return false end return even(n - 1) end
+"""
+        tests = [
+            ("loop(2000, 0)", "2000"),
+            ("even(2001)", "false"),
+        ]
+
+        for source, expected in tests:
+            evaluated = self.evaluate(functions + source)
+            self.assertEqual(evaluated.inspect(), expected)
+
+    def test_recursive_function(self):
+        source = """
+function fib (n)
+    if n < 2 then return n end
+    return fib(n - 1) + fib(n - 2)
+end
+fib(15)
+"""
+        self.assertEqual(self.evaluate(source).value, 610)
+
+    def test_tail_call_to_builtin(self):
+        source = 'function f (x) return type(x) end; f(1)'
+
+        self.assertEqual(self.evaluate(source).value, "number")
+
+
+class NodeHandlerTest(unittest.TestCase):
+    def test_register_custom_node_handler(self):
+        @dataclass
+        class AnswerLiteral(ast.Expression):
+            pass
+
+        def evaluate_answer(node, env):
+            return obj.Integer(value=42)
+
+        evaluator.register(evaluator.node_handlers, AnswerLiteral, evaluate_answer)
+        self.addCleanup(evaluator.node_handlers.pop, AnswerLiteral)
+
+        program = ast.Program(
+            [ast.ExpressionStatement(token=None, expression=AnswerLiteral(token=None))]
+        )
+        evaluated = evaluator.evaluate(program, obj.Environment())
+
+        self.assertEqual(evaluated.value, 42)
+
+    def test_unknown_nodes_evaluate_to_none(self):
+        self.assertIsNone(evaluator.evaluate(object(), obj.Environment()))
+
 
-def source_to_eval(source) -> obj.Obj:
+def source_to_eval(source, backend="tree") -> obj.Obj:
     lexer = Lexer(StringIO(source))
     parser = Parser(lexer)
     program = parser.parse_program()
     env = obj.Environment()
-    return evaluator.evaluate(program, env)
+    return backends.evaluate(program, env, backend)
@@ -1,4 +1,6 @@
-from io import StringIO
+from io import BytesIO, StringIO
+import os
+import tempfile
 import unittest
 
 from luatopy.lexer import Lexer
@@ -330,6 +332,30 @@ a = false
             self.assertEqual(expected_token[0], token.token_type)
             self.assertEqual(expected_token[1], token.literal)
 
+    def test_dot_and_concat(self):
+        source = "lib.name .. x"
+
+        lexer = Lexer(StringIO(source))
+
+        tokens = [
+            (TokenType.IDENTIFIER, "lib"),
+            (TokenType.DOT, "."),
+            (TokenType.IDENTIFIER, "name"),
+            (TokenType.CONCAT, ".."),
+            (TokenType.IDENTIFIER, "x"),
+            (TokenType.EOF, "<<EOF>>"),
+        ]
+
+        for expected_token in tokens:
+            token = lexer.next_token()
+
+            self.assertEqual(expected_token[0], token.token_type)
+            self.assertEqual(expected_token[1], token.literal)
+
+    def test_names_are_interned(self):
+        tokens = list(Lexer(StringIO("total = total + 1")).tokens())
+        self.assertIs(tokens[0].literal, tokens[2].literal)
+
     def test_modulo_operator(self):
         source = "5 % 10"
 
@@ -347,3 +373,174 @@ a = false
 
             self.assertEqual(expected_token[0], token.token_type)
             self.assertEqual(expected_token[1], token.literal)
+
+    def test_float_literals(self):
+        source = "1.5 + 10.25 .. 2..3"
+
+        lexer = Lexer(StringIO(source))
+
+        tokens = [
+            (TokenType.FLOAT, "1.5"),
+            (TokenType.PLUS, "+"),
+            (TokenType.FLOAT, "10.25"),
+            (TokenType.CONCAT, ".."),
+            (TokenType.INT, "2"),
+            (TokenType.CONCAT, ".."),
+            (TokenType.INT, "3"),
+            (TokenType.EOF, "<<EOF>>"),
+        ]
+
+        for expected_token in tokens:
+            token = lexer.next_token()
+
+            self.assertEqual(expected_token[0], token.token_type)
+            self.assertEqual(expected_token[1], token.literal)
+
+    def test_empty_string(self):
+        source = 'a = ""'
+
+        lexer = Lexer(StringIO(source))
+
+        tokens = [
+            (TokenType.IDENTIFIER, "a"),
+            (TokenType.ASSIGN, "="),
+            (TokenType.STR, ""),
+            (TokenType.EOF, "<<EOF>>"),
+        ]
+
+        for expected_token in tokens:
+            token = lexer.next_token()
+
+            self.assertEqual(expected_token[0], token.token_type)
+            self.assertEqual(expected_token[1], token.literal)
+
+    def test_comments_at_end_of_source(self):
+        tests = [
+            ("a -- trailing", " trailing"),
+            ("--[[ unterminated", " unterminated"),
+        ]
+
+        for source, expected in tests:
+            tokens = list(Lexer(StringIO(source)).tokens())
+
+            self.assertEqual(tokens[-2].token_type, TokenType.COMMENT)
+            self.assertEqual(tokens[-2].literal, expected)
+            self.assertEqual(tokens[-1].token_type, TokenType.EOF)
+
+    def test_unknown_characters_are_illegal(self):
+        source = "a ~ b  "
+
+        tokens = list(Lexer(StringIO(source)).tokens())
+
+        self.assertEqual(
+            [(x.token_type, x.literal) for x in tokens],
+            [
+                (TokenType.IDENTIFIER, "a"),
+                (TokenType.ILLEGAL, "~"),
+                (TokenType.IDENTIFIER, "b"),
+                (TokenType.EOF, "<<EOF>>"),
+            ],
+        )
+
+    def test_tokens_split_across_chunks(self):
+        source = 'name = "a string" -- comment\nx ~= 10 .. y'
+
+        expected = [
+            (x.token_type, x.literal)
+            for x in Lexer(StringIO(source)).tokens()
+        ]
+
+        for chunk_size in range(1, 8):
+            lexer = Lexer(StringIO(source), chunk_size=chunk_size)
+            tokens = [(x.token_type, x.literal) for x in lexer.tokens()]
+            self.assertEqual(tokens, expected, chunk_size)
+
+    def test_floats_split_across_chunks(self):
+        source = "x = 12.5\ny = 3.25 + 100.125 .. 7..8"
+
+        expected = [
+            (x.token_type, x.literal)
+            for x in Lexer(StringIO(source)).tokens()
+        ]
+        self.assertIn((TokenType.FLOAT, "100.125"), expected)
+
+        for chunk_size in range(1, 12):
+            lexer = Lexer(StringIO(source), chunk_size=chunk_size)
+            tokens = [(x.token_type, x.literal) for x in lexer.tokens()]
+            self.assertEqual(tokens, expected, chunk_size)
+
+    def test_positions_are_source_offsets(self):
+        source = "first = 1\nsecond = 22"
+        lexer = Lexer(StringIO(source), chunk_size=4)
+
+        positions = []
+        for token in lexer.tokens():
+            positions.append((token.literal, lexer.pos))
+
+        self.assertEqual(
+            positions,
+            [
+                ("first", 5),
+                ("=", 7),
+                ("1", 9),
+                ("\n", 10),
+                ("second", 16),
+                ("=", 18),
+                ("22", 21),
+                ("<<EOF>>", 21),
+            ],
+        )
+
+    def test_lines_and_columns(self):
+        source = 'a = 1\n  --[[ one\ntwo ]]-- b = "x"\n  c'
+        lexer = Lexer(StringIO(source), chunk_size=5)
+
+        positions = [
+            (token.literal, token.line, token.column)
+            for token in lexer.tokens()
+            if token.token_type != TokenType.NEWLINE
+        ]
+
+        self.assertEqual(
+            positions,
+            [
+                ("a", 1, 1),
+                ("=", 1, 3),
+                ("1", 1, 5),
+                (" one\ntwo ", 2, 3),
+                ("b", 3, 10),
+                ("=", 3, 12),
+                ("x", 3, 14),
+                ("c", 4, 3),
+                ("<<EOF>>", 4, 4),
+            ],
+        )
+
+    def test_binary_streams_are_decoded(self):
+        source = 'a = "héllo ünicode"'
+
+        lexer = Lexer(BytesIO(source.encode("utf-8")), chunk_size=3)
+        tokens = list(lexer.tokens())
+
+        self.assertEqual(tokens[2].token_type, TokenType.STR)
+        self.assertEqual(tokens[2].literal, "héllo ünicode")
+
+    def test_source_from_path(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "script.lua")
+            with open(path, "w") as f:
+                f.write("a = 1")
+
+            lexer = Lexer(path)
+            tokens = [x.token_type for x in lexer.tokens()]
+
+            self.assertEqual(
+                tokens,
+                [
+                    TokenType.IDENTIFIER,
+                    TokenType.ASSIGN,
+                    TokenType.INT,
+                    TokenType.EOF,
+                ],
+            )
+            self.assertIsNone(lexer.reader)
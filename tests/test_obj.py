@@ -0,0 +1,202 @@
+import pickle
+import unittest
+from unittest import mock
+
+from luatopy import obj
+from luatopy import backends
+from tests.test_evaluator import source_to_eval
+from tests.test_parser import program_from_source
+
+
+class ObjTest(unittest.TestCase):
+    def test_small_integers_are_shared(self):
+        self.assertIs(obj.Integer.create(0), obj.Integer.create(0))
+        self.assertIs(obj.Integer.create(-5), obj.Integer.create(-5))
+        self.assertIs(obj.Integer.create(256), obj.Integer.create(256))
+
+    def test_large_integers_are_allocated(self):
+        self.assertIsNot(obj.Integer.create(257), obj.Integer.create(257))
+        self.assertEqual(obj.Integer.create(257), obj.Integer.create(257))
+        self.assertIsNot(obj.Integer.create(-6), obj.Integer.create(-6))
+
+    def test_arithmetic_results_use_cache(self):
+        self.assertIs(source_to_eval("1 + 2"), obj.Integer.create(3))
+        self.assertIs(source_to_eval("#{1, 2}"), obj.Integer.create(2))
+
+    def test_values_have_no_instance_dict(self):
+        values = [
+            obj.Integer(value=1),
+            obj.Float(value=1.5),
+            obj.Boolean(value=True),
+            obj.String(value="a"),
+            obj.NULL,
+        ]
+        for value in values:
+            self.assertFalse(hasattr(value, "__dict__"), value)
+
+    def test_integers_and_strings_are_hashable(self):
+        table = {obj.Integer.create(1): "a", obj.String(value="b"): "b"}
+
+        self.assertEqual(table[obj.Integer(value=1)], "a")
+        self.assertEqual(table[obj.String(value="b")], "b")
+
+    def test_floats_are_hashable(self):
+        table = {obj.Float(value=1.5): "a"}
+
+        self.assertEqual(table[obj.Float(value=1.5)], "a")
+
+
+class StringTest(unittest.TestCase):
+    def test_short_concatenation_is_copied(self):
+        joined = obj.String.concat(obj.String("a"), obj.String("b"))
+
+        self.assertIsNone(joined.pieces)
+        self.assertEqual(joined.value, "ab")
+
+    def test_long_concatenation_builds_a_rope(self):
+        piece = "x" * obj.ROPE_MIN_LENGTH
+        first = obj.String.concat(obj.String(piece), obj.String("a"))
+        second = obj.String.concat(first, obj.String("b"))
+
+        self.assertIs(first.pieces, second.pieces)
+        self.assertEqual(second.length, obj.ROPE_MIN_LENGTH + 2)
+        self.assertEqual(second.value, piece + "ab")
+        self.assertIsNone(second.pieces)
+
+        # The earlier string still ends where it did
+        self.assertEqual(first.value, piece + "a")
+
+    def test_branching_from_an_earlier_string(self):
+        piece = "x" * obj.ROPE_MIN_LENGTH
+        first = obj.String.concat(obj.String(piece), obj.String("a"))
+        second = obj.String.concat(first, obj.String("b"))
+        third = obj.String.concat(first, obj.String("c"))
+
+        self.assertIsNot(second.pieces, third.pieces)
+        self.assertEqual(second.value, piece + "ab")
+        self.assertEqual(third.value, piece + "ac")
+
+    def test_ropes_compare_and_hash_by_value(self):
+        piece = "x" * obj.ROPE_MIN_LENGTH
+        rope = obj.String.concat(obj.String(piece), obj.String("a"))
+        flat = obj.String(piece + "a")
+
+        self.assertEqual(rope, flat)
+        self.assertEqual(hash(rope), hash(flat))
+        self.assertEqual({flat: 1}[rope], 1)
+        self.assertNotEqual(rope, obj.String(piece))
+
+    def test_short_strings_are_interned(self):
+        self.assertIs(obj.String.intern("key"), obj.String.intern("key"))
+        self.assertEqual(obj.String.intern("key").hashed, hash("key"))
+
+        long_value = "x" * (obj.INTERN_MAX_LENGTH + 1)
+        self.assertIsNot(
+            obj.String.intern(long_value), obj.String.intern(long_value)
+        )
+
+    def test_intern_table_is_bounded(self):
+        with mock.patch.object(obj, "INTERN_MAX_ENTRIES", 2), mock.patch.dict(
+            obj.interned, clear=True
+        ):
+            obj.String.intern("a")
+            obj.String.intern("b")
+            obj.String.intern("c")
+            self.assertEqual(list(obj.interned), ["c"])
+
+    def test_literals_are_interned(self):
+        source = 'a = "key"\nb = {key = 1}\nc = "key"'
+        for backend in ["tree", "stack", "closure", "vm", "python"]:
+            env = obj.Environment()
+            backends.evaluate(program_from_source(source), env, backend)
+
+            self.assertIs(env.store["a"], env.store["c"], backend)
+            self.assertIs(
+                env.store["a"], list(env.store["b"].hash)[0], backend
+            )
+
+    def test_hash_is_kept(self):
+        string = obj.String("abc")
+        self.assertIsNone(string.hashed)
+        self.assertEqual(hash(string), hash("abc"))
+        self.assertEqual(string.hashed, hash("abc"))
+
+    def test_pickle(self):
+        rope = obj.String.concat(
+            obj.String("x" * obj.ROPE_MIN_LENGTH), obj.String("")
+        )
+        for value in [obj.String(""), obj.String("a"), rope]:
+            self.assertEqual(pickle.loads(pickle.dumps(value)), value)
+
+    def test_building_a_long_string(self):
+        source = """
+function build (s, n)
+    if n == 0 then return s end
+    return build(s .. "0123456789", n - 1)
+end
+s = build("", 20000)
+#s
+"""
+        self.assertEqual(source_to_eval(source).value, 200000)
+
+
+class TableTest(unittest.TestCase):
+    def test_sequential_keys_use_array_part(self):
+        table = obj.Table(
+            elements={
+                obj.Integer.create(1): obj.String(value="a"),
+                obj.Integer.create(2): obj.String(value="b"),
+                obj.String(value="key"): obj.String(value="c"),
+            }
+        )
+
+        self.assertEqual(len(table.array), 2)
+        self.assertEqual(list(table.hash), [obj.String(value="key")])
+        self.assertEqual(table.length(), 2)
+
+    def test_keys_migrate_to_array_part_when_gap_is_filled(self):
+        table = obj.Table()
+        table.set(obj.Integer.create(3), obj.String(value="c"))
+        table.set(obj.Integer.create(2), obj.String(value="b"))
+
+        self.assertEqual(table.length(), 0)
+
+        table.set(obj.Integer.create(1), obj.String(value="a"))
+
+        self.assertEqual(table.length(), 3)
+        self.assertEqual(table.hash, {})
+        self.assertEqual(table.get(obj.Integer.create(3)).value, "c")
+
+    def test_nil_moves_tail_to_hash_part(self):
+        table = obj.Table()
+        for x in range(1, 6):
+            table.set(obj.Integer.create(x), obj.Integer.create(x))
+
+        table.set(obj.Integer.create(3), obj.NULL)
+
+        self.assertEqual(table.length(), 2)
+        self.assertIs(table.get(obj.Integer.create(3)), obj.NULL)
+        self.assertEqual(table.get(obj.Integer.create(5)).value, 5)
+
+    def test_integral_float_keys_are_integers(self):
+        table = obj.Table()
+        table.set(obj.Float(value=1.0), obj.String(value="a"))
+        table.set(obj.Float(value=1.5), obj.String(value="b"))
+
+        self.assertEqual(table.array, [obj.String(value="a")])
+        self.assertEqual(table.get(obj.Integer.create(1)).value, "a")
+        self.assertEqual(table.get(obj.Float(value=1.0)).value, "a")
+        self.assertEqual(table.get(obj.Float(value=1.5)).value, "b")
+        self.assertIs(table.get(obj.Integer.create(2)), obj.NULL)
+
+    def test_length_operator(self):
+        tests = [
+            ("#{}", 0),
+            ("#{1, 2, 3}", 3),
+            ('#{1, 2, key = "value"}', 2),
+            ("#{[2] = 2, [1] = 1}", 2),
+            ("#{[2] = 2}", 0),
+        ]
+
+        for source, expected in tests:
+            self.assertEqual(source_to_eval(source).value, expected)
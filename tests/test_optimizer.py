@@ -0,0 +1,104 @@
+from io import StringIO
+import unittest
+
+from luatopy.lexer import Lexer
+from luatopy.parser import Parser
+from luatopy.optimizer import Optimizer
+from luatopy import ast
+from luatopy import obj
+from luatopy import evaluator
+
+from tests import test_evaluator
+
+
+class OptimizerTest(unittest.TestCase):
+    def test_constant_folding(self):
+        tests = [
+            ("60 * 60 * 24", "86400"),
+            ('"prefix" .. "suffix"', '"prefixsuffix"'),
+            ("-(2 + 3)", "-5"),
+            ("not true", "false"),
+            ("1 < 2", "true"),
+            ('#"abc"', "3"),
+            ("a * (2 + 3)", "(a * 5)"),
+            ("f(1 + 1, 2 * 2)", "f(2, 4)"),
+            ("{1 + 1}", "{1 = 2}"),
+        ]
+
+        for source, expected in tests:
+            program, _ = optimize_source(source)
+            self.assertEqual(program.to_code(), expected, source)
+
+    def test_results_without_literal_are_not_folded(self):
+        tests = [
+            ("1 / 2", "(1 / 2)"),
+            ("true + 1", "(true + 1)"),
+            ("1 .. 2", "(1 .. 2)"),
+            ("1 / 0", "(1 / 0)"),
+            ("5 % 0", "(5 % 0)"),
+            ("1.5 + 1", "(1.5 + 1)"),
+        ]
+
+        for source, expected in tests:
+            program, changes = optimize_source(source)
+            self.assertEqual(program.to_code(), expected, source)
+            self.assertEqual(changes, [])
+
+    def test_division_by_zero_in_code_never_run(self):
+        program, _ = optimize_source("function f () return 1 / 0 end; 5")
+
+        evaluated = evaluator.evaluate(program, obj.Environment())
+        self.assertEqual(evaluated, obj.Integer(5))
+
+    def test_dead_branch_elimination(self):
+        tests = [
+            ("if true then a = 1 else a = 2 end; a", "a = 1\na"),
+            ("if false then a = 1 else a = 2 end; a", "a = 2\na"),
+            ("if false then a = 1 end; a", "a"),
+            ("if 1 > 2 then a = 1 end; a", "a"),
+            ("b = if true then 1 else 2 end", "b = 1"),
+            (
+                "function f () if true then return 1 end end",
+                "function f () return 1 end",
+            ),
+        ]
+
+        for source, expected in tests:
+            program, _ = optimize_source(source)
+            self.assertEqual(program.to_code(), expected, source)
+
+    def test_last_if_without_taken_branch_is_kept(self):
+        program, _ = optimize_source("if false then 1 end")
+
+        statement = program.statements[0]
+        self.assertEqual(type(statement.expression), ast.IfExpression)
+        self.assertIs(evaluator.evaluate(program, obj.Environment()), obj.NULL)
+
+    def test_changes_are_reported(self):
+        _, changes = optimize_source("if 1 < 2 then a = 2 * 3 end; a")
+
+        self.assertEqual(
+            changes,
+            [
+                "Folded (1 < 2) into true",
+                "Folded (2 * 3) into 6",
+                "Replaced if true with then branch",
+            ],
+        )
+
+
+class OptimizedEvaluatorTest(test_evaluator.EvaluatorTest):
+    """
+    Runs the whole evaluator suite on optimized programs
+    """
+
+    def evaluate(self, source):
+        program, _ = optimize_source(source)
+        return evaluator.evaluate(program, obj.Environment())
+
+
+def optimize_source(source):
+    lexer = Lexer(StringIO(source))
+    program = Parser(lexer).parse_program()
+    optimizer = Optimizer()
+    return optimizer.optimize(program), optimizer.changes
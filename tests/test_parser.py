@@ -4,6 +4,7 @@ import unittest
 from luatopy.lexer import Lexer
 from luatopy.parser import Parser
 from luatopy import ast
+from luatopy.code import OpCode
 
 
 class ParserTest(unittest.TestCase):
@@ -88,6 +89,20 @@ class ParserTest(unittest.TestCase):
         self.assertIs(type(statement), ast.ExpressionStatement)
         self.assertIs(type(statement.expression), ast.IntegerLiteral)
 
+    def test_float_literal(self):
+        program = program_from_source("1.25")
+
+        statement = program.statements[0]
+        self.assertIs(type(statement.expression), ast.FloatLiteral)
+        self.assertEqual(statement.expression.value, 1.25)
+
+    def test_infix_operators_are_resolved_to_opcodes(self):
+        program = program_from_source("a + b .. c")
+
+        expression = program.statements[0].expression
+        self.assertEqual(expression.opcode, OpCode.CONCAT)
+        self.assertEqual(expression.left.opcode, OpCode.ADD)
+
     def test_identifier(self):
         program = program_from_source("a")
 
@@ -209,6 +224,51 @@ class ParserTest(unittest.TestCase):
         self.assertIs(type(statement.expression), ast.IndexExpression)
         self.assertIs(statement.expression.index.value, 1)
 
+    def test_field_expressions(self):
+        tests = [
+            ("values.first", '(values["first"])'),
+            ("a.b.c", '((a["b"])["c"])'),
+            ("lib.fn(1, 2)", '(lib["fn"])(1, 2)'),
+            ("a.b .. c", '((a["b"]) .. c)'),
+        ]
+
+        for source, expected in tests:
+            self.assertEqual(program_from_source(source).to_code(), expected)
+
+    def test_newlines_inside_blocks(self):
+        source = """function f (a)
+    b = a + 1
+
+    return b
+end"""
+        parser = Parser(Lexer(StringIO(source)))
+        program = parser.parse_program()
+
+        self.assertEqual(parser.errors, [])
+        self.assertEqual(len(program.statements[0].expression.body.statements), 2)
+
+    def test_node_positions(self):
+        source = """x = 1
+function add (a, b)
+    return a + b
+end
+add(x, 2)"""
+        program = program_from_source(source)
+        assignment, declaration, call = program.statements
+
+        self.assertEqual((assignment.line, assignment.column), (1, 1))
+        self.assertEqual((declaration.line, declaration.column), (2, 1))
+
+        fn_literal = declaration.expression
+        return_statement = fn_literal.body.statements[0]
+        self.assertEqual(
+            (return_statement.line, return_statement.column), (3, 5)
+        )
+        self.assertEqual(return_statement.value.right.column, 16)
+
+        self.assertEqual((call.line, call.column), (5, 1))
+        self.assertEqual(call.expression.arguments[1].column, 8)
+
 
 def program_from_source(source):
     lexer = Lexer(StringIO(source))
@@ -0,0 +1,276 @@
+from io import StringIO
+import gc
+import json
+import sys
+import unittest
+
+from luatopy.lexer import Lexer
+from luatopy.parser import Parser
+from luatopy.profiler import Profiler, LineProfiler
+from luatopy import obj
+from luatopy import evaluator
+from luatopy import backends
+from luatopy import profiler
+
+
+class FakeClock:
+    """
+    Every reading advances the time by one second
+    """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        self.now = self.now + 1.0
+        return self.now
+
+
+class ProfilerTest(unittest.TestCase):
+    def test_call_counts_for_every_backend(self):
+        source = """
+function fib (n)
+    if n < 2 then return n end
+    return fib(n - 1) + fib(n - 2)
+end
+double = function (n) return n * 2 end
+double(fib(10))
+"""
+
+        for backend in ["tree", "stack", "closure", "vm", "python"]:
+            stats = profile_source(source, backend)
+
+            self.assertEqual(stats["fib"].calls, 177, backend)
+            self.assertEqual(stats["double"].calls, 1, backend)
+            self.assertEqual(stats["fib"].site, "2:1")
+            self.assertEqual(stats["double"].site, "6:10")
+
+    def test_tail_calls_are_counted(self):
+        source = """
+function loop (n, acc)
+    if n == 0 then return acc end
+    return loop(n - 1, acc + 1)
+end
+loop(100, 0)
+"""
+
+        for backend in ["tree", "stack", "closure", "vm", "python"]:
+            stats = profile_source(source, backend)
+            self.assertEqual(stats["loop"].calls, 101, backend)
+
+    def test_anonymous_functions(self):
+        stats = profile_source("function (a) return a end(1)")
+
+        self.assertEqual(stats["<anonymous>"].calls, 1)
+
+    def test_inclusive_and_self_time(self):
+        source = """
+function inner () return 1 end
+function outer () return inner() + 1 end
+outer()
+"""
+        stats = profile_source(source, clock=FakeClock())
+
+        # outer enters at 1, inner runs from 2 to 3, outer leaves at 4
+        self.assertEqual(stats["inner"].inclusive_time, 1.0)
+        self.assertEqual(stats["inner"].self_time, 1.0)
+        self.assertEqual(stats["outer"].inclusive_time, 3.0)
+        self.assertEqual(stats["outer"].self_time, 2.0)
+
+    def test_recursion_is_not_counted_twice(self):
+        source = """
+function count (n)
+    if n == 0 then return 0 end
+    return 1 + count(n - 1)
+end
+count(2)
+"""
+        stats = profile_source(source, clock=FakeClock())
+
+        # Three nested calls from 1 to 6, all of it spent in count
+        self.assertEqual(stats["count"].calls, 3)
+        self.assertEqual(stats["count"].inclusive_time, 5.0)
+        self.assertEqual(stats["count"].self_time, 5.0)
+
+    def test_frames_are_closed_on_errors(self):
+        source = "function f () return 1 + true end f()"
+
+        for backend in ["tree", "stack", "closure", "vm", "python"]:
+            function_profiler = Profiler()
+            program = parse(source)
+            function_profiler.add_program(program)
+            with function_profiler:
+                evaluated = backends.evaluate(
+                    program, obj.Environment(), backend
+                )
+
+            self.assertEqual(type(evaluated), obj.Error, backend)
+            self.assertEqual(function_profiler.frames, [], backend)
+
+    def test_coroutines_take_their_frames_along(self):
+        source = """
+function produce ()
+    coroutine.yield(1)
+    coroutine.yield(2)
+    return 3
+end
+function consume ()
+    co = coroutine.create(produce)
+    return coroutine.resume(co) + coroutine.resume(co)
+end
+consume()
+"""
+
+        stats = profile_source(source, clock=FakeClock())
+
+        # consume runs from 1 to 6, produce from 2 to 3 and from 4 to 5
+        self.assertEqual(stats["produce"].calls, 1)
+        self.assertEqual(stats["produce"].inclusive_time, 2.0)
+        self.assertEqual(stats["produce"].self_time, 2.0)
+        self.assertEqual(stats["consume"].inclusive_time, 5.0)
+        self.assertEqual(stats["consume"].self_time, 3.0)
+
+        unraisable = []
+        previous_hook = sys.unraisablehook
+        sys.unraisablehook = unraisable.append
+        try:
+            for backend in ["tree", "stack", "closure", "vm", "python"]:
+                function_profiler = Profiler()
+                program = parse(source)
+                function_profiler.add_program(program)
+                with function_profiler:
+                    backends.evaluate(program, obj.Environment(), backend)
+
+                # The suspended producer is thrown away
+                gc.collect()
+
+                self.assertEqual(function_profiler.frames, [], backend)
+                for stats in function_profiler.stats():
+                    self.assertEqual(stats.active_calls, 0, backend)
+        finally:
+            sys.unraisablehook = previous_hook
+
+        self.assertEqual(unraisable, [])
+
+    def test_inactive_outside_of_context(self):
+        function_profiler = Profiler()
+        with function_profiler:
+            self.assertIs(profiler.active, function_profiler)
+        self.assertIsNone(profiler.active)
+
+        backends.evaluate(
+            parse("function f () return 1 end f()"), obj.Environment()
+        )
+        self.assertEqual(function_profiler.functions, {})
+
+    def test_report_and_json(self):
+        source = """
+function a () return 1 end
+function b () return a() + a() end
+b()
+"""
+        function_profiler = Profiler(clock=FakeClock())
+        program = parse(source)
+        function_profiler.add_program(program)
+        with function_profiler:
+            backends.evaluate(program, obj.Environment())
+
+        report = function_profiler.report(sort="calls").splitlines()
+        self.assertEqual(len(report), 3)
+        self.assertTrue(report[1].startswith("a "))
+
+        dump = json.loads(function_profiler.to_json(sort="name"))
+        self.assertEqual(
+            [(x["name"], x["calls"]) for x in dump["functions"]],
+            [("a", 2), ("b", 1)],
+        )
+
+        with self.assertRaises(ValueError):
+            function_profiler.stats(sort="unknown")
+
+
+class LineProfilerTest(unittest.TestCase):
+    source = """function count (n)
+    if n == 0 then return 0 end
+    return 1 + count(n - 1)
+end
+total = count(3)
+total"""
+
+    def test_hits_per_line(self):
+        line_profiler = LineProfiler()
+        with line_profiler:
+            evaluated = evaluator.evaluate(
+                parse(self.source), obj.Environment()
+            )
+
+        self.assertEqual(evaluated.value, 3)
+        hits = {x.line: x.hits for x in line_profiler.stats(sort="line")}
+        # Line 2 runs the if four times and the return inside it once
+        self.assertEqual(hits, {1: 1, 2: 5, 3: 3, 5: 1, 6: 1})
+
+    def test_handlers_are_restored(self):
+        handlers = dict(evaluator.node_handlers)
+        with LineProfiler():
+            self.assertNotEqual(evaluator.node_handlers, handlers)
+        self.assertEqual(evaluator.node_handlers, handlers)
+
+    def test_self_time_excludes_nested_lines(self):
+        line_profiler = LineProfiler(clock=FakeClock())
+        with line_profiler:
+            evaluator.evaluate(
+                parse("function f ()\n    return 1\nend\nf()"),
+                obj.Environment(),
+            )
+
+        # f() runs from 3 to 6 and the return inside it from 4 to 5
+        lines = {x.line: x for x in line_profiler.stats()}
+        self.assertEqual(lines[4].inclusive_time, 3.0)
+        self.assertEqual(lines[4].self_time, 2.0)
+        self.assertEqual(lines[2].inclusive_time, 1.0)
+
+    def test_recursive_lines_are_not_counted_twice(self):
+        line_profiler = LineProfiler(clock=FakeClock())
+        with line_profiler:
+            evaluator.evaluate(
+                parse(self.source.replace("count(3)", "count(2)")),
+                obj.Environment(),
+            )
+
+        # The outer return on line 3 already includes the recursive one,
+        # and the if on line 2 the return inside it
+        lines = {x.line: x for x in line_profiler.stats()}
+        self.assertEqual(lines[3].inclusive_time, 9.0)
+        self.assertEqual(lines[2].inclusive_time, 5.0)
+        self.assertLessEqual(lines[3].inclusive_time, lines[5].inclusive_time)
+
+    def test_annotated_source(self):
+        line_profiler = LineProfiler()
+        with line_profiler:
+            evaluator.evaluate(parse(self.source), obj.Environment())
+
+        annotated = line_profiler.annotate(self.source).splitlines()
+
+        self.assertEqual(len(annotated), 7)
+        self.assertTrue(annotated[2].lstrip().startswith("5 "))
+        self.assertTrue(annotated[2].endswith("if n == 0 then return 0 end"))
+        self.assertEqual(annotated[4].split(), ["4", "end"])
+
+        dump = json.loads(line_profiler.to_json())
+        self.assertEqual([x["line"] for x in dump["lines"]], [1, 2, 3, 5, 6])
+
+
+def parse(source):
+    lexer = Lexer(StringIO(source))
+    return Parser(lexer).parse_program()
+
+
+def profile_source(source, backend="tree", clock=None):
+    function_profiler = Profiler(clock=clock) if clock else Profiler()
+    program = parse(source)
+    function_profiler.add_program(program)
+
+    with function_profiler:
+        backends.evaluate(program, obj.Environment(), backend)
+
+    return {x.name: x for x in function_profiler.stats()}
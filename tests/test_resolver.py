@@ -0,0 +1,96 @@
+from io import StringIO
+import unittest
+
+from luatopy.lexer import Lexer
+from luatopy.parser import Parser
+from luatopy import obj
+from luatopy import evaluator
+
+
+class ResolverTest(unittest.TestCase):
+    def test_function_locals_get_slots(self):
+        program = program_from_source("function f (a, b) c = a + b; return c end")
+
+        fn_literal = program.statements[0].expression
+        self.assertEqual(fn_literal.body.local_names, ("a", "b", "c"))
+        self.assertEqual([x.slot for x in fn_literal.parameters], [0, 1])
+        self.assertIsNone(fn_literal.name.slot)
+
+        assignment = fn_literal.body.statements[0]
+        self.assertEqual(assignment.name.slot, 2)
+        self.assertEqual(assignment.value.left.address, ((0, 0),))
+
+    def test_returned_calls_in_functions_are_tail_calls(self):
+        program = program_from_source(
+            "function f (a) x = g(a); return g(x) end; return g(1)"
+        )
+
+        body = program.statements[0].expression.body
+        self.assertFalse(body.statements[0].value.tail_call)
+        self.assertTrue(body.statements[1].value.tail_call)
+        self.assertFalse(program.statements[1].value.tail_call)
+
+    def test_globals_have_empty_addresses(self):
+        program = program_from_source("a = 1; a")
+
+        self.assertIsNone(program.statements[0].name.slot)
+        self.assertEqual(program.statements[1].expression.address, ())
+
+    def test_closure_addresses(self):
+        program = program_from_source(
+            "function f (x) return function (y) return x + y + z end end"
+        )
+
+        inner = program.statements[0].expression.body.statements[0].value
+        infix = inner.body.statements[0].value
+
+        self.assertEqual(infix.left.left.address, ((1, 0),))
+        self.assertEqual(infix.left.right.address, ((0, 0),))
+        self.assertEqual(infix.right.address, ())
+
+    def test_shadowed_names_list_every_candidate(self):
+        program = program_from_source(
+            "function f (x) return function () b = x; x = 1; return b end end"
+        )
+
+        inner = program.statements[0].expression.body.statements[0].value
+        read = inner.body.statements[0].value
+
+        self.assertEqual(read.address, ((0, 1), (1, 0)))
+
+    def test_unassigned_locals_fall_back_to_outer_scopes(self):
+        tests = [
+            ("x = 1; function f () y = x; x = 2; return y + x end; f()", 3),
+            ("x = 1; function f () x = 2; return x end; f(); x", 1),
+            ("function f (x) return function () y = x; x = 5; return y * x end end; f(3)()", 15),
+            ("function f (x) if x then y = 1 end; return y end; y = 7; f(false)", 7),
+            ("function f (a, b) return b end; f(1)", "nil"),
+        ]
+
+        for source, expected in tests:
+            evaluated = evaluator.evaluate(
+                program_from_source(source), obj.Environment()
+            )
+            self.assertEqual(evaluated.inspect(), str(expected))
+
+    def test_deeply_nested_closures(self):
+        source = """
+function a (x)
+    return function (y)
+        return function (z)
+            return function ()
+                return x + y + z
+            end
+        end
+    end
+end
+a(1)(2)(3)()
+"""
+        evaluated = evaluator.evaluate(program_from_source(source), obj.Environment())
+        self.assertEqual(evaluated.value, 6)
+
+
+def program_from_source(source):
+    lexer = Lexer(StringIO(source))
+    parser = Parser(lexer)
+    return parser.parse_program()
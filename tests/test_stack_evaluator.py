@@ -0,0 +1,89 @@
+from luatopy import obj
+from luatopy import stack_evaluator
+from luatopy import backends
+
+from tests import test_evaluator
+from tests.test_parser import program_from_source
+
+
+class StackEvaluatorTest(test_evaluator.EvaluatorTest):
+    """
+    Runs the whole evaluator suite against the stack evaluator
+    """
+
+    backend = "stack"
+
+    def test_deep_recursion(self):
+        source = """
+function depth (n)
+    if n == 0 then return 0 end
+    return 1 + depth(n - 1)
+end
+depth(100000)
+"""
+        self.assertEqual(self.evaluate(source).value, 100000)
+
+    def test_stack_overflow(self):
+        source = """
+function forever (n)
+    return 1 + forever(n + 1)
+end
+forever(0)
+"""
+        evaluated = stack_evaluator.evaluate(
+            program_from_source(source), obj.Environment(), max_depth=100
+        )
+
+        self.assertEqual(type(evaluated), obj.Error)
+        self.assertEqual(evaluated.message, "stack overflow")
+
+    def test_depth_is_reset_between_runs(self):
+        evaluator = stack_evaluator.StackEvaluator(max_depth=50)
+        env = obj.Environment()
+        program = program_from_source("function f (n) return 1 + f(n) end f(0)")
+
+        evaluated = evaluator.evaluate(program, env)
+        self.assertEqual(evaluated.message, "stack overflow")
+        self.assertEqual(evaluator.depth, 0)
+
+        program = program_from_source(
+            "function g (n) if n == 0 then return 0 end "
+            "return 1 + g(n - 1) end g(40)"
+        )
+        self.assertEqual(evaluator.evaluate(program, env).value, 40)
+
+    def test_depth_is_left_on_errors_and_suspended_calls(self):
+        evaluator = stack_evaluator.StackEvaluator(max_depth=50)
+        env = obj.Environment()
+        evaluator.evaluate(
+            program_from_source(
+                "function f (n) if n == 0 then return 1 + true end "
+                "return f(n - 1) + 1 end "
+                "function g (n) if n == 0 then coroutine.yield(n) end "
+                "return g(n - 1) + 1 end"
+            ),
+            env,
+        )
+
+        # A runtime error raised out of an expression, not a program
+        call = program_from_source("f(10)").statements[0]
+        with self.assertRaises(obj.LuaError):
+            evaluator.evaluate(call, env)
+        self.assertEqual(evaluator.depth, 0)
+
+        # A coroutine that yields and is then thrown away
+        g = env.store["g"]
+        frames = [evaluator.call(g, [obj.Integer(10)], env)]
+        suspended = evaluator.run(frames, None, True)
+        self.assertIs(type(suspended), stack_evaluator.Suspend)
+        self.assertEqual(evaluator.depth, 11)
+
+        for frame in reversed(frames):
+            frame.close()
+        self.assertEqual(evaluator.depth, 0)
+
+    def test_registered_as_backend(self):
+        program = program_from_source("function f (n) return n * 2 end f(21)")
+        evaluated = backends.evaluate(program, obj.Environment(), "stack")
+
+        self.assertEqual(evaluated.value, 42)
@@ -0,0 +1,151 @@
+from io import StringIO
+import unittest
+
+from luatopy.lexer import Lexer
+from luatopy.parser import Parser
+from luatopy.state import State
+from luatopy import obj
+from luatopy import backends
+from luatopy import state
+
+
+BACKENDS = ["tree", "stack", "closure", "vm", "python"]
+
+RUNAWAY = "function f () return f() end f()"
+
+
+class FakeClock:
+    """
+    Every reading advances the time by one second
+    """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        self.now = self.now + 1.0
+        return self.now
+
+
+class StateTest(unittest.TestCase):
+    def test_step_limit_stops_endless_tail_calls(self):
+        for backend in BACKENDS:
+            script_state = State(max_steps=5000)
+            evaluated = run(RUNAWAY, script_state, backend)
+
+            self.assertEqual(type(evaluated), obj.Error, backend)
+            self.assertEqual(evaluated.kind, "steps", backend)
+            self.assertEqual(evaluated.message, "Step limit of 5000 exceeded")
+            self.assertIs(script_state.error, evaluated)
+            self.assertGreater(script_state.steps, 5000, backend)
+
+    def test_timeout(self):
+        for backend in BACKENDS:
+            script_state = State(timeout=10.0, clock=FakeClock())
+            evaluated = run(RUNAWAY, script_state, backend)
+
+            self.assertEqual(type(evaluated), obj.Error, backend)
+            self.assertEqual(evaluated.kind, "timeout", backend)
+            self.assertEqual(script_state.elapsed, 12.0, backend)
+
+    def test_counters_after_a_run_within_limits(self):
+        source = """
+function fib (n)
+    if n < 2 then return n end
+    return fib(n - 1) + fib(n - 2)
+end
+fib(10)
+"""
+
+        for backend in BACKENDS:
+            script_state = State(max_steps=100000, timeout=60.0)
+            evaluated = run(source, script_state, backend)
+
+            self.assertEqual(evaluated.value, 55, backend)
+            self.assertIsNone(script_state.error)
+            self.assertGreater(script_state.steps, 177, backend)
+            self.assertLess(script_state.steps, 100000, backend)
+
+    def test_memory_limit_on_tables(self):
+        for backend in BACKENDS:
+            script_state = State(max_memory=100)
+            evaluated = run("t = {1, 2, 3, 4, 5}", script_state, backend)
+
+            self.assertEqual(type(evaluated), obj.Error, backend)
+            self.assertEqual(evaluated.message, "not enough memory")
+            self.assertEqual(evaluated.kind, "memory", backend)
+            self.assertEqual(script_state.memory, 136, backend)
+
+    def test_memory_limit_on_concatenation(self):
+        source = """
+function grow (s, n)
+    if n == 0 then return s end
+    return grow(s .. "0123456789", n - 1)
+end
+grow("", 1000)
+"""
+
+        for backend in BACKENDS:
+            script_state = State(max_memory=10000)
+            evaluated = run(source, script_state, backend)
+
+            self.assertEqual(type(evaluated), obj.Error, backend)
+            self.assertEqual(evaluated.kind, "memory", backend)
+            self.assertGreater(script_state.memory, 10000, backend)
+
+    def test_memory_within_limit(self):
+        for backend in BACKENDS:
+            script_state = State(max_memory=1000)
+            evaluated = run('t = {"a" .. "b", 2}', script_state, backend)
+
+            self.assertEqual(type(evaluated), type(None), backend)
+            self.assertIsNone(script_state.error)
+            self.assertEqual(script_state.memory, 25 + 88, backend)
+
+    def test_collectgarbage_count(self):
+        tests = [
+            ('t = {1, 2}\ncollectgarbage("count")', 88 / 1024),
+            ("collectgarbage(\"count\")", 0.0),
+            ("collectgarbage()", 0),
+            ('collectgarbage("collect")', 0),
+        ]
+
+        for source, expected in tests:
+            for backend in BACKENDS:
+                evaluated = run(source, State(), backend)
+                self.assertEqual(evaluated.value, expected, backend)
+
+    def test_collectgarbage_without_state(self):
+        evaluated = backends.evaluate(
+            parse('collectgarbage("count")'), obj.Environment()
+        )
+        self.assertEqual(evaluated, obj.Float(0.0))
+
+    def test_collectgarbage_invalid_option(self):
+        evaluated = run('collectgarbage("step")', State())
+        self.assertEqual(
+            evaluated.message, "Invalid option step to collectgarbage"
+        )
+
+    def test_counters_are_reset_between_runs(self):
+        script_state = State(max_steps=100)
+        self.assertEqual(type(run(RUNAWAY, script_state)), obj.Error)
+        self.assertEqual(run("1 + 1", script_state).value, 2)
+        self.assertIsNone(script_state.error)
+        self.assertEqual(script_state.steps, 1)
+
+    def test_inactive_outside_of_context(self):
+        script_state = State()
+        with script_state:
+            self.assertIs(state.active, script_state)
+        self.assertIsNone(state.active)
+
+
+def parse(source):
+    lexer = Lexer(StringIO(source))
+    return Parser(lexer).parse_program()
+
+
+def run(source, script_state, backend="tree"):
+    with script_state:
+        return backends.evaluate(parse(source), obj.Environment(), backend)
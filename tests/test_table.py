@@ -0,0 +1,55 @@
+from io import StringIO
+import unittest
+
+from luatopy.lexer import Lexer
+from luatopy.parser import Parser
+from luatopy import obj
+from luatopy import backends
+
+
+BACKENDS = ["tree", "stack", "closure", "vm", "python"]
+
+
+class TableLibraryTest(unittest.TestCase):
+    def test_concat(self):
+        tests = [
+            ('table.concat({"a", "b", "c"})', "abc"),
+            ('table.concat({"a", "b", "c"}, ", ")', "a, b, c"),
+            ('table.concat({"a", 2, "c"}, "-")', "a-2-c"),
+            ('table.concat({"a", "b", "c"}, "", 2)', "bc"),
+            ('table.concat({"a", "b", "c"}, "", 1, 2)', "ab"),
+            ('table.concat({"a", "b", "c"}, "", 3, 2)', ""),
+            ("table.concat({})", ""),
+            ('table.concat({[2] = "b", [3] = "c"}, "", 2, 3)', "bc"),
+        ]
+
+        for source, expected in tests:
+            for backend in BACKENDS:
+                evaluated = evaluate(source, backend)
+                self.assertEqual(evaluated, obj.String(expected), backend)
+
+    def test_concat_errors(self):
+        tests = [
+            ("table.concat(1)", "Bad argument to concat, table expected"),
+            (
+                'table.concat({"a", true})',
+                "Invalid value (at index 2) in table for concat",
+            ),
+            (
+                'table.concat({"a"}, "", 1, 2)',
+                "Invalid value (at index 2) in table for concat",
+            ),
+            ("table.concat({}, 1)", "Bad argument to concat, string expected"),
+        ]
+
+        for source, expected in tests:
+            evaluated = evaluate(source)
+            self.assertEqual(type(evaluated), obj.Error, source)
+            self.assertEqual(evaluated.message, expected)
+
+
+def evaluate(source, backend="tree"):
+    parser = Parser(Lexer(StringIO(source)))
+    program = parser.parse_program()
+    assert not parser.errors, parser.errors
+    return backends.evaluate(program, obj.Environment(), backend)
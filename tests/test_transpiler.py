@@ -0,0 +1,46 @@
+from luatopy.transpiler import Transpiler
+from luatopy import obj
+
+from tests import test_evaluator
+from tests.test_parser import program_from_source
+
+
+class TranspilerTest(test_evaluator.EvaluatorTest):
+    """
+    Runs the whole evaluator suite against the generated Python code
+    """
+
+    backend = "python"
+
+    def test_parameters_are_kept_in_python_locals(self):
+        source = "function inc (n) return n + 1 end"
+
+        code = Transpiler().transpile(program_from_source(source))
+
+        self.assertIn("return add(v_n, K0)", code)
+        self.assertIn("K0 = Integer.create(value=1)", code)
+
+    def test_closures_capture_parameters(self):
+        source = """
+function counter (start)
+    start = start + 1
+    return function () return start end
+end
+counter(1)()
+"""
+        self.assertEqual(self.evaluate(source).value, 2)
+
+    def test_if_expression_values(self):
+        tests = [
+            ("a = if true then 1 else 2 end; a", 1),
+            ("a = if false then 1 end; a", "nil"),
+            ("a = if false then 1 else b = 3; b * 2 end; a", 6),
+            ("function f (x) y = if x then 1 else x = 5; x end; return y end; f(false)", 5),
+        ]
+
+        for source, expected in tests:
+            evaluated = self.evaluate(source)
+            self.assertEqual(evaluated.inspect(), str(expected))
+
+    def test_small_integer_constants_are_shared(self):
+        self.assertIs(self.evaluate("a = 7; a"), obj.Integer.create(7))
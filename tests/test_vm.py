@@ -0,0 +1,42 @@
+from luatopy import obj
+from luatopy import evaluator
+from luatopy import vm
+
+from tests import test_evaluator
+from tests.test_parser import program_from_source
+
+
+class VMTest(test_evaluator.EvaluatorTest):
+    """
+    Runs the whole evaluator suite against the bytecode VM
+    """
+
+    backend = "vm"
+
+    def test_missing_function(self):
+        evaluated = self.evaluate("nope(1)")
+
+        self.assertEqual(type(evaluated), obj.Error)
+        self.assertEqual(evaluated.message, "Not a function ObjType.NULL")
+
+    def test_environment_is_shared(self):
+        env = obj.Environment()
+        vm.evaluate(
+            program_from_source("a = 5; function f (x) return x * a end"), env
+        )
+
+        evaluated = vm.evaluate(program_from_source("f(2)"), env)
+        self.assertEqual(evaluated.value, 10)
+
+    def test_functions_can_be_called_from_evaluator(self):
+        env = obj.Environment()
+        vm.evaluate(
+            program_from_source(
+                "function outer (x) return function (y) return x + y end end"
+            ),
+            env,
+        )
+
+        program = program_from_source("outer(2)(3)")
+
+        self.assertEqual(evaluator.evaluate(program, env).value, 5)